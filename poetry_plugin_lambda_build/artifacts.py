@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from tempfile import mkdtemp
+
+from poetry_plugin_lambda_build.fs import (clone_file, link_tree,
+                                            remove_unused_entries)
+
+
+class ArtifactCache:
+    """
+    Local cache of finished artifacts addressed by the fingerprint of all
+    their inputs. Artifacts are stored and restored with reflinks or
+    hardlinks when possible, together with metadata of the build.
+    """
+
+    ARTIFACT = "artifact"
+    META = "meta.json"
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+
+    def path(self, fingerprint: str) -> str:
+        return os.path.join(self.root, fingerprint[:2], fingerprint)
+
+    def get(self, fingerprint: str) -> str | None:
+        path = self.path(fingerprint)
+        if not os.path.exists(os.path.join(path, self.META)):
+            return None
+        os.utime(path)
+        return path
+
+    def put(self, fingerprint: str, target: str, meta: dict) -> str:
+        path = self.path(fingerprint)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_dir = mkdtemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            artifact = os.path.join(tmp_dir, self.ARTIFACT)
+            if os.path.isdir(target):
+                link_tree(target, artifact)
+            else:
+                clone_file(target, artifact)
+            with open(os.path.join(tmp_dir, self.META), "w") as f:
+                json.dump(meta, f)
+            os.rename(tmp_dir, path)
+        except OSError:
+            # entry was stored concurrently
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return path
+
+    def restore(self, fingerprint: str, target: str) -> dict | None:
+        """
+        Places the cached artifact at target and returns its metadata, or
+        None when the fingerprint is not cached.
+        """
+        path = self.get(fingerprint)
+        if path is None:
+            return None
+        with open(os.path.join(path, self.META)) as f:
+            meta = json.load(f)
+        artifact = os.path.join(path, self.ARTIFACT)
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        if os.path.isdir(artifact):
+            link_tree(artifact, target)
+        else:
+            clone_file(artifact, target)
+        return meta
+
+    def gc(self, max_age: float) -> int:
+        """
+        Removes entries not used for max_age seconds and returns their number.
+        """
+        return remove_unused_entries(self.root, max_age)
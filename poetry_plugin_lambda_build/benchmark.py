@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import json
+import os
+import statistics
+import subprocess
+from datetime import datetime, timezone
+from tempfile import TemporaryDirectory
+from typing import TYPE_CHECKING
+
+from poetry_plugin_lambda_build.bytecode import get_handler_module
+from poetry_plugin_lambda_build.docker import copy_to_container, run_container
+from poetry_plugin_lambda_build.fs import link_tree
+from poetry_plugin_lambda_build.utils import format_cmd
+from poetry_plugin_lambda_build.zip import extract_zip
+
+if TYPE_CHECKING:
+    from docker.models.containers import Container
+
+    from poetry_plugin_lambda_build.parameters import ParametersContainer
+
+CONTAINER_BENCHMARK_DIR = "/opt/lambda/benchmark"
+LAMBDA_TASK_DIR = os.path.join("var", "task")
+LAMBDA_OPT_DIR = "opt"
+BENCHMARKS_DIR = "benchmarks"
+START_MARKER = "benchmark: start"
+INIT_TIME_PREFIX = "benchmark: init time "
+IMPORT_TIME_PREFIX = "import time:"
+# modules are found as in the Lambda python runtimes, the function code
+# first and then the layers, site-packages of the interpreter are not used
+BENCHMARK_SCRIPT = (
+    "import sys, time; root = sys.argv[1]; v = '%d.%d' % sys.version_info[:2]; "
+    "sys.path[:0] = [root + '/var/task', "
+    "root + '/opt/python/lib/python' + v + '/site-packages', "
+    "root + '/opt/python']; "
+    f"sys.stderr.write('{START_MARKER}\\n'); sys.stderr.flush(); "
+    "start = time.perf_counter(); __import__(sys.argv[2]); "
+    f"sys.stderr.write('{INIT_TIME_PREFIX}%f\\n' % (time.perf_counter() - start))"
+)
+BENCHMARK_CMD_TMPL = [
+    "python",
+    "-S",
+    "-X",
+    "importtime",
+    "-c",
+    BENCHMARK_SCRIPT,
+    "{root}",
+    "{module}",
+]
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def get_benchmark_artifacts(parameters: ParametersContainer, root: str) -> dict:
+    """
+    Maps the built artifacts to the directories of the Lambda layout they
+    are extracted to, the function code to /var/task and layers to /opt.
+    """
+    if parameters["function-artifact-path"] or parameters["layer-artifact-path"]:
+        artifacts = {
+            LAMBDA_TASK_DIR: parameters["function-artifact-path"],
+            LAMBDA_OPT_DIR: parameters["layer-artifact-path"],
+        }
+    elif parameters["package-install-dir"]:
+        # packages installed into a directory are deployed as layers
+        artifacts = {LAMBDA_OPT_DIR: parameters["package-artifact-path"]}
+    else:
+        artifacts = {LAMBDA_TASK_DIR: parameters["package-artifact-path"]}
+    return {
+        dir: os.path.join(root, path) for dir, path in artifacts.items() if path
+    }
+
+
+def prepare_layout(root: str, artifacts: dict):
+    for dir, path in artifacts.items():
+        if not os.path.exists(path):
+            raise BenchmarkError(f"Artifact {path} was not found, build it first")
+        if path.endswith(".zip"):
+            extract_zip(path, os.path.join(root, dir))
+        else:
+            link_tree(path, os.path.join(root, dir))
+
+
+def parse_import_times(output: str) -> tuple[float | None, dict]:
+    """
+    Returns the init time in seconds and self and cumulative import times
+    in microseconds of modules imported by the benchmarked import.
+    """
+    started, init_time, modules = False, None, {}
+    for line in output.splitlines():
+        if line == START_MARKER:
+            started = True
+        elif not started:
+            continue
+        elif line.startswith(INIT_TIME_PREFIX):
+            init_time = float(line[len(INIT_TIME_PREFIX) :])
+        elif line.startswith(IMPORT_TIME_PREFIX):
+            fields = line[len(IMPORT_TIME_PREFIX) :].split("|")
+            try:
+                modules[fields[2].strip()] = [int(fields[0]), int(fields[1])]
+            except (IndexError, ValueError):
+                # header of the import time table
+                continue
+    return init_time, modules
+
+
+def summarize(samples: list[tuple[float, dict]], top: int) -> dict:
+    init_ms = [init_time * 1000 for init_time, _ in samples]
+    times = {}
+    for _, modules in samples:
+        for name, module_times in modules.items():
+            times.setdefault(name, []).append(module_times)
+    modules = {
+        name: {
+            "self_us": statistics.median(t[0] for t in module_times),
+            "cumulative_us": statistics.median(t[1] for t in module_times),
+        }
+        for name, module_times in sorted(times.items())
+    }
+    return {
+        "init_ms": {
+            "median": statistics.median(init_ms),
+            "min": min(init_ms),
+            "max": max(init_ms),
+            "samples": init_ms,
+        },
+        "modules": modules,
+        "slowest": sorted(
+            modules, key=lambda name: modules[name]["self_us"], reverse=True
+        )[:top],
+    }
+
+
+def save_report(dir: str, report: dict) -> str:
+    os.makedirs(dir, exist_ok=True)
+    created = datetime.fromisoformat(report["created"])
+    path = os.path.join(dir, created.strftime("%Y%m%dT%H%M%S%fZ.json"))
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def find_latest_report(dir: str) -> str | None:
+    try:
+        reports = sorted(f for f in os.listdir(dir) if f.endswith(".json"))
+    except FileNotFoundError:
+        return None
+    return os.path.join(dir, reports[-1]) if reports else None
+
+
+def load_report(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _delta(previous: float, current: float) -> str:
+    change = (current - previous) / previous * 100 if previous else 0.0
+    return f"{current - previous:+.1f} ({change:+.0f}%)"
+
+
+def format_report(report: dict) -> list[str]:
+    init_ms = report["init_ms"]
+    lines = [
+        f"Init time of {report['module']} over {report['runs']} runs: "
+        f"median {init_ms['median']:.1f} ms, "
+        f"min {init_ms['min']:.1f} ms, max {init_ms['max']:.1f} ms",
+        "Slowest modules (self / cumulative import time):",
+    ]
+    for name in report["slowest"]:
+        times = report["modules"][name]
+        lines.append(
+            f"  {times['self_us'] / 1000:8.1f} ms"
+            f" {times['cumulative_us'] / 1000:8.1f} ms  {name}"
+        )
+    return lines
+
+
+def compare_reports(baseline: dict, report: dict) -> list[str]:
+    """
+    Returns lines describing changes of the init time and of import times
+    of the slowest modules of both reports.
+    """
+    lines = [
+        f"Compared with the report of {baseline['created']}: median init time "
+        f"{_delta(baseline['init_ms']['median'], report['init_ms']['median'])} ms"
+    ]
+    names = list(dict.fromkeys(report["slowest"] + baseline["slowest"]))
+    for name in names:
+        previous = baseline["modules"].get(name)
+        current = report["modules"].get(name)
+        if previous is None:
+            lines.append(f"  {name}: new, {current['self_us'] / 1000:.1f} ms")
+        elif current is None:
+            lines.append(f"  {name}: not imported")
+        else:
+            delta = _delta(previous["self_us"] / 1000, current["self_us"] / 1000)
+            lines.append(f"  {name}: {delta} ms")
+    removed = len(set(baseline["modules"]) - set(report["modules"]))
+    added = len(set(report["modules"]) - set(baseline["modules"]))
+    lines.append(f"Modules imported: {added} new, {removed} no longer imported")
+    return lines
+
+
+def measure_import(
+    container: Container | None, python: str, root: str, module: str
+) -> tuple[float, dict]:
+    """
+    Imports the module in a new interpreter, in the container when given,
+    and returns its init time and import times of modules.
+    """
+    cmd = format_cmd(BENCHMARK_CMD_TMPL, root=root, module=module)
+    if container is None:
+        cmd[0] = python
+        process = subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        )
+        exit_code, output = process.returncode, process.stdout + process.stderr
+    else:
+        exit_code, output = container.exec_run(
+            cmd, environment={"PYTHONDONTWRITEBYTECODE": "1"}
+        )
+        output = output.decode()
+    init_time, modules = parse_import_times(output)
+    if exit_code or init_time is None:
+        raise BenchmarkError(f"Import of {module} failed: {output.strip()}")
+    return init_time, modules
+
+
+def run_benchmark(cmd, parameters: ParametersContainer) -> dict:
+    """
+    Extracts the built artifacts into a Lambda-like layout and imports the
+    module of the handler in new interpreters, in docker-image when it is
+    set, measuring the init time and import times of modules.
+    """
+    if not parameters["handler"]:
+        raise BenchmarkError("handler is required by the benchmark")
+    module = get_handler_module(parameters["handler"])
+    runs = parameters["benchmark-runs"]
+    artifacts = get_benchmark_artifacts(parameters, os.getcwd())
+    with TemporaryDirectory() as root:
+        prepare_layout(root, artifacts)
+        cmd.info(f"Importing {module} {runs} times...")
+        if parameters["docker-image"]:
+            with run_container(cmd, **parameters.get_section("docker")) as container:
+                path = f"{CONTAINER_BENCHMARK_DIR}/{os.path.basename(root)}"
+                copy_to_container(src=root, dst=f"{container.id}:{path}")
+                samples = [
+                    measure_import(container, "python", path, module)
+                    for _ in range(runs)
+                ]
+        else:
+            samples = [
+                measure_import(None, cmd.env.python, root, module) for _ in range(runs)
+            ]
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "handler": parameters["handler"],
+        "module": module,
+        "runs": runs,
+        "docker_image": parameters["docker-image"],
+        "artifacts": {
+            dir: {"path": os.path.relpath(path), "size": os.path.getsize(path)}
+            for dir, path in artifacts.items()
+            if os.path.isfile(path)
+        },
+        **summarize(samples, parameters["benchmark-top"]),
+    }
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import os
+import shlex
+
+from poetry_plugin_lambda_build.fs import move_tree
+
+# unchecked-hash pycs are loaded without comparing them with the sources,
+# which is safe as files of Lambda artifacts never change
+COMPILE_BYTECODE_CMD_TMPL = shlex.split(
+    "python -m compileall -q -f -j 0 --invalidation-mode unchecked-hash"
+    " {optimize} {output_dir}"
+)
+IMPORT_TIME_SCRIPT = (
+    "import importlib, sys, time; sys.path.insert(0, sys.argv[1]); "
+    "start = time.perf_counter(); importlib.import_module(sys.argv[2]); "
+    "print(time.perf_counter() - start)"
+)
+IMPORT_TIME_CMD_TMPL = ["python", "-c", IMPORT_TIME_SCRIPT, "{output_dir}", "{module}"]
+
+
+def get_optimize_args(levels: list[int]) -> list[str]:
+    args = []
+    for level in levels:
+        args += ["-o", str(level)]
+    return args
+
+
+def get_handler_module(handler: str) -> str:
+    return handler.rsplit(".", 1)[0]
+
+
+def find_module(dir: str, module: str) -> str | None:
+    path = os.path.join(dir, *module.split("."))
+    for candidate in (path + ".py", os.path.join(path, "__init__.py")):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def merge_bytecode(compiled_dir: str, dir: str) -> int:
+    """
+    Moves __pycache__ directories of compiled_dir to the same places in
+    dir and returns their number.
+    """
+    merged = 0
+    for root, dirs, _ in os.walk(compiled_dir):
+        if "__pycache__" in dirs:
+            dirs.remove("__pycache__")
+            target = os.path.join(dir, os.path.relpath(root, compiled_dir))
+            if os.path.isdir(target):
+                move_tree(
+                    os.path.join(root, "__pycache__"),
+                    os.path.join(target, "__pycache__"),
+                )
+                merged += 1
+    return merged
+
+
+def format_import_times(module: str, source: float, bytecode: float) -> str:
+    saved = (source - bytecode) / source * 100 if source else 0.0
+    return (
+        f"Import time of {module}: {source * 1000:.1f} ms from sources, "
+        f"{bytecode * 1000:.1f} ms with bytecode ({saved:.0f}% faster)"
+    )
@@ -0,0 +1,115 @@
+"""
+Reference server of the remote artifact cache protocol.
+
+    python -m poetry_plugin_lambda_build.cache_server --port 8080 --root cache
+
+Entries are stored in the root directory. Uploads to the content-addressable
+storage are rejected when the SHA-256 of the body does not match the name.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import re
+import shutil
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from tempfile import NamedTemporaryFile
+
+from poetry_plugin_lambda_build.remote import ACTION_CACHE, CAS, CHUNK_SIZE
+
+NAME_PATTERN = re.compile(rf"^/({ACTION_CACHE}|{CAS})/([0-9a-f]{{64}})$")
+
+
+class CacheRequestHandler(BaseHTTPRequestHandler):
+    def __init__(self, *args, root: str, **kwargs) -> None:
+        self.root = root
+        super().__init__(*args, **kwargs)
+
+    def _path(self) -> tuple[str, str, str] | None:
+        match = NAME_PATTERN.match(self.path)
+        if match is None:
+            self.send_error(404)
+            return None
+        kind, key = match.groups()
+        return kind, key, os.path.join(self.root, kind, key)
+
+    def do_HEAD(self) -> None:
+        self._send_file(body=False)
+
+    def do_GET(self) -> None:
+        self._send_file(body=True)
+
+    def _send_file(self, body: bool) -> None:
+        entry = self._path()
+        if entry is None:
+            return
+        try:
+            f = open(entry[2], "rb")
+        except FileNotFoundError:
+            self.send_error(404)
+            return
+        with f:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+            self.end_headers()
+            if body:
+                shutil.copyfileobj(f, self.wfile, CHUNK_SIZE)
+
+    def do_PUT(self) -> None:
+        entry = self._path()
+        if entry is None:
+            return
+        kind, key, path = entry
+        if "Content-Length" not in self.headers:
+            self.send_error(411)
+            return
+        remaining = int(self.headers["Content-Length"])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        m = hashlib.sha256()
+        with NamedTemporaryFile(
+            dir=os.path.dirname(path), prefix=".tmp-", delete=False
+        ) as f:
+            while remaining:
+                chunk = self.rfile.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                m.update(chunk)
+                f.write(chunk)
+                remaining -= len(chunk)
+        if remaining or (kind == CAS and m.hexdigest() != key):
+            os.remove(f.name)
+            self.send_error(400, "Body does not match the entry")
+            return
+        os.replace(f.name, path)
+        self.send_response(201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+def create_server(host: str, port: int, root: str) -> ThreadingHTTPServer:
+    return ThreadingHTTPServer(
+        (host, port), partial(CacheRequestHandler, root=os.path.abspath(root))
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--root", default=".")
+    args = parser.parse_args(argv)
+    server = create_server(args.host, args.port, args.root)
+    print(f"Serving artifact cache from {os.path.abspath(args.root)} on {args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
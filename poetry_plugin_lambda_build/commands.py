@@ -6,6 +6,12 @@ MKDIR = shlex.split("mkdir -p {output_dir}")
 INSTALL_DEPS_CMD_TMPL = shlex.split(
     "pip install -q -t {output_dir} --no-cache-dir -r {requirements}"
 )
+INSTALL_DEPS_NO_DEPS_CMD_TMPL = shlex.split(
+    "pip install -q -t {output_dir} --no-cache-dir --no-deps -r {requirements}"
+)
+WHEEL_NO_DEPS_CMD_TMPL = shlex.split(
+    "pip wheel -q --no-cache-dir --no-deps -w {output_dir} -r {requirements}"
+)
 INSTALL_POETRY_CMD = shlex.split("pip install poetry --quiet --upgrade pip")
 INSTALL_CMD_TMPL = shlex.split(
     "poetry run pip install -q -t {output_dir} . --no-cache-dir --upgrade {indexes}"
@@ -16,8 +22,75 @@ INSTALL_NO_DEPS_CMD_TMPL = shlex.split(
 
 INSTALL_DEPS_CMD_IN_CONTAINER_TMPL = join_cmds(MKDIR, INSTALL_DEPS_CMD_TMPL)
 
+INSTALL_DEPS_NO_DEPS_CMD_IN_CONTAINER_TMPL = join_cmds(
+    MKDIR, INSTALL_DEPS_NO_DEPS_CMD_TMPL
+)
+
+WHEEL_NO_DEPS_CMD_IN_CONTAINER_TMPL = join_cmds(MKDIR, WHEEL_NO_DEPS_CMD_TMPL)
+
 INSTALL_IN_CONTAINER_CMD_TMPL = join_cmds(MKDIR, INSTALL_POETRY_CMD, INSTALL_CMD_TMPL)
 
 INSTALL_IN_CONTAINER_NO_DEPS_CMD_TMPL = join_cmds(
     MKDIR, INSTALL_POETRY_CMD, INSTALL_NO_DEPS_CMD_TMPL
 )
+
+# The exported requirements file is a fully pinned closure, so uv installs it
+# with --no-deps and skips dependency resolution entirely.
+UV_INSTALL_DEPS_CMD_TMPL = shlex.split(
+    "uv pip install -q --target {output_dir} --no-cache --no-deps -r {requirements}"
+)
+INSTALL_UV_CMD = shlex.split("pip install uv --quiet")
+INSTALL_POETRY_UV_CMD = shlex.split("pip install poetry uv --quiet --upgrade pip")
+UV_INSTALL_CMD_TMPL = shlex.split(
+    "poetry run uv pip install -q --target {output_dir} . --no-cache --upgrade {indexes}"
+)
+UV_INSTALL_NO_DEPS_CMD_TMPL = shlex.split(
+    "poetry run uv pip install -q --target {output_dir} . --no-cache --no-deps --upgrade"
+)
+
+UV_INSTALL_DEPS_CMD_IN_CONTAINER_TMPL = join_cmds(
+    MKDIR, INSTALL_UV_CMD, UV_INSTALL_DEPS_CMD_TMPL
+)
+
+UV_INSTALL_IN_CONTAINER_CMD_TMPL = join_cmds(
+    MKDIR, INSTALL_POETRY_UV_CMD, UV_INSTALL_CMD_TMPL
+)
+
+UV_INSTALL_IN_CONTAINER_NO_DEPS_CMD_TMPL = join_cmds(
+    MKDIR, INSTALL_POETRY_UV_CMD, UV_INSTALL_NO_DEPS_CMD_TMPL
+)
+
+INSTALLERS = {
+    "pip": {
+        "deps": INSTALL_DEPS_CMD_TMPL,
+        "deps_no_deps": INSTALL_DEPS_NO_DEPS_CMD_TMPL,
+        "install": INSTALL_CMD_TMPL,
+        "install_no_deps": INSTALL_NO_DEPS_CMD_TMPL,
+        "deps_in_container": INSTALL_DEPS_CMD_IN_CONTAINER_TMPL,
+        "deps_in_container_no_deps": INSTALL_DEPS_NO_DEPS_CMD_IN_CONTAINER_TMPL,
+        "wheels_in_container": WHEEL_NO_DEPS_CMD_IN_CONTAINER_TMPL,
+        "install_in_container": INSTALL_IN_CONTAINER_CMD_TMPL,
+        "install_in_container_no_deps": INSTALL_IN_CONTAINER_NO_DEPS_CMD_TMPL,
+    },
+    "uv": {
+        "deps": UV_INSTALL_DEPS_CMD_TMPL,
+        "deps_no_deps": UV_INSTALL_DEPS_CMD_TMPL,
+        "install": UV_INSTALL_CMD_TMPL,
+        "install_no_deps": UV_INSTALL_NO_DEPS_CMD_TMPL,
+        "deps_in_container": UV_INSTALL_DEPS_CMD_IN_CONTAINER_TMPL,
+        "deps_in_container_no_deps": UV_INSTALL_DEPS_CMD_IN_CONTAINER_TMPL,
+        # uv has no equivalent of pip wheel for requirements files
+        "wheels_in_container": WHEEL_NO_DEPS_CMD_IN_CONTAINER_TMPL,
+        "install_in_container": UV_INSTALL_IN_CONTAINER_CMD_TMPL,
+        "install_in_container_no_deps": UV_INSTALL_IN_CONTAINER_NO_DEPS_CMD_TMPL,
+    },
+}
+
+
+def get_installer_cmds(installer: str) -> dict:
+    try:
+        return INSTALLERS[installer]
+    except KeyError:
+        raise ValueError(
+            f"Unknown installer: {installer}, expected one of: {', '.join(INSTALLERS)}"
+        )
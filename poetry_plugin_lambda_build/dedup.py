@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+from zipfile import ZipFile
+
+from poetry_plugin_lambda_build.zip import CHUNK_SIZE, file_digests
+
+DEDUP_OFF = "off"
+DEDUP_IDENTICAL = "identical"
+DEDUP_STRICT = "strict"
+DEDUP_LAYER = "layer"
+DEDUP_POLICIES = (DEDUP_OFF, DEDUP_IDENTICAL, DEDUP_STRICT, DEDUP_LAYER)
+PYCACHE_DIR = "__pycache__"
+
+
+def get_zip_digests(path: str) -> dict[str, str]:
+    digests = {}
+    with ZipFile(path) as zip_file:
+        for info in zip_file.infolist():
+            if info.is_dir():
+                continue
+            m = hashlib.sha256()
+            with zip_file.open(info) as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE * 128), b""):
+                    m.update(chunk)
+            digests[info.filename] = m.hexdigest()
+    return digests
+
+
+def get_tree_digests(root: str) -> dict[str, str]:
+    digests = {}
+    for base_path, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if d != PYCACHE_DIR]
+        for file in files:
+            path = os.path.join(base_path, file)
+            rel_path = os.path.relpath(path, root).replace(os.sep, "/")
+            digests[rel_path] = file_digests(path)[2]
+    return digests
+
+
+def get_manifest_digests(manifest: dict[str, list]) -> dict[str, str]:
+    """
+    Maps entries of a zip manifest to SHA-256 of their contents.
+    """
+    return {name: entry[3] for name, entry in manifest.items()}
+
+
+def strip_install_dir(digests: dict[str, str], install_dir: str) -> dict[str, str]:
+    """
+    Returns digests of files of the install directory relative to it, as
+    the paths modules are imported from.
+    """
+    prefix = install_dir.strip("/") + "/" if install_dir else ""
+    return {
+        path[len(prefix) :]: digest
+        for path, digest in digests.items()
+        if path.startswith(prefix) and PYCACHE_DIR not in path.split("/")
+    }
+
+
+def find_duplicates(
+    function: dict[str, str], layer: dict[str, str], policy: str
+) -> tuple[list[str], dict[str, list[str]]]:
+    """
+    Returns top-level entries of the function to drop and conflicts, files
+    of top-level entries provided by the layer which differ or are missing
+    in it. Entries are compared as a whole, as a package found first in the
+    function would hide the modules of the same package in the layer.
+    """
+    groups, layer_names = {}, {path.split("/", 1)[0] for path in layer}
+    for path, digest in function.items():
+        groups.setdefault(path.split("/", 1)[0], []).append((path, digest))
+
+    drop, conflicts = [], {}
+    for name, files in sorted(groups.items()):
+        if name not in layer_names:
+            continue
+        different = sorted(path for path, digest in files if layer.get(path) != digest)
+        if different:
+            conflicts[name] = different
+        if not different or policy == DEDUP_LAYER:
+            drop.append(name)
+    return drop, conflicts
+
+
+def remove_entries(root: str, names: list[str]) -> int:
+    """
+    Removes top-level entries of the tree and returns the number of bytes
+    removed.
+    """
+    removed = 0
+    for name in names:
+        path = os.path.join(root, name)
+        if os.path.isdir(path):
+            for base_path, _, files in os.walk(path):
+                removed += sum(
+                    os.path.getsize(os.path.join(base_path, file)) for file in files
+                )
+            shutil.rmtree(path)
+        elif os.path.lexists(path):
+            removed += os.path.getsize(path)
+            os.remove(path)
+    return removed
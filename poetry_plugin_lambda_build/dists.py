@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import csv
+import os
+from typing import Iterator
+
+from packaging.utils import canonicalize_name
+
+DIST_INFO_SUFFIX = ".dist-info"
+
+
+def parse_dist_info_name(dirname: str) -> tuple[str, str]:
+    name, version = dirname[: -len(DIST_INFO_SUFFIX)].rsplit("-", 1)
+    return canonicalize_name(name), version
+
+
+def iter_distributions(site_dir: str) -> Iterator[tuple[str, str, str]]:
+    """
+    Yields canonical name, version and dist-info path of distributions
+    installed into the site directory.
+    """
+    try:
+        entries = sorted(os.listdir(site_dir))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        path = os.path.join(site_dir, entry)
+        if entry.endswith(DIST_INFO_SUFFIX) and os.path.isdir(path):
+            name, version = parse_dist_info_name(entry)
+            yield name, version, path
+
+
+def read_record(dist_info: str) -> list[str]:
+    """
+    Returns paths listed in RECORD of the distribution, relative to the
+    site directory.
+    """
+    try:
+        with open(os.path.join(dist_info, "RECORD"), newline="") as f:
+            return [row[0] for row in csv.reader(f) if row]
+    except FileNotFoundError:
+        return []
+
+
+def resolve_record_path(site_dir: str, path: str) -> str | None:
+    """
+    Maps a RECORD entry to a path inside the site directory. Scripts are
+    recorded relative to the install scheme, with pip --target they end up
+    in the bin directory of the site directory.
+    """
+    norm = os.path.normpath(path)
+    if norm.startswith(os.pardir + os.sep):
+        parts = norm.split(os.sep)
+        if len(parts) > 1 and parts[-2] == "bin":
+            return os.path.join(site_dir, "bin", parts[-1])
+        return None
+    return os.path.join(site_dir, norm)
+
+
+def distribution_files(site_dir: str, dist_info: str) -> list[str]:
+    """
+    Returns existing files of an installed distribution listed in its
+    RECORD file together with the files of its dist-info directory.
+    """
+    files = set()
+    for path in read_record(dist_info):
+        full_path = resolve_record_path(site_dir, path)
+        if full_path is not None and os.path.isfile(full_path):
+            files.add(os.path.normpath(full_path))
+    for root, _, names in os.walk(dist_info):
+        files.update(os.path.normpath(os.path.join(root, name)) for name in names)
+    return sorted(files)
+
+
+def get_file_owners(root: str) -> dict[str, str]:
+    """
+    Maps files of distributions installed anywhere in the tree to their
+    canonical names.
+    """
+    owners = {}
+    for base_path, dirs, _ in os.walk(root):
+        for dirname in dirs:
+            if dirname.endswith(DIST_INFO_SUFFIX):
+                name, _ = parse_dist_info_name(dirname)
+                dist_info = os.path.join(base_path, dirname)
+                for path in distribution_files(base_path, dist_info):
+                    owners[path] = name
+    return owners
+
+
+def uninstall_distribution(site_dir: str, name: str) -> int:
+    """
+    Removes files of an installed distribution using its RECORD file and
+    returns the number of removed files.
+    """
+    name = canonicalize_name(name)
+    removed = 0
+    for dist_name, _, dist_info in list(iter_distributions(site_dir)):
+        if dist_name != name:
+            continue
+        dirs = {dist_info}
+        for path in distribution_files(site_dir, dist_info):
+            os.remove(path)
+            removed += 1
+            dirs.add(os.path.dirname(path))
+        remove_empty_dirs(site_dir, dirs)
+    return removed
+
+
+def remove_empty_dirs(site_dir: str, dirs: set[str]):
+    site_dir = os.path.abspath(site_dir)
+    for path in sorted(dirs, key=len, reverse=True):
+        path = os.path.abspath(path)
+        while path.startswith(site_dir + os.sep):
+            try:
+                os.rmdir(path)
+            except OSError:
+                break
+            path = os.path.dirname(path)
+
+
+def diff_requirements(
+    previous: dict[str, str], current: dict[str, str]
+) -> tuple[list[str], list[str]]:
+    """
+    Compares requirement lines by package name and returns names of
+    packages to remove and to install.
+    """
+    removed = sorted(
+        name for name, line in previous.items() if current.get(name) != line
+    )
+    added = sorted(
+        name for name, line in current.items() if previous.get(name) != line
+    )
+    return removed, added
@@ -29,6 +29,15 @@ def get_docker_client() -> docker.DockerClient:
     return docker.from_env()
 
 
+def get_image_digest(image: str) -> str:
+    client = get_docker_client()
+    try:
+        docker_image = client.images.get(image)
+    except docker.errors.ImageNotFound:
+        docker_image = client.images.pull(image)
+    return docker_image.id
+
+
 def _should_ignore(path: str, ignore_patterns: Optional[List[str]] = None) -> bool:
     """Check if a path should be ignored based on the provided patterns."""
     if not ignore_patterns:
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from fnmatch import fnmatch
+from importlib import metadata
+from typing import Iterator
+
+from poetry_plugin_lambda_build.wheelhouse import file_hash
+
+STATE_DIR_NAME = ".lambda-build"
+FAST_PATH_FILE = "fast-path"
+IGNORED_DIRS = {
+    ".git",
+    ".hg",
+    ".svn",
+    STATE_DIR_NAME,
+    ".venv",
+    ".tox",
+    ".nox",
+    ".pytest_cache",
+    ".mypy_cache",
+    ".ruff_cache",
+    "__pycache__",
+}
+# parameters which do not change the content of artifacts
+OPERATIONAL_PARAMETERS = {
+    "no-checksum",
+    "cache-dir",
+    "wheelhouse",
+    "wheelhouse-workers",
+    "store",
+    "store-max-age",
+    "incremental",
+    "zip-incremental",
+    "zip-workers",
+    "artifact-cache",
+    "remote-cache",
+    "remote-cache-workers",
+    "dir-sync-mode",
+    "size-report",
+    "size-report-top",
+    "benchmark-runs",
+    "benchmark-top",
+    "benchmark-baseline",
+}
+# parameters which change the content of artifacts only with one of the options
+DEPENDENT_PARAMETERS = {"handler": ("tree-shake", "compile-bytecode")}
+TARGET_KINDS = ("layer", "function", "package")
+
+
+def get_plugin_version() -> str:
+    try:
+        return metadata.version("poetry-plugin-lambda-build")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def _is_excluded(path: str, exclude: list[str]) -> bool:
+    return any(fnmatch(path, pattern) for pattern in exclude)
+
+
+def iter_input_files(root: str, exclude: list[str]) -> Iterator[str]:
+    """
+    Yields paths of project files relative to root in a stable order,
+    skipping version control, virtual environments and caches.
+    """
+    for base_path, dirs, files in os.walk(root):
+        dirs[:] = sorted(
+            d
+            for d in dirs
+            if d not in IGNORED_DIRS
+            and not _is_excluded(os.path.join(base_path, d), exclude)
+        )
+        for file in sorted(files):
+            path = os.path.join(base_path, file)
+            if not _is_excluded(path, exclude):
+                yield os.path.relpath(path, root)
+
+
+def get_artifacts_exclude(root: str, parameters: dict) -> list[str]:
+    """
+    Returns patterns excluding artifacts of all targets and their
+    side files from project files.
+    """
+    exclude = []
+    for kind in TARGET_KINDS:
+        if parameters[f"{kind}-artifact-path"]:
+            artifact = os.path.join(root, parameters[f"{kind}-artifact-path"])
+            exclude += [artifact, os.path.join(artifact, "*"), artifact + ".*"]
+    return exclude
+
+
+def hash_tree(
+    root: str, exclude: list[str], known: dict[str, list]
+) -> tuple[str, dict[str, list]]:
+    """
+    Returns the digest of contents of project files and their size, mtime
+    and SHA-256. Files with the size and mtime of a known entry are not
+    read again.
+    """
+    m = hashlib.sha256()
+    hashes = {}
+    for name in iter_input_files(root, exclude):
+        path = os.path.join(root, name)
+        stat = os.stat(path)
+        entry = known.get(name)
+        if entry is not None and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+            sha256 = entry[2]
+        else:
+            sha256 = file_hash(path)
+        hashes[name] = [stat.st_size, stat.st_mtime_ns, sha256]
+        executable = int(bool(stat.st_mode & 0o111))
+        m.update(f"{name}\0{executable}\0{sha256}\n".encode())
+    return m.hexdigest(), hashes
+
+
+def get_fingerprint_parameters(kind: str, parameters: dict) -> dict:
+    """
+    Returns parameters affecting artifacts of the given kind.
+    """
+    others = tuple(f"{k}-" for k in TARGET_KINDS if k != kind)
+    unused = {
+        k
+        for k, options in DEPENDENT_PARAMETERS.items()
+        if not any(parameters.get(option) for option in options)
+    }
+    return {
+        k: v
+        for k, v in parameters.items()
+        if k not in OPERATIONAL_PARAMETERS
+        and k not in unused
+        and not k.startswith(others)
+    }
+
+
+def get_fingerprint(kind: str, parameters: dict, inputs: dict[str, str]) -> str:
+    """
+    Returns the fingerprint of all inputs of an artifact: its kind, the
+    plugin version, parameters and digests of the lock file, project files,
+    docker image or host environment.
+    """
+    data = {
+        "kind": kind,
+        "version": get_plugin_version(),
+        "parameters": get_fingerprint_parameters(kind, parameters),
+        "inputs": inputs,
+    }
+    return hashlib.sha256(
+        json.dumps(data, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def _stat_entry(path: str) -> str:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return "-"
+    return f"{stat.st_size}:{stat.st_mtime_ns}:{stat.st_mode}"
+
+
+def get_inputs_stamp(root: str, parameters: dict, python: str | None = None) -> str:
+    """
+    Returns a digest of the plugin version, parameters and the size, mtime
+    and mode of project files, computed without reading any file. The
+    interpreter of host builds is identified by the resolved path and stats
+    of python, as querying its platform tags would start it.
+    """
+    m = hashlib.sha256()
+    m.update(get_plugin_version().encode())
+    m.update(json.dumps(parameters, sort_keys=True, default=str).encode())
+    if python is not None:
+        python = os.path.realpath(python)
+        m.update(f"{python}\0{_stat_entry(python)}\n".encode())
+    for name in iter_input_files(root, get_artifacts_exclude(root, parameters)):
+        m.update(f"{name}\0{_stat_entry(os.path.join(root, name))}\n".encode())
+    return m.hexdigest()
+
+
+def get_targets_stamp(root: str, parameters: dict) -> str:
+    m = hashlib.sha256()
+    for kind in TARGET_KINDS:
+        if parameters[f"{kind}-artifact-path"]:
+            path = os.path.join(root, parameters[f"{kind}-artifact-path"])
+            m.update(f"{kind}\0{_stat_entry(path)}\n".encode())
+    return m.hexdigest()
+
+
+def read_fast_path(root: str) -> str | None:
+    try:
+        with open(os.path.join(root, STATE_DIR_NAME, FAST_PATH_FILE)) as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def write_fast_path(root: str, stamp: str) -> None:
+    os.makedirs(os.path.join(root, STATE_DIR_NAME), exist_ok=True)
+    with open(os.path.join(root, STATE_DIR_NAME, FAST_PATH_FILE), "w") as f:
+        f.write(stamp)
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import os
+import shutil
+import time
+from tempfile import mkdtemp
+
+from poetry_plugin_lambda_build.wheelhouse import file_hash
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+# ioctl request cloning file extents on btrfs, xfs and other CoW filesystems
+FICLONE = 0x40049409
+SYNC_MTIME = "mtime"
+SYNC_HASH = "hash"
+
+
+def reflink(src: str, dst: str) -> None:
+    if fcntl is None:
+        raise OSError("reflinks are not supported on this platform")
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            os.remove(dst)
+            raise
+    shutil.copystat(src, dst)
+
+
+def clone_file(src: str, dst: str, *, follow_symlinks: bool = True) -> str:
+    """
+    Copy function for shutil.copytree placing src at dst with a reflink,
+    a hardlink or, when neither is possible, a regular copy.
+    """
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        reflink(src, dst)
+        return dst
+    except OSError:
+        pass
+    try:
+        os.link(src, dst)
+        return dst
+    except OSError:
+        pass
+    return shutil.copy2(src, dst, follow_symlinks=follow_symlinks)
+
+
+def link_tree(src: str, dst: str) -> str:
+    """
+    Places files of src at dst with clone_file. Hardlinked files share
+    their inode with src, which may be the distribution store or a cache,
+    so files of linked trees are only ever unlinked or replaced, never
+    opened for writing.
+    """
+    return shutil.copytree(src, dst, copy_function=clone_file, dirs_exist_ok=True)
+
+
+def move_tree(src: str, dst: str) -> str:
+    """
+    Places the contents of the src directory at dst. A missing dst is
+    created by renaming src, leaving src empty. Across filesystems or into
+    an existing dst files are cloned with link_tree.
+    """
+    if not os.path.lexists(dst):
+        try:
+            os.rename(src, dst)
+        except OSError:
+            pass
+        else:
+            os.mkdir(src)
+            return dst
+    return link_tree(src, dst)
+
+
+def _is_unchanged(src: str, dst: str, mode: str) -> bool:
+    src_stat, dst_stat = os.stat(src), os.stat(dst)
+    if (src_stat.st_dev, src_stat.st_ino) == (dst_stat.st_dev, dst_stat.st_ino):
+        return True
+    if (src_stat.st_size, src_stat.st_mode) != (dst_stat.st_size, dst_stat.st_mode):
+        return False
+    if mode == SYNC_HASH:
+        return file_hash(src) == file_hash(dst)
+    return src_stat.st_mtime_ns == dst_stat.st_mtime_ns
+
+
+def _remove(path: str) -> int:
+    if os.path.isdir(path) and not os.path.islink(path):
+        count = sum(len(files) for _, _, files in os.walk(path))
+        shutil.rmtree(path)
+        return count
+    os.remove(path)
+    return 1
+
+
+def sync_tree(src: str, dst: str, mode: str = SYNC_HASH) -> dict[str, int]:
+    """
+    Makes the dst directory mirror src. New and changed files are placed
+    with clone_file, files missing from src are removed and unchanged ones
+    are left untouched. Files are compared by size and mtime, or by their
+    SHA-256 in hash mode. Returns numbers of files per outcome.
+    """
+    counts = dict.fromkeys(("added", "updated", "removed", "unchanged"), 0)
+    for root, _, files in os.walk(src):
+        dst_root = os.path.normpath(os.path.join(dst, os.path.relpath(root, src)))
+        if os.path.lexists(dst_root) and (
+            os.path.islink(dst_root) or not os.path.isdir(dst_root)
+        ):
+            counts["removed"] += _remove(dst_root)
+        os.makedirs(dst_root, exist_ok=True)
+        for name in files:
+            src_path = os.path.join(root, name)
+            dst_path = os.path.join(dst_root, name)
+            if os.path.isdir(dst_path) and not os.path.islink(dst_path):
+                counts["removed"] += _remove(dst_path)
+            if not os.path.lexists(dst_path):
+                counts["added"] += 1
+            elif _is_unchanged(src_path, dst_path, mode):
+                counts["unchanged"] += 1
+                continue
+            else:
+                counts["updated"] += 1
+            clone_file(src_path, dst_path)
+
+    for root, dirs, files in os.walk(dst):
+        src_root = os.path.join(src, os.path.relpath(root, dst))
+        for name in files:
+            if not os.path.lexists(os.path.join(src_root, name)):
+                counts["removed"] += _remove(os.path.join(root, name))
+        for name in list(dirs):
+            if not os.path.isdir(os.path.join(src_root, name)):
+                counts["removed"] += _remove(os.path.join(root, name))
+                dirs.remove(name)
+    return counts
+
+
+def remove_ignored(dir: str, patterns: list[str]) -> None:
+    """
+    Removes files and directories matching shutil.ignore_patterns.
+    """
+    ignore = shutil.ignore_patterns(*patterns)
+    for root, dirs, files in os.walk(dir):
+        for name in ignore(root, dirs + files):
+            path = os.path.join(root, name)
+            if name in dirs and not os.path.islink(path):
+                shutil.rmtree(path)
+                dirs.remove(name)
+            else:
+                os.remove(path)
+
+
+def remove_unused_entries(root: str, max_age: float) -> int:
+    """
+    Removes entries of a cache laid out as root/prefix/entry which were not
+    used for max_age seconds and returns their number.
+    """
+    threshold = time.time() - max_age
+    removed = 0
+    try:
+        prefixes = os.listdir(root)
+    except FileNotFoundError:
+        return 0
+    for prefix in prefixes:
+        prefix_dir = os.path.join(root, prefix)
+        if not os.path.isdir(prefix_dir):
+            continue
+        for entry in os.listdir(prefix_dir):
+            path = os.path.join(prefix_dir, entry)
+            if os.stat(path).st_mtime >= threshold:
+                continue
+            # entries are renamed first, so they are never seen partially removed
+            tmp_dir = mkdtemp(dir=prefix_dir, prefix=".tmp-")
+            try:
+                os.rename(path, os.path.join(tmp_dir, entry))
+            except OSError:
+                os.rmdir(tmp_dir)
+                continue
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            removed += 1
+    return removed
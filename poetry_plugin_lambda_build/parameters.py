@@ -1,10 +1,16 @@
 from __future__ import annotations
 
+import os
 import shlex
-from typing import Any
+from typing import Any, Callable
 
 from poetry.console.exceptions import PoetryConsoleError
 
+from poetry_plugin_lambda_build.commands import INSTALLERS
+from poetry_plugin_lambda_build.dedup import DEDUP_OFF, DEDUP_POLICIES
+from poetry_plugin_lambda_build.fs import SYNC_HASH, SYNC_MTIME
+from poetry_plugin_lambda_build.slim import PROFILE_DEFAULT, PROFILE_SLIM
+from poetry_plugin_lambda_build.targets import LAMBDA_ARCHITECTURES, LAMBDA_RUNTIMES
 from poetry_plugin_lambda_build.utils import remove_prefix
 
 
@@ -12,6 +18,21 @@ def comma_separated_collection(x: str) -> list[str]:
     return x.split(",")
 
 
+def comma_separated_ints(x: str) -> list[int]:
+    return [int(v) for v in str(x).split(",")]
+
+
+def choice(*choices: str) -> Callable[[str], str]:
+    def parser(x: str) -> str:
+        if x not in choices:
+            raise PoetryConsoleError(
+                f"<error>Error: Bad value: {x}, expected one of: {', '.join(choices)}</error>"
+            )
+        return x
+
+    return parser
+
+
 ARGS = {
     "docker-image": ("The image to run", True, False, None, str),
     "docker-entrypoint": (
@@ -125,7 +146,8 @@ ARGS = {
         int,
     ),
     "zip-compression": (
-        "ZIP_STORED (no compression), ZIP_DEFLATED (requires zlib), ZIP_BZIP2 (requires bz2) or ZIP_LZMA (requires lzma)",
+        "ZIP_STORED (no compression), ZIP_DEFLATED (requires zlib), ZIP_BZIP2 (requires bz2), ZIP_LZMA (requires lzma) "
+        "or auto (ZIP_STORED or ZIP_DEFLATED chosen per file)",
         True,
         False,
         "ZIP_STORED",
@@ -152,12 +174,261 @@ ARGS = {
         None,
         str,
     ),
+    "installer": (
+        "Installer backend used to install requirements: pip (default) or uv",
+        True,
+        False,
+        "pip",
+        choice(*INSTALLERS),
+    ),
+    "lambda-runtime": (
+        "Lambda runtime (ex. python3.12) to install binary wheels for when building on the host. "
+        "Requirements are installed with --platform, --python-version, --implementation and --only-binary=:all:",
+        True,
+        False,
+        None,
+        choice(*LAMBDA_RUNTIMES),
+    ),
+    "lambda-architecture": (
+        "Lambda architecture to install binary wheels for: x86_64 or arm64",
+        True,
+        False,
+        "x86_64",
+        choice(*LAMBDA_ARCHITECTURES),
+    ),
+    "cache-dir": (
+        "Root directory of the plugin caches",
+        True,
+        False,
+        os.path.join(os.path.expanduser("~"), ".cache", "poetry-plugin-lambda-build"),
+        str,
+    ),
+    "wheelhouse": (
+        "Local directory filled with locked artifacts, or URL of a local index. "
+        "Requirements are installed on the host from it with --no-index --find-links",
+        True,
+        False,
+        None,
+        str,
+    ),
+    "wheelhouse-workers": (
+        "Number of concurrent downloads used to fill the wheelhouse",
+        True,
+        False,
+        8,
+        int,
+    ),
+    "store-max-age": (
+        "Number of days after which entries not used by any build are removed from the store and the artifact cache",
+        True,
+        False,
+        30,
+        int,
+    ),
+    "zip-workers": (
+        "Number of threads compressing zip entries in parallel, the archive is identical to the one compressed serially",
+        True,
+        False,
+        None,
+        int,
+    ),
+    "zip-auto-ratio": (
+        "Highest ratio of compressed to original size of a file sample for which zip-compression=auto deflates the file",
+        True,
+        False,
+        0.9,
+        float,
+    ),
+    "zip-auto-sample-size": (
+        "Number of bytes from the beginning of a file compressed by zip-compression=auto to check its compressibility",
+        True,
+        False,
+        64 * 1024,
+        int,
+    ),
+    "remote-cache": (
+        "URL (http:// or https://) or shared directory of a remote artifact cache. "
+        "Artifacts are fetched from it before building and uploaded to it after building",
+        True,
+        False,
+        None,
+        str,
+    ),
+    "remote-cache-workers": (
+        "Number of concurrent transfers from and to the remote artifact cache",
+        True,
+        False,
+        4,
+        int,
+    ),
+    "dir-sync-mode": (
+        "How files of existing directory targets are compared to decide if they are rewritten: "
+        "hash (SHA-256, default) or mtime (size and modification time)",
+        True,
+        False,
+        SYNC_HASH,
+        choice(SYNC_HASH, SYNC_MTIME),
+    ),
+    "compile-optimize": (
+        "Optimization levels (comma separated integers, ex. 0,1) of bytecode compiled with compile-bytecode",
+        True,
+        False,
+        [0],
+        comma_separated_ints,
+    ),
+    "handler": (
+        "Handler of the function (ex. app.handler), used to report import times of its module, as the root of tree-shake and by build-lambda benchmark",
+        True,
+        False,
+        None,
+        str,
+    ),
+    "profile": (
+        "Packaging profile: default or slim (prune tests, docs, stubs and unused metadata and strip debug symbols of native libraries)",
+        True,
+        False,
+        PROFILE_DEFAULT,
+        choice(PROFILE_DEFAULT, PROFILE_SLIM),
+    ),
+    "slim-exclude": (
+        "Additional patterns of paths pruned by the slim profile (comma separated string) ex. */examples,*.md",
+        True,
+        False,
+        [],
+        comma_separated_collection,
+    ),
+    "slim-keep": (
+        "Patterns of paths kept by the slim profile even if they match its rules (comma separated string)",
+        True,
+        False,
+        [],
+        comma_separated_collection,
+    ),
+    "tree-shake-keep": (
+        "Patterns of modules kept by tree-shake together with modules they import (comma separated string) ex. app.*,botocore.*",
+        True,
+        False,
+        [],
+        comma_separated_collection,
+    ),
+    "benchmark-runs": (
+        "Number of cold imports of the handler module measured by build-lambda benchmark",
+        True,
+        False,
+        20,
+        int,
+    ),
+    "benchmark-top": (
+        "Number of the slowest modules reported by build-lambda benchmark",
+        True,
+        False,
+        10,
+        int,
+    ),
+    "benchmark-baseline": (
+        "Path of the benchmark report compared with the new one (default: the previous report)",
+        True,
+        False,
+        None,
+        str,
+    ),
+    "size-report-top": (
+        "Number of the largest files listed in size reports",
+        True,
+        False,
+        20,
+        int,
+    ),
+    "function-dedup": (
+        "Policy of dropping files of the function provided by the layer in separated builds: off, identical (drop packages identical in the layer), strict (as identical, fail on conflicts) or layer (drop all packages provided by the layer)",
+        True,
+        False,
+        DEDUP_OFF,
+        choice(*DEDUP_POLICIES),
+    ),
 }
 
 
 OPTS = {
     "no-checksum": ("Enable to suppress checksum checking", True, False, False, bool),
     "docker-network-disabled": ("Disable networking", True, False, None, bool),
+    "hybrid": (
+        "Install packages with binary wheels for lambda-runtime on the host and build only the remaining ones in docker-image",
+        True,
+        False,
+        False,
+        bool,
+    ),
+    "wheel-cache": (
+        "Cache wheels built in docker-image from source distributions during hybrid builds",
+        True,
+        False,
+        False,
+        bool,
+    ),
+    "incremental": (
+        "Update the previous layer artifact by installing and removing only changed packages",
+        True,
+        False,
+        False,
+        bool,
+    ),
+    "store": (
+        "Assemble layers from distributions installed once into a store under cache-dir shared between projects",
+        True,
+        False,
+        False,
+        bool,
+    ),
+    "zip-incremental": (
+        "Copy compressed entries of unchanged files from the previous zip artifact instead of compressing them again",
+        True,
+        False,
+        False,
+        bool,
+    ),
+    "zip-reproducible": (
+        "Write zip artifacts with sorted entries, normalized timestamps and permissions and a .code-sha256 file with the Lambda CodeSha256",
+        True,
+        False,
+        False,
+        bool,
+    ),
+    "artifact-cache": (
+        "Restore artifacts from a cache under cache-dir keyed by the fingerprint of all build inputs instead of building them",
+        True,
+        False,
+        False,
+        bool,
+    ),
+    "compile-bytecode": (
+        "Include bytecode compiled for the target interpreter, in docker-image when set, to speed up cold starts",
+        True,
+        False,
+        False,
+        bool,
+    ),
+    "tree-shake": (
+        "Remove modules not reachable in the static import graph of handler and tree-shake-keep modules",
+        True,
+        False,
+        False,
+        bool,
+    ),
+    "size-report": (
+        "Report sizes of created artifacts per distribution and top-level directory",
+        True,
+        False,
+        False,
+        bool,
+    ),
+    "tree-shake-force": (
+        "Remove modules unreachable by tree-shake even when reachable modules import modules by names computed at runtime, which then have to be listed in tree-shake-keep",
+        True,
+        False,
+        False,
+        bool,
+    ),
 }
 
 
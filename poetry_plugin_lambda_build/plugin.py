@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 from typing import Any
 
 from cleo.application import Application
@@ -7,8 +8,12 @@ from cleo.helpers import argument, option
 from poetry.console.commands.env_command import EnvCommand
 from poetry.plugins.application_plugin import ApplicationPlugin
 
+from poetry_plugin_lambda_build.fingerprint import (STATE_DIR_NAME,
+                                                    get_inputs_stamp,
+                                                    get_targets_stamp,
+                                                    read_fast_path,
+                                                    write_fast_path)
 from poetry_plugin_lambda_build.parameters import ParametersContainer
-from poetry_plugin_lambda_build.recipes import Builder
 
 
 class BuildLambdaCommand(EnvCommand):
@@ -42,7 +47,26 @@ class BuildLambdaCommand(EnvCommand):
 
     def handle(self) -> Any:
         parameters: ParametersContainer = self._get_parameters()
+        # stats of project files and artifacts are compared before the lock
+        # file is read or docker is contacted, the build is skipped when
+        # nothing changed since the last successful one
+        root = os.getcwd()
+        python = None
+        if not parameters["docker-image"] and not parameters["lambda-runtime"]:
+            # artifacts of host builds depend on the interpreter of the env
+            python = str(self.env.python)
+        inputs_stamp = get_inputs_stamp(root, parameters, python)
+        if not parameters["no-checksum"] and read_fast_path(root) == (
+            f"{inputs_stamp}:{get_targets_stamp(root, parameters)}"
+        ):
+            self.info("No changes detected")
+            self.line("\n✨ Done!")
+            return
+
+        from poetry_plugin_lambda_build.recipes import Builder
+
         Builder(self, parameters).build()
+        write_fast_path(root, f"{inputs_stamp}:{get_targets_stamp(root, parameters)}")
         self.line("\n✨ Done!")
 
     def info(self, txt: str):
@@ -58,10 +82,90 @@ class BuildLambdaCommand(EnvCommand):
         return self.line(txt, style="warning")
 
 
+class BenchmarkLambdaCommand(BuildLambdaCommand):
+    name = "build-lambda benchmark"
+    description = "Measure the cold import time of the handler in built artifacts"
+
+    def handle(self) -> Any:
+        parameters: ParametersContainer = self._get_parameters()
+
+        from poetry_plugin_lambda_build.benchmark import (BENCHMARKS_DIR,
+                                                          compare_reports,
+                                                          find_latest_report,
+                                                          format_report,
+                                                          load_report,
+                                                          run_benchmark,
+                                                          save_report)
+
+        reports_dir = os.path.join(os.getcwd(), STATE_DIR_NAME, BENCHMARKS_DIR)
+        baseline = parameters["benchmark-baseline"] or find_latest_report(reports_dir)
+        report = run_benchmark(self, parameters)
+        for line in format_report(report):
+            self.line(line)
+        if baseline:
+            for line in compare_reports(load_report(baseline), report):
+                self.line(line)
+        self.info(f"Report saved to {save_report(reports_dir, report)}")
+        self.line("\n✨ Done!")
+
+
+class SizeReportLambdaCommand(BuildLambdaCommand):
+    name = "build-lambda size-report"
+    description = "Report sizes of built artifacts per distribution"
+
+    def handle(self) -> Any:
+        parameters: ParametersContainer = self._get_parameters()
+
+        from poetry_plugin_lambda_build.sizes import (LAMBDA_UNZIPPED_LIMIT,
+                                                      format_bytes,
+                                                      format_size_report,
+                                                      get_report_kinds,
+                                                      write_size_report)
+
+        found, total = False, 0
+        for kind in get_report_kinds(parameters):
+            path = parameters[f"{kind}-artifact-path"]
+            if not path or not os.path.exists(path):
+                continue
+            report = write_size_report(
+                path,
+                parameters[f"{kind}-install-dir"],
+                parameters["size-report-top"],
+            )
+            for line in format_size_report(report):
+                self.line(line)
+            self.line("")
+            found, total = True, total + report["size"]
+        if not found:
+            self.warning("No artifacts were found, build them first")
+            return
+        self.info(f"Total unzipped size: {format_bytes(total)}")
+        if total > LAMBDA_UNZIPPED_LIMIT:
+            self.warning(
+                "Total unzipped size exceeds the Lambda limit of "
+                f"{format_bytes(LAMBDA_UNZIPPED_LIMIT)}"
+            )
+        self.line("\n✨ Done!")
+
+
 def factory() -> BuildLambdaCommand:
     return BuildLambdaCommand()
 
 
+def benchmark_factory() -> BenchmarkLambdaCommand:
+    return BenchmarkLambdaCommand()
+
+
+def size_report_factory() -> SizeReportLambdaCommand:
+    return SizeReportLambdaCommand()
+
+
 class LambdaPlugin(ApplicationPlugin):
     def activate(self, application: Application, *args: Any, **kwargs: Any) -> None:
         application.command_loader.register_factory("build-lambda", factory)
+        application.command_loader.register_factory(
+            "build-lambda benchmark", benchmark_factory
+        )
+        application.command_loader.register_factory(
+            "build-lambda size-report", size_report_factory
+        )
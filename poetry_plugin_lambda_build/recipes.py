@@ -1,32 +1,102 @@
 from __future__ import annotations
 
 import enum
+import hashlib
+import json
 import os
 import shutil
-import zipfile
+import subprocess
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 from tempfile import TemporaryDirectory
+from typing import TYPE_CHECKING
 
 from poetry.console.commands.command import Command
+from poetry.utils.authenticator import Authenticator
 
-from poetry_plugin_lambda_build.commands import (
-    INSTALL_CMD_TMPL, INSTALL_DEPS_CMD_IN_CONTAINER_TMPL,
-    INSTALL_DEPS_CMD_TMPL, INSTALL_IN_CONTAINER_CMD_TMPL,
-    INSTALL_IN_CONTAINER_NO_DEPS_CMD_TMPL, INSTALL_NO_DEPS_CMD_TMPL)
+from poetry_plugin_lambda_build.artifacts import ArtifactCache
+from poetry_plugin_lambda_build.bytecode import (COMPILE_BYTECODE_CMD_TMPL,
+                                                 IMPORT_TIME_CMD_TMPL,
+                                                 find_module,
+                                                 format_import_times,
+                                                 get_handler_module,
+                                                 get_optimize_args,
+                                                 merge_bytecode)
+from poetry_plugin_lambda_build.commands import get_installer_cmds
+from poetry_plugin_lambda_build.dedup import (DEDUP_OFF, DEDUP_STRICT,
+                                              find_duplicates,
+                                              get_manifest_digests,
+                                              get_tree_digests, get_zip_digests,
+                                              remove_entries, strip_install_dir)
+from poetry_plugin_lambda_build.dists import (diff_requirements,
+                                              get_file_owners,
+                                              uninstall_distribution)
 from poetry_plugin_lambda_build.docker import (copy_from_container,
                                                copy_to_container,
                                                exec_run_container,
+                                               get_image_digest,
                                                run_container)
+from poetry_plugin_lambda_build.fingerprint import (STATE_DIR_NAME, TARGET_KINDS,
+                                                    get_artifacts_exclude,
+                                                    get_fingerprint, hash_tree)
+from poetry_plugin_lambda_build.fs import (clone_file, link_tree, move_tree,
+                                            remove_ignored, sync_tree)
 from poetry_plugin_lambda_build.parameters import ParametersContainer
+from poetry_plugin_lambda_build.remote import (RemoteCache, RemoteCacheError,
+                                               get_backend)
 from poetry_plugin_lambda_build.requirements import RequirementsExporter
-from poetry_plugin_lambda_build.utils import (compute_checksum, format_cmd,
-                                              join_cmds, mask_string,
-                                              remove_suffix, run_cmds)
-from poetry_plugin_lambda_build.zip import create_zip_package
+from poetry_plugin_lambda_build.sizes import (LAMBDA_UNZIPPED_LIMIT,
+                                              SIZE_REPORT_SUFFIX, format_bytes,
+                                              format_size_report,
+                                              write_size_report)
+from poetry_plugin_lambda_build.slim import (PROFILE_SLIM, SLIM_RULES,
+                                             STRIP_CMD, get_package_savings,
+                                             get_pruned_files,
+                                             iter_native_libraries, prune_tree,
+                                             replace_if_smaller, strip_tree)
+from poetry_plugin_lambda_build.state import BuildState
+from poetry_plugin_lambda_build.store import DistributionStore
+from poetry_plugin_lambda_build.targets import (get_target_install_args,
+                                                get_target_python_version,
+                                                get_target_tags,
+                                                has_compatible_wheel)
+from poetry_plugin_lambda_build.treeshake import (TREE_SHAKE_REPORT_SUFFIX,
+                                                  shake_tree)
+from poetry_plugin_lambda_build.utils import (format_cmd, join_cmds,
+                                              mask_string, remove_suffix,
+                                              run_cmds)
+from poetry_plugin_lambda_build.wheelcache import (WheelCache, find_wheels,
+                                                   get_sdist_hash)
+from poetry_plugin_lambda_build.wheelhouse import (Wheelhouse, file_hash,
+                                                   fill_wheelhouse)
+from poetry_plugin_lambda_build.zip import (AUTO, CODE_SHA256_SUFFIX,
+                                            create_zip_package, extract_zip,
+                                            format_stats)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from docker.models.containers import Container
+    from poetry.core.packages.package import Package
 
 CONTAINER_CACHE_DIR = "/opt/lambda/cache"
 CONTAINER_WORK_DIR = "/opt/lambda/work"
+CONTAINER_BYTECODE_DIR = "/opt/lambda/bytecode"
+CONTAINER_STRIP_DIR = "/opt/lambda/strip"
 CURRENT_WORK_DIR = os.getcwd()
+STATE_DIR = os.path.join(CURRENT_WORK_DIR, STATE_DIR_NAME)
+LAYER_MANIFEST_PARAMETERS = (
+    "installer",
+    "lambda-runtime",
+    "lambda-architecture",
+    "docker-image",
+    "hybrid",
+    "pre-install-script",
+    "layer-install-dir",
+)
+
 
 class BuildLambdaPluginError(Exception):
     pass
@@ -35,6 +105,8 @@ class BuildLambdaPluginError(Exception):
 class BuildType(enum.Enum):
     IN_CONTAINER_MERGED = enum.auto()
     IN_CONTAINER_SEPARATED = enum.auto()
+    HYBRID_MERGED = enum.auto()
+    HYBRID_SEPARATED = enum.auto()
     MERGED = enum.auto()
     SEPARATED = enum.auto()
 
@@ -43,7 +115,12 @@ class BuildType(enum.Enum):
         layer = parameters.get("layer-artifact-path")
         function = parameters.get("function-artifact-path")
         container_img = parameters.get("docker-image")
-        if container_img:
+        if container_img and parameters.get("hybrid"):
+            if layer and function:
+                return cls.HYBRID_SEPARATED
+            else:
+                return cls.HYBRID_MERGED
+        elif container_img:
             if layer and function:
                 return cls.IN_CONTAINER_SEPARATED
             else:
@@ -54,13 +131,21 @@ class BuildType(enum.Enum):
             return cls.MERGED
 
 
-def get_requirements(cmd: Command, parameters: ParametersContainer) -> str:
+def get_requirements(
+    cmd: Command,
+    parameters: ParametersContainer,
+    package_filter: Callable[[Package], bool] | None = None,
+    with_hashes: bool = True,
+) -> str:
     groups = parameters.groups
     selected_groups = groups["only"] or groups["with"].difference(
         groups["without"])
-    return RequirementsExporter(
-        poetry=cmd.poetry, io=cmd.io, groups=selected_groups
-    ).export()
+    return (
+        RequirementsExporter(poetry=cmd.poetry, io=cmd.io, groups=selected_groups)
+        .with_package_filter(package_filter)
+        .with_hashes(with_hashes)
+        .export()
+    )
 
 
 def get_indexes(cmd: Command, parameters: ParametersContainer) -> str:
@@ -72,6 +157,26 @@ def get_indexes(cmd: Command, parameters: ParametersContainer) -> str:
     ).export_indexes()
 
 
+def get_packages(cmd: Command, parameters: ParametersContainer) -> list[Package]:
+    groups = parameters.groups
+    selected_groups = groups["only"] or groups["with"].difference(
+        groups["without"])
+    return RequirementsExporter(
+        poetry=cmd.poetry, io=cmd.io, groups=selected_groups
+    ).export_packages()
+
+
+def get_requirement_lines(
+    cmd: Command, parameters: ParametersContainer
+) -> dict[str, str]:
+    groups = parameters.groups
+    selected_groups = groups["only"] or groups["with"].difference(
+        groups["without"])
+    return RequirementsExporter(
+        poetry=cmd.poetry, io=cmd.io, groups=selected_groups
+    ).export_package_lines()
+
+
 def get_local_dependencies(cmd: Command, parameters: ParametersContainer) -> str:
     groups = parameters.groups
     selected_groups = groups["only"] or groups["with"].difference(
@@ -80,78 +185,76 @@ def get_local_dependencies(cmd: Command, parameters: ParametersContainer) -> str
         poetry=cmd.poetry, io=cmd.io, groups=selected_groups
     ).export_local_dependencies()
 
+def get_target_key(target: str) -> str:
+    return os.path.relpath(os.path.join(CURRENT_WORK_DIR, target), CURRENT_WORK_DIR)
+
+
+def get_state_parameters(parameters: ParametersContainer) -> tuple[dict, str]:
+    """
+    Returns parameters recorded in the build state, without the docker
+    environment which may hold secrets, and the digest of all of them.
+    """
+    digest = hashlib.sha256(
+        json.dumps(parameters, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    recorded = {k: v for k, v in parameters.items() if k != "docker-environment"}
+    return json.loads(json.dumps(recorded, default=str)), digest
+
+
 def verify_checksum(param):
     def decorator(fun):
         @wraps(fun)
         def wrapper(self: Builder, *args, **kwargs):
-            if self.parameters["no-checksum"]:
-                return fun(self, *args, **kwargs)
-
             target = self.parameters[param]
-            prefix = param.split("-", 1)[0]
-            install_dir = self.parameters[f"{prefix}-install-dir"]
-            is_zip = target.endswith(".zip")
-            try:
-                if is_zip:
-                    archive = zipfile.ZipFile(target, "r")
-                    prev_checksum = archive.read(
-                        os.path.join(install_dir, "checksum")
-                    ).decode()
-                else:
-                    prev_checksum = open(
-                        os.path.join(target, install_dir, "checksum")
-                    ).read()
-            except (FileNotFoundError, KeyError):
-                prev_checksum = None
-
-            if prefix == "layer":
-                curr_checksum = compute_checksum(
-                    os.path.join(CURRENT_WORK_DIR, "poetry.lock")
-                )
-            elif prefix == "function":
-                curr_checksum = compute_checksum(
-                    CURRENT_WORK_DIR,
-                    exclude=[
-                        os.path.join(CURRENT_WORK_DIR, target),
-                        os.path.join(CURRENT_WORK_DIR, target, "*"),
-                        os.path.join(CURRENT_WORK_DIR, "poetry.lock"),
-                    ],
-                )
-            else:
-                curr_checksum = compute_checksum(
-                    CURRENT_WORK_DIR,
-                    exclude=[
-                        os.path.join(CURRENT_WORK_DIR, target, "*"),
-                        os.path.join(CURRENT_WORK_DIR, target),
-                    ],
-                )
-            self.cmd.info("Checksum verification...")
-            self.cmd.info(f"Previous checksum = {prev_checksum}")
-            self.cmd.info(f"Current checksum = {curr_checksum}")
+            key = get_target_key(target)
+            path = os.path.join(CURRENT_WORK_DIR, target)
+            parameters, parameters_digest = get_state_parameters(self.parameters)
+            curr_checksum = self._get_fingerprint(param.split("-", 1)[0])
+            if not self.parameters["no-checksum"]:
+                prev_state = self.state.get_target(key) or {}
+                self.cmd.info("Checksum verification...")
+                self.cmd.info(f"Previous checksum = {prev_state.get('checksum')}")
+                self.cmd.info(f"Current checksum = {curr_checksum}")
 
-            if curr_checksum == prev_checksum:
-                self.cmd.info(f"No changes detected in target: {target}")
-                return
+                if curr_checksum == prev_state.get("checksum") and os.path.exists(
+                    path
+                ):
+                    self.cmd.info(f"No changes detected in target: {target}")
+                    self._report_missing_size(path)
+                    return
 
-            retval = fun(self, *args, **kwargs)
-            with TemporaryDirectory() as dir:
-                checksum_file_path = os.path.join(dir, "checksum")
-                with open(checksum_file_path, "w") as file:
-                    file.write(curr_checksum)
-
-                if is_zip:
-                    with zipfile.ZipFile(target, "a") as zipf:
-                        zipf.write(
-                            checksum_file_path, os.path.join(
-                                install_dir, "checksum")
+                if self.artifact_cache is not None:
+                    start = time.perf_counter()
+                    meta = self.artifact_cache.restore(curr_checksum, path)
+                    if meta is not None:
+                        self._restore_target(key, path, meta)
+                        self.state.put_target(
+                            key,
+                            checksum=curr_checksum,
+                            parameters=parameters,
+                            parameters_digest=parameters_digest,
+                            duration=time.perf_counter() - start,
                         )
-                else:
-                    shutil.copyfile(
-                        checksum_file_path,
-                        os.path.join(CURRENT_WORK_DIR, target,
-                                     install_dir, "checksum"),
-                    )
+                        self.cmd.info(f"Restored target from artifact cache: {target}")
+                        self._report_missing_size(path)
+                        return
 
+            start = time.perf_counter()
+            retval = fun(self, *args, **kwargs)
+            self.state.put_target(
+                key,
+                checksum=curr_checksum,
+                parameters=parameters,
+                parameters_digest=parameters_digest,
+                duration=time.perf_counter() - start,
+            )
+            if self.artifact_cache is not None:
+                self.artifact_cache.put(curr_checksum, path, self._target_meta(key))
+                self.artifact_cache.gc(self.parameters["store-max-age"] * 24 * 60 * 60)
+                if self._remote_executor is not None:
+                    self._transfers[target] = self._remote_executor.submit(
+                        self.remote_cache.upload, curr_checksum, self.artifact_cache
+                    )
             return retval
 
         return wrapper
@@ -171,6 +274,57 @@ class Builder:
             self.in_container = True
         else:
             self.in_container = False
+        self.hybrid = self._type in (
+            BuildType.HYBRID_SEPARATED,
+            BuildType.HYBRID_MERGED,
+        )
+        if self.hybrid and not parameters["lambda-runtime"]:
+            raise BuildLambdaPluginError(
+                "Hybrid build requires lambda-runtime to classify packages"
+            )
+        self.commands = get_installer_cmds(parameters["installer"])
+        if (
+            not self.in_container
+            and parameters["installer"] == "uv"
+            and shutil.which("uv") is None
+        ):
+            raise BuildLambdaPluginError(
+                "Installer uv was not found on the host, install it or"
+                " provide docker-image to build in container"
+            )
+        if parameters["wheel-cache"] and not self.hybrid:
+            cmd.warning("wheel-cache is used only by hybrid builds")
+        if parameters["incremental"] and parameters["tree-shake"]:
+            cmd.warning("incremental is not used with tree-shake")
+        if parameters["tree-shake"] and parameters["function-dedup"] != DEDUP_OFF:
+            cmd.warning(
+                "tree-shake does not remove modules of layers with function-dedup"
+            )
+        runtime = parameters["lambda-runtime"]
+        if runtime and not self.in_container:
+            self.target_install_args = get_target_install_args(
+                parameters["installer"], runtime, parameters["lambda-architecture"]
+            )
+        else:
+            self.target_install_args = []
+        self._state = None
+        self.artifact_cache = None
+        self.remote_cache = None
+        # the remote cache is fetched into and uploaded from the local one
+        if parameters["artifact-cache"] or parameters["remote-cache"]:
+            self.artifact_cache = ArtifactCache(
+                os.path.join(parameters["cache-dir"], "artifacts")
+            )
+        if parameters["remote-cache"]:
+            self.remote_cache = RemoteCache(get_backend(parameters["remote-cache"]))
+        self._remote_executor = None
+        self._transfers = {}
+        self._fingerprints = {}
+        self.wheelhouse = None
+        if parameters["wheelhouse"] and not self.in_container:
+            self.wheelhouse = parameters["wheelhouse"]
+            if not urllib.parse.urlsplit(self.wheelhouse).scheme:
+                self.wheelhouse = os.path.join(CURRENT_WORK_DIR, self.wheelhouse)
 
     def format_cmd(self, string: str, **kwargs) -> tuple[list[str], str]:
         indexes = get_indexes(self.cmd, self.parameters)
@@ -191,7 +345,10 @@ class Builder:
         return cmd, print_safe_cmd
 
     def _build_separate_layer_in_container(
-        self, requirements_path: str, layer_output_dir: str
+        self,
+        requirements_path: str,
+        layer_output_dir: str,
+        cmd_name: str = "deps_in_container",
     ):
         self.cmd.info("Running docker container...")
         with run_container(
@@ -209,7 +366,7 @@ class Builder:
 
             install_deps_cmd_in_container_tmpl = join_cmds(
                 self.parameters.get("pre-install-script"),
-                INSTALL_DEPS_CMD_IN_CONTAINER_TMPL,
+                self.commands[cmd_name],
             )
             cmd, print_safe_cmd = self.format_cmd(
                 install_deps_cmd_in_container_tmpl,
@@ -230,62 +387,721 @@ class Builder:
             )
 
     def _create_target(self, dir: str, target: str, exclude: None | list = None):
+        self._prepare_tree(dir, target)
+        if self.parameters["compile-bytecode"] and exclude is None:
+            # zip artifacts exclude bytecode by default
+            exclude = []
         if target.endswith(".zip"):
-            create_zip_package(
+            key = get_target_key(target)
+            result = create_zip_package(
                 dir=dir,
                 output=target,
                 exclude=exclude,
+                manifest=self.state.get_files(key) or None,
                 **self.parameters.get_section("zip"),
             )
+            self.state.put_files(key, result["manifest"])
+            self.state.put_target(
+                key, digest=result["digest"], code_sha256=result.get("code_sha256")
+            )
+            self.cmd.info(f"Artifact tree digest: {result['digest']}")
+            if self.parameters["zip-compression"] == AUTO:
+                self.cmd.info(f"Auto compression: {format_stats(result['methods'])}")
         else:
-            shutil.copytree(
+            # the staging directory is discarded, so its files are moved
+            # into place
+            if exclude:
+                remove_ignored(dir, exclude)
+            if os.path.isdir(target):
+                counts = sync_tree(dir, target, self.parameters["dir-sync-mode"])
+                self.cmd.info(
+                    "Synchronized target: "
+                    + ", ".join(f"{count} {k}" for k, count in counts.items())
+                )
+            else:
+                move_tree(dir, target)
+        if self.parameters["size-report"]:
+            self._report_size(target)
+
+    def _report_size(self, target: str):
+        kind = self._get_target_kind(target)
+        report = write_size_report(
+            target,
+            self.parameters[f"{kind}-install-dir"],
+            self.parameters["size-report-top"],
+        )
+        for line in format_size_report(report):
+            self.cmd.info(line)
+        if report["size"] > LAMBDA_UNZIPPED_LIMIT:
+            self.cmd.warning(
+                f"Unzipped size of {target} exceeds the Lambda limit of "
+                f"{format_bytes(LAMBDA_UNZIPPED_LIMIT)}"
+            )
+
+    def _report_missing_size(self, target: str):
+        # size-report is not a part of fingerprints, so a target which was
+        # not built may have no report
+        if self.parameters["size-report"] and not os.path.exists(
+            target + SIZE_REPORT_SUFFIX
+        ):
+            self._report_size(target)
+
+    def _get_target_kind(self, target: str) -> str:
+        for kind in TARGET_KINDS:
+            path = self.parameters[f"{kind}-artifact-path"]
+            if path and os.path.join(CURRENT_WORK_DIR, path) == target:
+                return kind
+        raise BuildLambdaPluginError(f"Unknown target: {target}")
+
+    def _get_function_tree(self, tmp_dir: str) -> str | None:
+        target = os.path.join(
+            CURRENT_WORK_DIR, self.parameters["function-artifact-path"] or ""
+        )
+        if not os.path.exists(target):
+            return None
+        if target.endswith(".zip"):
+            extract_zip(target, os.path.join(tmp_dir, "function"))
+            target = os.path.join(tmp_dir, "function")
+        return os.path.join(target, self.parameters["function-install-dir"] or "")
+
+    def _tree_shake(self, dir: str, target: str):
+        """
+        Removes modules unreachable from the handler and writes the
+        reachability report next to the target. Layers are analysed
+        together with the function artifact, which is built first.
+        """
+        if not self.parameters["handler"]:
+            self.cmd.warning("tree-shake requires handler, modules were not removed")
+            return
+        kind = self._get_target_kind(target)
+        if kind == "layer" and self.parameters["function-dedup"] != DEDUP_OFF:
+            # the layer is built before the function
+            return
+        # modules are imported from the install directory of the artifact
+        site_dir = os.path.join(dir, self.parameters[f"{kind}-install-dir"] or "")
+        with TemporaryDirectory() as tmp_dir:
+            roots = [site_dir]
+            if kind == "layer":
+                function_dir = self._get_function_tree(tmp_dir)
+                if function_dir is None:
+                    self.cmd.warning(
+                        "Function artifact was not found,"
+                        " layer modules were not removed"
+                    )
+                    return
+                roots.insert(0, function_dir)
+            report = shake_tree(
+                roots,
+                site_dir,
+                [get_handler_module(self.parameters["handler"])],
+                self.parameters["tree-shake-keep"],
+                self.parameters["tree-shake-force"],
+            )
+        with open(target + TREE_SHAKE_REPORT_SUFFIX, "w") as f:
+            json.dump(report, f, indent=2)
+        if report["unresolved"] and not self.parameters["tree-shake-force"]:
+            self.cmd.warning(
+                f"Tree shaking found {len(report['unreachable'])} unreachable "
+                "modules but did not remove them, modules are imported by names "
+                f"computed at runtime in: {', '.join(report['unresolved'])}. "
+                "List modules loaded by name in tree-shake-keep and enable "
+                "tree-shake-force to remove them"
+            )
+        self.cmd.info(
+            f"Tree shaking removed {len(report['removed'])} modules "
+            f"({report['removed_bytes']} bytes), {len(report['escapes'])} modules "
+            f"with dynamic imports, report: {target + TREE_SHAKE_REPORT_SUFFIX}"
+        )
+
+    def _prepare_tree(self, dir: str, target: str):
+        """
+        Runs the packaging stages between installation and archiving.
+        """
+        if self.parameters["tree-shake"]:
+            self._tree_shake(dir, target)
+        if self.parameters["profile"] == PROFILE_SLIM:
+            self._slim(dir)
+        if self.parameters["compile-bytecode"]:
+            self._compile_bytecode(dir)
+
+    def _strip_in_container(self, dir: str, libraries: list[str]) -> dict[str, int]:
+        with TemporaryDirectory() as tmp_dir:
+            libraries_dir = os.path.join(tmp_dir, "libraries")
+            for path in libraries:
+                os.makedirs(
+                    os.path.dirname(os.path.join(libraries_dir, path)), exist_ok=True
+                )
+                clone_file(os.path.join(dir, path), os.path.join(libraries_dir, path))
+            self.cmd.info("Running docker container...")
+            with run_container(
+                self.cmd, **self.parameters.get_section("docker"),
+                working_dir=CONTAINER_WORK_DIR
+            ) as container:
+                path = f"{CONTAINER_STRIP_DIR}/libraries"
+                copy_to_container(src=libraries_dir, dst=f"{container.id}:{path}")
+                exit_code, output = container.exec_run(
+                    ["find", path, "-type", "f", "-exec", *STRIP_CMD, "{}", ";"]
+                )
+                if exit_code:
+                    self.cmd.debug(output.decode())
+                stripped_dir = os.path.join(tmp_dir, "stripped")
+                copy_from_container(src=f"{container.id}:{path}", dst=stripped_dir)
+            return {
+                os.path.join(dir, path): replace_if_smaller(
+                    os.path.join(dir, path),
+                    os.path.join(stripped_dir, "libraries", path),
+                )
+                for path in libraries
+            }
+
+    def _slim(self, dir: str):
+        """
+        Prunes files not needed at runtime and strips debug symbols of
+        native libraries, in docker-image when it is set.
+        """
+        dir = os.path.normpath(dir)
+        owners = get_file_owners(dir)
+        pruned = prune_tree(
+            dir,
+            get_pruned_files(
                 dir,
-                target,
-                dirs_exist_ok=True,
-                ignore=shutil.ignore_patterns(*exclude) if exclude else None,
+                SLIM_RULES + self.parameters["slim-exclude"],
+                self.parameters["slim-keep"],
+            ),
+        )
+        libraries = list(iter_native_libraries(dir, self.parameters["slim-keep"]))
+        stripped = {}
+        if libraries and self.parameters["docker-image"]:
+            stripped = self._strip_in_container(dir, libraries)
+        elif libraries and shutil.which(STRIP_CMD[0]) is None:
+            self.cmd.warning(f"{STRIP_CMD[0]} was not found, libraries were not stripped")
+        elif libraries:
+            stripped = strip_tree(dir, libraries)
+
+        packages = get_package_savings(owners, pruned, stripped)
+        self.cmd.info(
+            f"Slim profile removed {sum(packages.values())} bytes: "
+            f"{len(pruned)} files pruned, "
+            f"{sum(1 for saved in stripped.values() if saved)} libraries stripped"
+        )
+        for name, saved in packages.items():
+            if saved:
+                self.cmd.info(f"  {name}: {saved} bytes")
+
+    def _exec_python(
+        self, container: Container | None, cmd: list[str], env: dict | None = None
+    ) -> tuple[int, str]:
+        """
+        Runs a python command with the target interpreter, in the container
+        or in the project environment, and returns its exit code and output.
+        """
+        env = {"PYTHONDONTWRITEBYTECODE": "1", **(env or {})}
+        if container is None:
+            process = subprocess.run(
+                ["poetry", "run", *cmd],
+                capture_output=True,
+                text=True,
+                env={**os.environ, **env},
+                cwd=CURRENT_WORK_DIR,
+            )
+            return process.returncode, process.stdout + process.stderr
+        exit_code, output = container.exec_run(
+            cmd, environment=env, workdir=CONTAINER_WORK_DIR
+        )
+        return exit_code, output.decode()
+
+    def _measure_import(
+        self, container: Container | None, dir: str, module: str
+    ) -> float | None:
+        cmd = format_cmd(IMPORT_TIME_CMD_TMPL, output_dir=dir, module=module)
+        exit_code, output = self._exec_python(container, cmd)
+        if exit_code:
+            self.cmd.warning(f"Import of {module} failed: {output.strip()}")
+            return None
+        return float(output.strip().splitlines()[-1])
+
+    def _compile_tree(self, container: Container | None, dir: str, module: str | None):
+        source_time = module and self._measure_import(container, dir, module)
+        self.cmd.info("Compiling bytecode...")
+        cmd = format_cmd(
+            COMPILE_BYTECODE_CMD_TMPL,
+            optimize=get_optimize_args(self.parameters["compile-optimize"]),
+            output_dir=dir,
+        )
+        exit_code, output = self._exec_python(container, cmd)
+        if exit_code:
+            # modules which are not valid for the target interpreter are
+            # left without bytecode
+            self.cmd.warning(f"Some modules were not compiled: {output.strip()}")
+        bytecode_time = module and self._measure_import(container, dir, module)
+        if source_time and bytecode_time:
+            self.cmd.info(format_import_times(module, source_time, bytecode_time))
+
+    def _compile_bytecode(self, dir: str):
+        """
+        Replaces bytecode written by installers, possibly for another
+        interpreter, with unchecked-hash pycs compiled for the target one.
+        """
+        dir = os.path.normpath(dir)
+        remove_ignored(dir, ["__pycache__"])
+        module = None
+        if self.parameters["handler"]:
+            module = get_handler_module(self.parameters["handler"])
+            if find_module(dir, module) is None:
+                module = None
+
+        if self.parameters["docker-image"]:
+            self.cmd.info("Running docker container...")
+            with run_container(
+                self.cmd, **self.parameters.get_section("docker"),
+                working_dir=CONTAINER_WORK_DIR
+            ) as container, TemporaryDirectory() as tmp_dir:
+                path = f"{CONTAINER_BYTECODE_DIR}/{os.path.basename(dir)}"
+                copy_to_container(src=dir, dst=f"{container.id}:{path}")
+                self._compile_tree(container, path, module)
+                copy_from_container(src=f"{container.id}:{path}", dst=tmp_dir)
+                merge_bytecode(os.path.join(tmp_dir, os.path.basename(dir)), dir)
+            return
+
+        runtime = self.parameters["lambda-runtime"]
+        if runtime and tuple(
+            self.cmd.env.version_info[:2]
+        ) != get_target_python_version(runtime):
+            self.cmd.warning(
+                f"Bytecode was not compiled, the project environment is not {runtime}"
+            )
+            return
+        self._compile_tree(None, dir, module)
+
+    def _staging_dir(self, target: str) -> TemporaryDirectory:
+        """
+        Returns the temporary directory the target is built in. Directory
+        targets are staged under the state directory, usually on their
+        filesystem, so they are moved into place by a rename.
+        """
+        if target.endswith(".zip"):
+            return TemporaryDirectory()
+        staging_dir = os.path.join(STATE_DIR, "tmp")
+        os.makedirs(staging_dir, exist_ok=True)
+        return TemporaryDirectory(dir=staging_dir)
+
+    def _deps_install_args(self, find_links: list[str] | None = None) -> list[str]:
+        links = list(find_links or [])
+        if self.wheelhouse:
+            links.append(self.wheelhouse)
+        args = ["--no-index"] if links else []
+        for link in links:
+            args += ["--find-links", link]
+        if find_links:
+            args += get_target_install_args(
+                self.parameters["installer"],
+                self.parameters["lambda-runtime"],
+                self.parameters["lambda-architecture"],
+                local_wheels=True,
+            )
+        else:
+            args += self.target_install_args
+        return args
+
+    def _fill_wheelhouse(self):
+        if not self.wheelhouse or urllib.parse.urlsplit(self.wheelhouse).scheme:
+            return
+        if self.parameters["lambda-runtime"]:
+            tags = get_target_tags(
+                self.parameters["lambda-runtime"],
+                self.parameters["lambda-architecture"],
             )
+        else:
+            tags = set(self.cmd.env.supported_tags)
+        self.cmd.info(f"Filling wheelhouse {self.wheelhouse}...")
+        workers = self.parameters["wheelhouse-workers"]
+        fetched, reused = fill_wheelhouse(
+            Wheelhouse(self.wheelhouse),
+            get_packages(self.cmd, self.parameters),
+            tags,
+            self.cmd.poetry.pool,
+            Authenticator(self.cmd.poetry.config, self.cmd.io, pool_size=workers),
+            max_workers=workers,
+        )
+        self.cmd.info(f"Wheelhouse files fetched: {fetched}, reused: {reused}")
 
     def _build_separate_layer_on_local(
-        self, requirements_path: str, layer_output_dir: str
+        self,
+        requirements_path: str,
+        layer_output_dir: str,
+        no_deps: bool = False,
+        find_links: list[str] | None = None,
     ):
         self.cmd.info("Installing requirements")
         cmd, print_safe_cmd = self.format_cmd(
-            INSTALL_DEPS_CMD_TMPL,
+            self.commands["deps_no_deps" if no_deps else "deps"]
+            + self._deps_install_args(find_links),
             output_dir=layer_output_dir,
             requirements=requirements_path,
         )
 
         run_cmds(cmds=cmd, print_safe_cmds=print_safe_cmd, logger=self.cmd)
 
+    def _build_separate_layer_hybrid(
+        self,
+        requirements_dir: str,
+        layer_output_dir: str,
+        package_filter: Callable[[Package], bool] | None = None,
+    ):
+        tags = get_target_tags(
+            self.parameters["lambda-runtime"], self.parameters["lambda-architecture"]
+        )
+        source_packages: dict[str, Package] = {}
+
+        def is_selected(package: Package) -> bool:
+            return package_filter is None or package_filter(package)
+
+        def is_binary(package: Package) -> bool:
+            return is_selected(package) and has_compatible_wheel(package.files, tags)
+
+        def needs_build(package: Package) -> bool:
+            if not is_selected(package) or is_binary(package):
+                return False
+            source_packages[package.name] = package
+            return True
+
+        binary_requirements_path = os.path.join(
+            requirements_dir, "requirements-binary.txt"
+        )
+        source_requirements_path = os.path.join(
+            requirements_dir, "requirements-source.txt"
+        )
+        binary_requirements = get_requirements(self.cmd, self.parameters, is_binary)
+        source_requirements = get_requirements(
+            self.cmd, self.parameters, needs_build
+        )
+        with open(binary_requirements_path, "w") as f:
+            f.write(binary_requirements)
+        with open(source_requirements_path, "w") as f:
+            f.write(source_requirements)
+
+        if binary_requirements.strip():
+            self._build_separate_layer_on_local(
+                binary_requirements_path, layer_output_dir, no_deps=True
+            )
+        if not source_requirements.strip():
+            return
+        if self.parameters["wheel-cache"]:
+            self._build_source_packages_with_wheel_cache(
+                source_packages, requirements_dir, layer_output_dir
+            )
+        else:
+            self.cmd.info(
+                "Building in container: "
+                + ", ".join(p.pretty_name for p in source_packages.values())
+            )
+            self._build_separate_layer_in_container(
+                source_requirements_path,
+                layer_output_dir,
+                cmd_name="deps_in_container_no_deps",
+            )
+
+    def _build_source_packages_with_wheel_cache(
+        self, packages: dict[str, Package], requirements_dir: str, layer_output_dir: str
+    ):
+        wheel_cache = WheelCache(
+            os.path.join(self.parameters["cache-dir"], "wheels"),
+            get_image_digest(self.parameters["docker-image"]),
+            self.parameters["pre-install-script"],
+        )
+        sdist_hashes = {
+            name: get_sdist_hash(package.files) for name, package in packages.items()
+        }
+        uncacheable = {name for name, h in sdist_hashes.items() if h is None}
+        missing = {
+            name
+            for name, h in sdist_hashes.items()
+            if h is not None and wheel_cache.get(h) is None
+        }
+        cached = set(packages) - uncacheable - missing
+        self.cmd.info(
+            f"Wheel cache hits: {', '.join(sorted(cached)) or '-'}, "
+            f"misses: {', '.join(sorted(missing)) or '-'}"
+        )
+
+        if missing:
+            missing_path = os.path.join(requirements_dir, "requirements-wheels.txt")
+            with open(missing_path, "w") as f:
+                f.write(
+                    get_requirements(
+                        self.cmd, self.parameters, lambda p: p.name in missing
+                    )
+                )
+            wheel_dir = os.path.join(requirements_dir, "wheels")
+            os.makedirs(wheel_dir, exist_ok=True)
+            self.cmd.info(f"Building wheels in container: {', '.join(sorted(missing))}")
+            self._build_separate_layer_in_container(
+                missing_path, wheel_dir, cmd_name="wheels_in_container"
+            )
+            for name in missing:
+                package = packages[name]
+                wheels = find_wheels(wheel_dir, name, str(package.version))
+                if not wheels:
+                    raise BuildLambdaPluginError(
+                        f"No wheel was built for {package.pretty_name}"
+                    )
+                wheel_cache.put(sdist_hashes[name], wheels)
+
+        cacheable = set(packages) - uncacheable
+        if cacheable:
+            cached_requirements_path = os.path.join(
+                requirements_dir, "requirements-cached.txt"
+            )
+            with open(cached_requirements_path, "w") as f:
+                f.write(
+                    get_requirements(
+                        self.cmd,
+                        self.parameters,
+                        lambda p: p.name in cacheable,
+                        with_hashes=False,
+                    )
+                )
+            self._build_separate_layer_on_local(
+                cached_requirements_path,
+                layer_output_dir,
+                no_deps=True,
+                find_links=[wheel_cache.get(sdist_hashes[n]) for n in sorted(cacheable)],
+            )
+        if uncacheable:
+            uncacheable_path = os.path.join(
+                requirements_dir, "requirements-uncacheable.txt"
+            )
+            with open(uncacheable_path, "w") as f:
+                f.write(
+                    get_requirements(
+                        self.cmd, self.parameters, lambda p: p.name in uncacheable
+                    )
+                )
+            self.cmd.info(f"Building in container: {', '.join(sorted(uncacheable))}")
+            self._build_separate_layer_in_container(
+                uncacheable_path,
+                layer_output_dir,
+                cmd_name="deps_in_container_no_deps",
+            )
+
+    def _install_layer_requirements(
+        self,
+        requirements_dir: str,
+        layer_output_dir: str,
+        package_filter: Callable[[Package], bool] | None = None,
+    ):
+        if self.hybrid:
+            self._build_separate_layer_hybrid(
+                requirements_dir, layer_output_dir, package_filter
+            )
+            return
+
+        requirements_path = os.path.join(requirements_dir, "requirements.txt")
+        with open(requirements_path, "w") as f:
+            f.write(get_requirements(self.cmd, self.parameters, package_filter))
+
+        # a subset of the locked packages is installed without its dependencies
+        no_deps = package_filter is not None
+        if self.in_container:
+            self._build_separate_layer_in_container(
+                requirements_path,
+                layer_output_dir,
+                cmd_name="deps_in_container_no_deps" if no_deps else "deps_in_container",
+            )
+        else:
+            self._build_separate_layer_on_local(
+                requirements_path, layer_output_dir, no_deps=no_deps
+            )
+
+    def _distribution_store(self) -> DistributionStore:
+        environment = {
+            k: self.parameters[k]
+            for k in LAYER_MANIFEST_PARAMETERS
+            if k != "layer-install-dir"
+        }
+        if self.in_container or self.hybrid:
+            environment["docker-image"] = get_image_digest(
+                self.parameters["docker-image"]
+            )
+        if not self.in_container and not self.parameters["lambda-runtime"]:
+            environment["platform"] = str(self.cmd.env.supported_tags[0])
+        return DistributionStore(
+            os.path.join(self.parameters["cache-dir"], "store"),
+            json.dumps(environment, sort_keys=True),
+        )
+
+    def _install_layer_from_store(
+        self, requirements_dir: str, layer_output_dir: str, requirements: dict[str, str]
+    ):
+        store = self._distribution_store()
+        missing = {
+            name for name, line in requirements.items() if store.get(line) is None
+        }
+        self.cmd.info(
+            f"Store hits: {len(requirements) - len(missing)}, "
+            f"misses: {', '.join(sorted(missing)) or '-'}"
+        )
+        if missing:
+            staging_dir = os.path.join(requirements_dir, "store-staging")
+            os.makedirs(staging_dir)
+            self._install_layer_requirements(
+                requirements_dir, staging_dir, lambda package: package.name in missing
+            )
+            for name in sorted(missing):
+                if store.put(requirements[name], staging_dir, name) is None:
+                    self.cmd.warning(f"{name} was not found in RECORD files, not stored")
+            # files not recorded by any distribution are kept as they are
+            link_tree(staging_dir, layer_output_dir)
+
+        self.cmd.info("Linking distributions from store...")
+        for name in sorted(requirements):
+            path = store.get(requirements[name])
+            if path is not None:
+                link_tree(path, layer_output_dir)
+
+        removed = store.gc(self.parameters["store-max-age"] * 24 * 60 * 60)
+        if removed:
+            self.cmd.info(f"Removed {removed} unused distributions from store")
+
+    @property
+    def state(self) -> BuildState:
+        if self._state is None:
+            self._state = BuildState(os.path.join(STATE_DIR, "state.sqlite"))
+        return self._state
+
+    def _get_fingerprint(self, kind: str) -> str:
+        """
+        Returns the fingerprint of all inputs of the target of the given kind.
+        """
+        if kind not in self._fingerprints:
+            self._fingerprints[kind] = self._compute_fingerprint(kind)
+        return self._fingerprints[kind]
+
+    def _compute_fingerprint(self, kind: str) -> str:
+        inputs = {}
+        lock = os.path.join(CURRENT_WORK_DIR, "poetry.lock")
+        if kind != "function" and os.path.exists(lock):
+            inputs["poetry.lock"] = file_hash(lock)
+        # tree shaking of layers depends on the function code
+        if kind != "layer" or self.parameters["tree-shake"]:
+            exclude = get_artifacts_exclude(CURRENT_WORK_DIR, self.parameters)
+            if kind == "function":
+                exclude.append(lock)
+            inputs["files"], hashes = hash_tree(
+                CURRENT_WORK_DIR, exclude, self.state.get_inputs()
+            )
+            self.state.put_inputs(hashes)
+        if kind == "function" and self.parameters["function-dedup"] != DEDUP_OFF:
+            inputs["layer"] = self._get_fingerprint("layer")
+        if self.parameters["docker-image"]:
+            inputs["docker-image"] = get_image_digest(self.parameters["docker-image"])
+        if not self.in_container and not self.parameters["lambda-runtime"]:
+            inputs["platform"] = str(self.cmd.env.supported_tags[0])
+        return get_fingerprint(kind, self.parameters, inputs)
+
+    def _target_meta(self, key: str) -> dict:
+        return {
+            "target": self.state.get_target(key),
+            "files": self.state.get_files(key),
+            "packages": self.state.get_packages(key),
+        }
+
+    def _restore_target(self, key: str, path: str, meta: dict):
+        target = meta["target"] or {}
+        self.state.put_target(
+            key, digest=target.get("digest"), code_sha256=target.get("code_sha256")
+        )
+        self.state.put_files(key, meta["files"])
+        self.state.put_packages(key, meta["packages"])
+        if target.get("code_sha256"):
+            with open(path + CODE_SHA256_SUFFIX, "w") as f:
+                f.write(target["code_sha256"])
+
+    def _read_layer_packages(self, target: str) -> dict[str, str] | None:
+        """
+        Returns packages of the previous layer if it exists and was built
+        with the same installation parameters.
+        """
+        key = get_target_key(target)
+        prev_state = self.state.get_target(key)
+        if prev_state is None or not os.path.exists(target):
+            return None
+        parameters, _ = get_state_parameters(self.parameters)
+        for k in LAYER_MANIFEST_PARAMETERS:
+            if (prev_state["parameters"] or {}).get(k) != parameters[k]:
+                return None
+        return self.state.get_packages(key)
+
+    def _update_separate_layer(self, target: str, requirements: dict[str, str]) -> bool:
+        install_dir = self.parameters.get("layer-install-dir", "")
+        packages = self._read_layer_packages(target)
+        if packages is None:
+            self.cmd.info("No compatible previous layer found, building from scratch")
+            return False
+
+        removed, added = diff_requirements(packages, requirements)
+        self.cmd.info(
+            f"Updating layer incrementally, removing: {', '.join(removed) or '-'}, "
+            f"installing: {', '.join(added) or '-'}"
+        )
+        with TemporaryDirectory() as tmp_dir:
+            if target.endswith(".zip"):
+                root = os.path.join(tmp_dir, "layer-output")
+                extract_zip(target, root)
+            else:
+                root = target
+            site_dir = os.path.join(root, install_dir)
+            for name in removed:
+                uninstall_distribution(site_dir, name)
+            if added:
+                added_dir = os.path.join(tmp_dir, "added")
+                os.makedirs(added_dir)
+                self._install_layer_requirements(
+                    tmp_dir, added_dir, lambda package: package.name in added
+                )
+                link_tree(added_dir, site_dir)
+
+            if target.endswith(".zip"):
+                self._create_target(
+                    dir=root,
+                    target=target,
+                    exclude=[os.path.join(tmp_dir, "requirements.txt")],
+                )
+            else:
+                self._prepare_tree(root, target)
+        self.state.put_packages(get_target_key(target), requirements)
+        return True
+
     @verify_checksum("layer-artifact-path")
     def build_separate_layer_package(self):
         self.cmd.info("Building separate layer package...")
-        with TemporaryDirectory() as tmp_dir:
+        self._fill_wheelhouse()
+        target = os.path.join(
+            CURRENT_WORK_DIR, self.parameters.get("layer-artifact-path", "")
+        )
+        requirements = get_requirement_lines(self.cmd, self.parameters)
+        if (
+            self.parameters["incremental"]
+            and not self.parameters["tree-shake"]
+            and self._update_separate_layer(target, requirements)
+        ):
+            self.cmd.info(f"target successfully updated: {target}...")
+            return
+
+        with self._staging_dir(target) as tmp_dir:
             install_dir = self.parameters.get("layer-install-dir", "")
             layer_output_dir = os.path.join(tmp_dir, "layer-output")
-            target = os.path.join(
-                CURRENT_WORK_DIR, self.parameters.get(
-                    "layer-artifact-path", "")
-            )
             requirements_path = os.path.join(tmp_dir, "requirements.txt")
             layer_output_dir = os.path.join(layer_output_dir, install_dir)
             os.makedirs(layer_output_dir, exist_ok=True)
 
             self.cmd.info("Generating requirements file...")
-
-            with open(requirements_path, "w") as f:
-                f.write(get_requirements(self.cmd, self.parameters))
-
-            if self.in_container:
-                self._build_separate_layer_in_container(
-                    requirements_path,
-                    layer_output_dir,
+            if self.parameters["store"]:
+                self._install_layer_from_store(
+                    tmp_dir, layer_output_dir, requirements
                 )
             else:
-                self._build_separate_layer_on_local(
-                    requirements_path,
-                    layer_output_dir,
-                )
+                self._install_layer_requirements(tmp_dir, layer_output_dir)
 
             self.cmd.info(f"Building {target}...")
             os.makedirs(os.path.dirname(target), exist_ok=True)
@@ -294,6 +1110,7 @@ class Builder:
                 target=target,
                 exclude=[requirements_path],
             )
+            self.state.put_packages(get_target_key(target), requirements)
             self.cmd.info(f"target successfully built: {target}...")
 
     def _build_separated_function_in_container(self, package_dir: str):
@@ -313,7 +1130,7 @@ class Builder:
 
             install_in_container_no_deps_cmd_tmpl = join_cmds(
                 self.parameters.get("pre-install-script"),
-                INSTALL_IN_CONTAINER_NO_DEPS_CMD_TMPL,
+                self.commands["install_in_container_no_deps"],
             )
 
             cmd, print_safe_cmd = self.format_cmd(
@@ -329,7 +1146,8 @@ class Builder:
         os.makedirs(package_dir, exist_ok=True)
 
         install_no_deps_cmd_tmpl = join_cmds(
-            self.parameters.get("pre-install-script"), INSTALL_NO_DEPS_CMD_TMPL
+            self.parameters.get("pre-install-script"),
+            self.commands["install_no_deps"],
         )
         cmd, print_safe_cmd = self.format_cmd(
             install_no_deps_cmd_tmpl,
@@ -338,21 +1156,68 @@ class Builder:
 
         run_cmds(cmds=cmd, print_safe_cmds=print_safe_cmd, logger=self.cmd)
 
+    def _get_layer_digests(self) -> dict[str, str] | None:
+        """
+        Returns SHA-256 of files of the layer artifact relative to its
+        install directory, from the manifest of the last build when known.
+        """
+        target = os.path.join(CURRENT_WORK_DIR, self.parameters["layer-artifact-path"])
+        if not os.path.exists(target):
+            return None
+        manifest = self.state.get_files(get_target_key(target))
+        if manifest:
+            digests = get_manifest_digests(manifest)
+        elif target.endswith(".zip"):
+            digests = get_zip_digests(target)
+        else:
+            digests = get_tree_digests(target)
+        return strip_install_dir(digests, self.parameters["layer-install-dir"])
+
+    def _dedup_function(self, dir: str):
+        """
+        Drops top-level packages and modules of the function which are
+        provided by the layer, according to function-dedup.
+        """
+        policy = self.parameters["function-dedup"]
+        layer = self._get_layer_digests()
+        if layer is None:
+            self.cmd.warning(
+                "Layer artifact was not found, function was not deduplicated"
+            )
+            return
+        drop, conflicts = find_duplicates(get_tree_digests(dir), layer, policy)
+        for name, paths in conflicts.items():
+            self.cmd.warning(
+                f"{name} of the function differs from the layer"
+                f" ({'dropped' if name in drop else 'kept'}): {', '.join(paths)}"
+            )
+        if conflicts and policy == DEDUP_STRICT:
+            raise BuildLambdaPluginError(
+                f"Function and layer conflict in: {', '.join(conflicts)}"
+            )
+        if drop:
+            removed = remove_entries(dir, drop)
+            self.cmd.info(
+                f"Dropped from function as provided by the layer: {', '.join(drop)}"
+                f" ({removed} bytes)"
+            )
+
     @verify_checksum("function-artifact-path")
     def build_separated_function_package(self):
         self.cmd.info("Building function package...")
-        with TemporaryDirectory() as tmp_dir:
+        target = os.path.join(
+            CURRENT_WORK_DIR, self.parameters.get("function-artifact-path", "")
+        )
+        with self._staging_dir(target) as tmp_dir:
             install_dir = self.parameters.get("function-install-dir", "")
             package_dir = tmp_dir
-            target = os.path.join(
-                CURRENT_WORK_DIR, self.parameters.get(
-                    "function-artifact-path", "")
-            )
             package_dir = os.path.join(package_dir, install_dir)
             if self.in_container:
                 self._build_separated_function_in_container(package_dir)
             else:
                 self._build_separated_function_on_local(package_dir)
+            if self.parameters["function-dedup"] != DEDUP_OFF:
+                self._dedup_function(package_dir)
 
             self.cmd.info(f"Building target: {target}")
             os.makedirs(os.path.dirname(target), exist_ok=True)
@@ -385,13 +1250,13 @@ class Builder:
             self.cmd.info("Installing package")
 
             install_in_container_cmd_tmpl = join_cmds(
-                self.parameters.get(
-                    "pre-install-script"), INSTALL_IN_CONTAINER_CMD_TMPL
+                self.parameters.get("pre-install-script"),
+                self.commands["install_in_container"],
             )
             if req_path:
                 install_in_container_cmd_tmpl = join_cmds(
                     install_in_container_cmd_tmpl,
-                    INSTALL_DEPS_CMD_TMPL
+                    self.commands["deps"],
                 )
                 cmd, print_safe_cmd = self.format_cmd(
                     install_in_container_cmd_tmpl,
@@ -417,12 +1282,19 @@ class Builder:
 
     def _build_package_on_local(self, package_dir: str, req_path: str | None):
         self.cmd.info("Building package on local")
-        install_cmd_tmpl = join_cmds(
-            self.parameters.get("pre-install-script"), INSTALL_CMD_TMPL
-        )
+        if req_path and (self.target_install_args or self.wheelhouse):
+            # dependencies come from the requirements file built for the target
+            install_cmd_tmpl = join_cmds(
+                self.parameters.get("pre-install-script"),
+                self.commands["install_no_deps"],
+            )
+        else:
+            install_cmd_tmpl = join_cmds(
+                self.parameters.get("pre-install-script"), self.commands["install"]
+            )
         if req_path:
             install_cmd_tmpl = join_cmds(
-                install_cmd_tmpl, INSTALL_DEPS_CMD_TMPL
+                install_cmd_tmpl, self.commands["deps"] + self._deps_install_args()
             )
             cmd, print_safe_cmd = self.format_cmd(
                 install_cmd_tmpl,
@@ -441,21 +1313,26 @@ class Builder:
     def build_package(self):
         self.cmd.info("Building package...")
         req = get_requirements(self.cmd, self.parameters)
-        with TemporaryDirectory() as tmp_dir:
+        if req.strip():
+            self._fill_wheelhouse()
+        target = os.path.join(
+            CURRENT_WORK_DIR, self.parameters.get("package-artifact-path", "")
+        )
+        with self._staging_dir(target) as tmp_dir:
             install_dir = self.parameters.get("package-install-dir", "")
             package_dir = os.path.join(tmp_dir, install_dir)
             os.makedirs(package_dir, exist_ok=True)
-            target = os.path.join(
-                CURRENT_WORK_DIR, self.parameters.get(
-                    "package-artifact-path", "")
-            )
             req_path = None
             if req:
                 req_path = os.path.join(tmp_dir, "requirements.txt")
                 with open(req_path, "w") as file:
                     file.write(req)
 
-            if self.in_container:
+            if self.hybrid:
+                self._build_separated_function_on_local(package_dir)
+                with TemporaryDirectory() as requirements_dir:
+                    self._build_separate_layer_hybrid(requirements_dir, package_dir)
+            elif self.in_container:
                 self._build_package_in_container(package_dir, req_path)
             else:
                 self._build_package_on_local(package_dir, req_path)
@@ -469,11 +1346,75 @@ class Builder:
             )
             self.cmd.info(f"target successfully built: {target}...")
 
+    def _get_targets(self) -> list[tuple[str, str]]:
+        if self._type in (
+            BuildType.IN_CONTAINER_SEPARATED,
+            BuildType.HYBRID_SEPARATED,
+            BuildType.SEPARATED,
+        ):
+            return [
+                ("function", self.parameters["function-artifact-path"]),
+                ("layer", self.parameters["layer-artifact-path"]),
+            ]
+        return [("package", self.parameters["package-artifact-path"])]
+
+    def _fetch_remote_targets(self):
+        """
+        Downloads artifacts of outdated targets from the remote cache into
+        the artifact cache concurrently, so they are restored from it.
+        """
+        for kind, target in self._get_targets():
+            fingerprint = self._get_fingerprint(kind)
+            prev_state = self.state.get_target(get_target_key(target)) or {}
+            if (
+                fingerprint == prev_state.get("checksum")
+                and os.path.exists(os.path.join(CURRENT_WORK_DIR, target))
+            ) or self.artifact_cache.get(fingerprint) is not None:
+                continue
+            self._transfers[target] = self._remote_executor.submit(
+                self.remote_cache.fetch, fingerprint, self.artifact_cache
+            )
+        for target, hit in self._wait_transfers().items():
+            self.cmd.info(f"Remote cache {'hit' if hit else 'miss'}: {target}")
+
+    def _wait_transfers(self) -> dict[str, bool]:
+        results = {}
+        for target, future in self._transfers.items():
+            try:
+                results[target] = future.result()
+            except (RemoteCacheError, OSError) as e:
+                self.cmd.warning(f"Remote cache transfer of {target} failed: {e}")
+        self._transfers = {}
+        return results
+
     def build(self):
-        if self._type in (BuildType.IN_CONTAINER_SEPARATED, BuildType.SEPARATED):
+        if self.remote_cache is None or self.parameters["no-checksum"]:
+            return self._build()
+        with ThreadPoolExecutor(
+            max_workers=self.parameters["remote-cache-workers"]
+        ) as self._remote_executor:
+            self._fetch_remote_targets()
+            try:
+                return self._build()
+            finally:
+                for target, uploaded in self._wait_transfers().items():
+                    if uploaded:
+                        self.cmd.info(f"Uploaded to remote cache: {target}")
+
+    def _build(self):
+        if self._type in (
+            BuildType.IN_CONTAINER_SEPARATED,
+            BuildType.HYBRID_SEPARATED,
+            BuildType.SEPARATED,
+        ):
             self.cmd.info("Building separated packages...")
-            self.build_separated_function_package()
-            self.build_separate_layer_package()
+            if self.parameters["function-dedup"] != DEDUP_OFF:
+                # files of the function are compared with the built layer
+                self.build_separate_layer_package()
+                self.build_separated_function_package()
+            else:
+                self.build_separated_function_package()
+                self.build_separate_layer_package()
         elif self._type == BuildType.IN_CONTAINER_MERGED:
             self.build_package()
         else:
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import urllib.parse
+from tempfile import NamedTemporaryFile
+from typing import IO, Iterator
+
+import requests
+
+from poetry_plugin_lambda_build.artifacts import ArtifactCache
+from poetry_plugin_lambda_build.wheelhouse import file_hash
+
+CHUNK_SIZE = 1024 * 64
+# entries of the action cache map fingerprints to artifacts in the
+# content-addressable storage
+ACTION_CACHE = "ac"
+CAS = "cas"
+
+
+class RemoteCacheError(Exception):
+    pass
+
+
+class FileSystemBackend:
+    """
+    Remote cache kept in a directory shared between runners, for example
+    a network filesystem.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+
+    def exists(self, name: str) -> bool:
+        return os.path.exists(os.path.join(self.root, name))
+
+    def get(self, name: str) -> Iterator[bytes] | None:
+        try:
+            f = open(os.path.join(self.root, name), "rb")
+        except FileNotFoundError:
+            return None
+
+        def chunks():
+            with f:
+                yield from iter(lambda: f.read(CHUNK_SIZE), b"")
+
+        return chunks()
+
+    def put(self, name: str, data: bytes | IO[bytes]) -> None:
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with NamedTemporaryFile(
+            dir=os.path.dirname(path), prefix=".tmp-", delete=False
+        ) as f:
+            if isinstance(data, bytes):
+                f.write(data)
+            else:
+                shutil.copyfileobj(data, f, CHUNK_SIZE)
+        os.replace(f.name, path)
+
+
+class HttpBackend:
+    """
+    Remote cache served over HTTP. Entries are read with GET, checked with
+    HEAD and written with PUT to url/name.
+    """
+
+    def __init__(self, url: str, session: requests.Session | None = None) -> None:
+        self.url = url.rstrip("/")
+        self.session = session or requests.Session()
+
+    def _request(self, method: str, name: str, **kwargs) -> requests.Response:
+        try:
+            response = self.session.request(method, f"{self.url}/{name}", **kwargs)
+        except requests.RequestException as e:
+            raise RemoteCacheError(f"Remote cache request failed: {e}") from e
+        if response.status_code != 404 and not response.ok:
+            response.close()
+            raise RemoteCacheError(
+                f"Remote cache responded {response.status_code} to {method} {name}"
+            )
+        return response
+
+    def exists(self, name: str) -> bool:
+        return self._request("HEAD", name).ok
+
+    def get(self, name: str) -> Iterator[bytes] | None:
+        response = self._request("GET", name, stream=True)
+        if not response.ok:
+            response.close()
+            return None
+
+        def chunks():
+            with response:
+                try:
+                    yield from response.iter_content(CHUNK_SIZE)
+                except requests.RequestException as e:
+                    raise RemoteCacheError(f"Remote cache request failed: {e}") from e
+
+        return chunks()
+
+    def put(self, name: str, data: bytes | IO[bytes]) -> None:
+        self._request("PUT", name, data=data).close()
+
+
+def get_backend(url: str) -> FileSystemBackend | HttpBackend:
+    scheme = urllib.parse.urlsplit(url).scheme
+    if scheme in ("http", "https"):
+        return HttpBackend(url)
+    if scheme == "file":
+        return FileSystemBackend(urllib.parse.urlsplit(url).path)
+    return FileSystemBackend(url)
+
+
+class RemoteCache:
+    """
+    Artifact cache shared between runners. Artifacts are stored by their
+    SHA-256 and verified when downloaded, fingerprints of their inputs
+    point to them together with the metadata of the build.
+    """
+
+    def __init__(self, backend: FileSystemBackend | HttpBackend) -> None:
+        self.backend = backend
+
+    def fetch(self, fingerprint: str, cache: ArtifactCache) -> bool:
+        """
+        Downloads the artifact of the fingerprint into the local cache and
+        returns whether it was found.
+        """
+        chunks = self.backend.get(f"{ACTION_CACHE}/{fingerprint}")
+        if chunks is None:
+            return False
+        try:
+            entry = json.loads(b"".join(chunks))
+            digest, size, meta = entry["artifact"], entry["size"], entry["meta"]
+        except (ValueError, KeyError, TypeError) as e:
+            raise RemoteCacheError(f"Invalid remote cache entry {fingerprint}") from e
+        chunks = self.backend.get(f"{CAS}/{digest}")
+        if chunks is None:
+            return False
+
+        # staged next to the entry, so leftovers are removed by the cache gc
+        prefix_dir = os.path.dirname(cache.path(fingerprint))
+        os.makedirs(prefix_dir, exist_ok=True)
+        m = hashlib.sha256()
+        with NamedTemporaryFile(dir=prefix_dir, prefix=".tmp-", delete=False) as f:
+            try:
+                for chunk in chunks:
+                    m.update(chunk)
+                    f.write(chunk)
+            except BaseException:
+                os.remove(f.name)
+                raise
+        try:
+            if m.hexdigest() != digest or os.path.getsize(f.name) != size:
+                raise RemoteCacheError(
+                    f"Integrity check of remote artifact {digest} failed"
+                )
+            cache.put(fingerprint, f.name, meta)
+        finally:
+            os.remove(f.name)
+        return True
+
+    def upload(self, fingerprint: str, cache: ArtifactCache) -> bool:
+        """
+        Uploads the artifact of the fingerprint from the local cache and
+        returns whether it was uploaded. Directory artifacts are not shared.
+        """
+        path = cache.get(fingerprint)
+        if path is None:
+            return False
+        artifact = os.path.join(path, cache.ARTIFACT)
+        if not os.path.isfile(artifact):
+            return False
+        with open(os.path.join(path, cache.META)) as f:
+            meta = json.load(f)
+        digest = file_hash(artifact)
+        if not self.backend.exists(f"{CAS}/{digest}"):
+            with open(artifact, "rb") as f:
+                self.backend.put(f"{CAS}/{digest}", f)
+        entry = {"artifact": digest, "size": os.path.getsize(artifact), "meta": meta}
+        self.backend.put(
+            f"{ACTION_CACHE}/{fingerprint}", json.dumps(entry).encode()
+        )
+        return True
@@ -14,10 +14,12 @@ from poetry_plugin_lambda_build.walker import (
     get_project_dependency_packages, get_project_dependency_packages2)
 
 if TYPE_CHECKING:
-    from collections.abc import Collection, Iterable
+    from collections.abc import Callable, Collection, Iterable, Iterator
     from typing import ClassVar
 
     from packaging.utils import NormalizedName
+    from poetry.core.packages.package import Package
+    from poetry.packages import DependencyPackage
     from poetry.poetry import Poetry
 
 
@@ -42,6 +44,7 @@ class RequirementsExporter:
         self._with_credentials = False
         self._with_urls = True
         self._extras: Collection[NormalizedName] = ()
+        self._package_filter: Callable[[Package], bool] | None = None
 
         if groups:
             self._groups = groups
@@ -77,25 +80,24 @@ class RequirementsExporter:
 
         return self
 
-    def export(self) -> None:
-        return self._export_generic_txt(False, False)
+    def with_package_filter(
+        self, package_filter: Callable[[Package], bool] | None
+    ) -> RequirementsExporter:
+        self._package_filter = package_filter
 
-    def _export_generic_txt(
-        self, with_extras: bool, allow_editable: bool
-    ) -> str:
-        from poetry.core.packages.utils.utils import path_to_url
+        return self
 
-        indexes = set()
-        content = ""
-        dependency_lines = set()
+    def export(self) -> None:
+        return self._export_generic_txt(False, False)
 
+    def _iter_dependency_packages(self) -> Iterator[DependencyPackage]:
         python_marker = parse_marker(
             create_nested_marker(
                 "python_version", self._poetry.package.python_constraint
             )
         )
         if self._poetry.locker.is_locked_groups_and_markers():
-            dependency_package_iterator = get_project_dependency_packages2(
+            yield from get_project_dependency_packages2(
                 self._poetry.locker,
                 project_python_marker=python_marker,
                 groups=set(self._groups),
@@ -105,7 +107,7 @@ class RequirementsExporter:
             root = self._poetry.package.with_dependency_groups(
                 list(self._groups), only=True
             )
-            dependency_package_iterator = get_project_dependency_packages(
+            yield from get_project_dependency_packages(
                 self._poetry.locker,
                 project_requires=root.all_requires,
                 root_package_name=root.name,
@@ -113,6 +115,36 @@ class RequirementsExporter:
                 extras=self._extras,
             )
 
+    def _export_generic_txt(
+        self, with_extras: bool, allow_editable: bool
+    ) -> str:
+        indexes = set()
+        content = ""
+        dependency_lines = set()
+
+        for _, line, index in self._iter_dependency_lines(with_extras, allow_editable):
+            if index:
+                indexes.add(index)
+            dependency_lines.add(line)
+
+        content += "\n".join(sorted(dependency_lines))
+        content += "\n"
+
+        if indexes and self._with_urls:
+            indexes_header = "".join(self.export_indexes())
+
+            if indexes_header:
+                content = indexes_header + "\n" + content
+
+        return content
+
+    def _iter_dependency_lines(
+        self, with_extras: bool, allow_editable: bool
+    ) -> Iterator[tuple[Package, str, str | None]]:
+        from poetry.core.packages.utils.utils import path_to_url
+
+        dependency_package_iterator = self._iter_dependency_packages()
+
         for dependency_package in dependency_package_iterator:
             line = ""
 
@@ -122,6 +154,9 @@ class RequirementsExporter:
             dependency = dependency_package.dependency
             package = dependency_package.package
 
+            if self._package_filter and not self._package_filter(package):
+                continue
+
             if package.develop and not allow_editable:
                 self._io.write_error_line(
                     f"<warning>Warning: {package.pretty_name} is locked in develop"
@@ -154,12 +189,13 @@ class RequirementsExporter:
                 if markers:
                     line += f" ; {markers}"
 
+            index = None
             if (
                 not is_direct_remote_reference
                 and not is_direct_local_reference
                 and package.source_url
             ):
-                indexes.add(package.source_url.rstrip("/"))
+                index = package.source_url.rstrip("/")
 
             if package.files and self._with_hashes and not is_direct_remote_reference:
                 hashes = []
@@ -179,18 +215,7 @@ class RequirementsExporter:
                 for h in hashes:
                     line += f" \\\n    --hash={h}"
 
-            dependency_lines.add(line)
-
-        content += "\n".join(sorted(dependency_lines))
-        content += "\n"
-
-        if indexes and self._with_urls:
-            indexes_header = "".join(self.export_indexes())
-
-            if indexes_header:
-                content = indexes_header + "\n" + content
-
-        return content
+            yield package, line, index
 
     _export_constraints_txt = partialmethod(
         _export_generic_txt, with_extras=False, allow_editable=False
@@ -221,30 +246,25 @@ class RequirementsExporter:
                 args += ["--extra-index-url", f" {url}\n"]
         return args
 
+    def export_package_lines(self) -> dict[str, str]:
+        """
+        Returns requirement lines of exported packages by package name.
+        """
+        lines: dict[str, set[str]] = {}
+        for package, line, _ in self._iter_dependency_lines(False, False):
+            lines.setdefault(package.name, set()).add(line)
+        return {name: "\n".join(sorted(lines[name])) for name in sorted(lines)}
+
+    def export_packages(self) -> list[Package]:
+        return [
+            dependency_package.package
+            for dependency_package in self._iter_dependency_packages()
+            if not self._package_filter
+            or self._package_filter(dependency_package.package)
+        ]
+
     def export_local_dependencies(self) -> list[str]:
-        python_marker = parse_marker(
-            create_nested_marker(
-                "python_version", self._poetry.package.python_constraint
-            )
-        )
-        if self._poetry.locker.is_locked_groups_and_markers():
-            dependency_package_iterator = get_project_dependency_packages2(
-                self._poetry.locker,
-                project_python_marker=python_marker,
-                groups=set(self._groups),
-                extras=self._extras,
-            )
-        else:
-            root = self._poetry.package.with_dependency_groups(
-                list(self._groups), only=True
-            )
-            dependency_package_iterator = get_project_dependency_packages(
-                self._poetry.locker,
-                project_requires=root.all_requires,
-                root_package_name=root.name,
-                project_python_marker=python_marker,
-                extras=self._extras,
-            )
+        dependency_package_iterator = self._iter_dependency_packages()
         for dependency_package in dependency_package_iterator:    
             if dependency_package.package.source_type == "directory":
                 yield dependency_package.dependency.source_url
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+import posixpath
+from zipfile import ZipFile
+
+from poetry_plugin_lambda_build.dists import (DIST_INFO_SUFFIX, get_file_owners,
+                                              parse_dist_info_name,
+                                              resolve_record_path)
+from poetry_plugin_lambda_build.slim import OTHER
+
+SIZE_REPORT_SUFFIX = ".size-report.json"
+# maximum unzipped size of a function together with its layers
+LAMBDA_UNZIPPED_LIMIT = 250 * 1024 * 1024
+RECORD_SUFFIX = DIST_INFO_SUFFIX + "/RECORD"
+
+
+def get_report_kinds(parameters: dict) -> list[str]:
+    if parameters["function-artifact-path"] or parameters["layer-artifact-path"]:
+        return ["function", "layer"]
+    return ["package"]
+
+
+def get_zip_entries(zip_file: ZipFile) -> tuple[list[tuple], dict[str, str]]:
+    """
+    Returns path, size and compressed size of files of the archive and maps
+    the paths to canonical names of distributions owning them according to
+    RECORD files found in the archive.
+    """
+    entries, owners = [], {}
+    for info in zip_file.infolist():
+        if info.is_dir():
+            continue
+        entries.append((info.filename, info.file_size, info.compress_size))
+        if not info.filename.endswith(RECORD_SUFFIX):
+            continue
+        dist_info = posixpath.dirname(info.filename)
+        site_dir = posixpath.dirname(dist_info)
+        name, _ = parse_dist_info_name(posixpath.basename(dist_info))
+        with zip_file.open(info) as f:
+            for row in csv.reader(io.TextIOWrapper(f, newline="")):
+                path = resolve_record_path(site_dir, row[0]) if row else None
+                if path is not None:
+                    owners[path] = name
+    for path, _, _ in entries:
+        for part in path.split("/")[:-1]:
+            if part.endswith(DIST_INFO_SUFFIX):
+                owners[path] = parse_dist_info_name(part)[0]
+                break
+    return entries, owners
+
+
+def get_tree_entries(root: str) -> tuple[list[tuple], dict[str, str]]:
+    """
+    Returns path and size of files of the directory, which has no compressed
+    size, and maps the paths to distributions owning them.
+    """
+    entries = []
+    for base_path, _, files in os.walk(root):
+        for file in files:
+            path = os.path.join(base_path, file)
+            rel_path = os.path.relpath(path, root).replace(os.sep, "/")
+            entries.append((rel_path, os.path.getsize(path), None))
+    owners = {
+        os.path.relpath(path, root).replace(os.sep, "/"): name
+        for path, name in get_file_owners(root).items()
+    }
+    return entries, owners
+
+
+def _add(groups: dict, key: str, size: int, compressed_size: int | None):
+    group = groups.setdefault(key, {"files": 0, "size": 0, "compressed_size": 0})
+    group["files"] += 1
+    group["size"] += size
+    if compressed_size is None or group["compressed_size"] is None:
+        group["compressed_size"] = None
+    else:
+        group["compressed_size"] += compressed_size
+
+
+def _sorted_groups(groups: dict) -> dict:
+    return dict(sorted(groups.items(), key=lambda item: (-item[1]["size"], item[0])))
+
+
+def summarize_sizes(
+    entries: list[tuple], owners: dict[str, str], install_dir: str, top: int
+) -> dict:
+    """
+    Sums sizes of files per owning distribution and per top-level directory
+    of the install directory, and lists the largest files.
+    """
+    prefix = install_dir.strip("/") + "/" if install_dir else ""
+    total, distributions, top_level = {}, {}, {}
+    for path, size, compressed_size in entries:
+        _add(total, "total", size, compressed_size)
+        _add(distributions, owners.get(path, OTHER), size, compressed_size)
+        rel_path = path[len(prefix) :] if path.startswith(prefix) else path
+        _add(top_level, rel_path.split("/", 1)[0], size, compressed_size)
+    largest = sorted(entries, key=lambda entry: (-entry[1], entry[0]))[:top]
+    return {
+        **total.get("total", {"files": 0, "size": 0, "compressed_size": 0}),
+        "distributions": _sorted_groups(distributions),
+        "top_level": _sorted_groups(top_level),
+        "largest": [
+            {
+                "path": path,
+                "size": size,
+                "compressed_size": compressed_size,
+                "distribution": owners.get(path, OTHER),
+            }
+            for path, size, compressed_size in largest
+        ],
+    }
+
+
+def analyze_artifact(path: str, install_dir: str = "", top: int = 20) -> dict:
+    if path.endswith(".zip"):
+        with ZipFile(path) as zip_file:
+            entries, owners = get_zip_entries(zip_file)
+    else:
+        entries, owners = get_tree_entries(path)
+    return summarize_sizes(entries, owners, install_dir, top)
+
+
+def write_size_report(path: str, install_dir: str = "", top: int = 20) -> dict:
+    """
+    Analyzes the artifact and writes the report next to it.
+    """
+    report = {
+        "artifact": os.path.basename(path),
+        **analyze_artifact(path, install_dir, top),
+    }
+    with open(path + SIZE_REPORT_SUFFIX, "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def format_bytes(size: int | None) -> str:
+    if size is None:
+        return "-"
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def _format_rows(title: str, groups: dict) -> list[str]:
+    lines = [f"{title:<40} {'Files':>7} {'Size':>11} {'Compressed':>11}"]
+    for name, group in groups.items():
+        lines.append(
+            f"{name:<40} {group['files']:>7} {format_bytes(group['size']):>11}"
+            f" {format_bytes(group['compressed_size']):>11}"
+        )
+    return lines
+
+
+def format_size_report(report: dict) -> list[str]:
+    lines = [
+        f"{report['artifact']}: {report['files']} files, {format_bytes(report['size'])} unzipped, "
+        f"{format_bytes(report['compressed_size'])} compressed",
+        "",
+        *_format_rows("Distribution", report["distributions"]),
+        "",
+        *_format_rows("Top-level directory", report["top_level"]),
+        "",
+        f"{'Largest file':<64} {'Size':>11} {'Compressed':>11}  Distribution",
+    ]
+    for entry in report["largest"]:
+        lines.append(
+            f"{entry['path']:<64} {format_bytes(entry['size']):>11}"
+            f" {format_bytes(entry['compressed_size']):>11}"
+            f"  {entry['distribution']}"
+        )
+    return lines
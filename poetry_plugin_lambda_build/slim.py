@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+from typing import Iterator
+
+from poetry_plugin_lambda_build.dists import remove_empty_dirs
+
+PROFILE_DEFAULT = "default"
+PROFILE_SLIM = "slim"
+# patterns matched against paths relative to the artifact root with a
+# leading slash; metadata read at runtime (METADATA, RECORD, entry points)
+# and licenses are kept
+SLIM_RULES = [
+    "*/tests",
+    "*/test",
+    "*/docs",
+    "*.pyi",
+    "*.dist-info/INSTALLER",
+    "*.dist-info/REQUESTED",
+    "*.dist-info/WHEEL",
+    "*.dist-info/direct_url.json",
+]
+NATIVE_LIBRARY_PATTERNS = ("*.so", "*.so.*")
+STRIP_CMD = ["strip", "--strip-debug"]
+OTHER = "(other)"
+
+
+def _match(path: str, patterns: list[str]) -> bool:
+    parts = path.split("/")
+    return any(
+        fnmatch("/" + "/".join(parts[: i + 1]), pattern)
+        for i in range(len(parts))
+        for pattern in patterns
+    )
+
+
+def iter_tree_files(root: str) -> Iterator[str]:
+    for base_path, _, files in os.walk(root):
+        for file in files:
+            yield os.path.relpath(os.path.join(base_path, file), root).replace(
+                os.sep, "/"
+            )
+
+
+def get_pruned_files(root: str, rules: list[str], keep: list[str]) -> list[str]:
+    """
+    Returns paths relative to root matching the rules, directly or by one
+    of their parent directories, and not matching any of keep patterns.
+    """
+    return [
+        path
+        for path in iter_tree_files(root)
+        if _match(path, rules) and not _match(path, keep)
+    ]
+
+
+def prune_tree(root: str, paths: list[str]) -> dict[str, int]:
+    """
+    Removes the files and returns the number of removed bytes per path.
+    """
+    removed = {}
+    dirs = set()
+    for path in paths:
+        full_path = os.path.join(root, path)
+        removed[full_path] = os.lstat(full_path).st_size
+        os.remove(full_path)
+        dirs.add(os.path.dirname(full_path))
+    remove_empty_dirs(root, dirs)
+    return removed
+
+
+def iter_native_libraries(root: str, keep: list[str]) -> Iterator[str]:
+    """
+    Yields paths of native libraries not matching any of keep patterns.
+    """
+    for path in iter_tree_files(root):
+        if (
+            any(
+                fnmatch(os.path.basename(path), pattern)
+                for pattern in NATIVE_LIBRARY_PATTERNS
+            )
+            and not os.path.islink(os.path.join(root, path))
+            and not _match(path, keep)
+        ):
+            yield path
+
+
+def replace_if_smaller(path: str, stripped: str) -> int:
+    """
+    Replaces the file with its stripped copy when it is smaller and returns
+    the number of saved bytes.
+    """
+    saved = os.path.getsize(path) - os.path.getsize(stripped)
+    if saved <= 0:
+        os.remove(stripped)
+        return 0
+    if os.path.dirname(stripped) != os.path.dirname(path):
+        # moved next to the library first, so it can be replaced atomically
+        stripped = shutil.move(stripped, path + ".stripped")
+    shutil.copymode(path, stripped)
+    os.replace(stripped, path)
+    return saved
+
+
+def strip_file(path: str) -> int:
+    """
+    Strips debug symbols into a new file which replaces the library.
+    """
+    stripped = path + ".stripped"
+    process = subprocess.run(
+        [*STRIP_CMD, "-o", stripped, path], capture_output=True
+    )
+    if process.returncode:
+        # not a library of the host architecture or already broken
+        if os.path.exists(stripped):
+            os.remove(stripped)
+        return 0
+    return replace_if_smaller(path, stripped)
+
+
+def strip_tree(root: str, paths: list[str]) -> dict[str, int]:
+    full_paths = [os.path.join(root, path) for path in paths]
+    with ThreadPoolExecutor() as executor:
+        return dict(zip(full_paths, executor.map(strip_file, full_paths)))
+
+
+def get_package_savings(
+    owners: dict[str, str], *savings: dict[str, int]
+) -> dict[str, int]:
+    """
+    Sums saved bytes of files per owning package, the largest first.
+    """
+    packages = {}
+    for saved in savings:
+        for path, size in saved.items():
+            name = owners.get(os.path.normpath(path), OTHER)
+            packages[name] = packages.get(name, 0) + size
+    return dict(sorted(packages.items(), key=lambda item: item[1], reverse=True))
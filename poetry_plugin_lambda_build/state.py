@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS targets (
+    target TEXT PRIMARY KEY,
+    checksum TEXT,
+    parameters TEXT,
+    parameters_digest TEXT,
+    digest TEXT,
+    code_sha256 TEXT,
+    duration REAL,
+    built_at REAL
+);
+CREATE TABLE IF NOT EXISTS files (
+    target TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    crc INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    mode INTEGER NOT NULL,
+    PRIMARY KEY (target, name)
+);
+CREATE TABLE IF NOT EXISTS packages (
+    target TEXT NOT NULL,
+    name TEXT NOT NULL,
+    requirement TEXT NOT NULL,
+    PRIMARY KEY (target, name)
+);
+CREATE TABLE IF NOT EXISTS inputs (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+"""
+
+TARGET_COLUMNS = (
+    "checksum",
+    "parameters",
+    "parameters_digest",
+    "digest",
+    "code_sha256",
+    "duration",
+    "built_at",
+)
+
+
+class BuildState:
+    """
+    SQLite database keeping the state of built targets: fingerprints of
+    their inputs, build parameters, digests, timings and manifests of
+    archived files and installed packages, and hashes of project files.
+    Artifacts themselves carry no plugin bookkeeping.
+    """
+
+    def __init__(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def get_target(self, target: str) -> dict | None:
+        row = self._conn.execute(
+            f"SELECT {', '.join(TARGET_COLUMNS)} FROM targets WHERE target = ?",
+            (target,),
+        ).fetchone()
+        if row is None:
+            return None
+        values = dict(zip(TARGET_COLUMNS, row))
+        if values["parameters"] is not None:
+            values["parameters"] = json.loads(values["parameters"])
+        return values
+
+    def put_target(self, target: str, **values) -> None:
+        """
+        Updates the given columns of the target, built_at is set to now.
+        """
+        values["built_at"] = time.time()
+        if "parameters" in values:
+            values["parameters"] = json.dumps(values["parameters"], sort_keys=True)
+        columns = ", ".join(values)
+        placeholders = ", ".join("?" for _ in values)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in values)
+        with self._conn:
+            self._conn.execute(
+                f"INSERT INTO targets (target, {columns}) VALUES (?, {placeholders})"
+                f" ON CONFLICT (target) DO UPDATE SET {updates}",
+                (target, *values.values()),
+            )
+
+    def get_files(self, target: str) -> dict[str, list]:
+        return {
+            name: list(entry)
+            for name, *entry in self._conn.execute(
+                "SELECT name, size, mtime_ns, crc, sha256, mode FROM files"
+                " WHERE target = ?",
+                (target,),
+            )
+        }
+
+    def put_files(self, target: str, manifest: dict[str, list]) -> None:
+        with self._conn:
+            self._conn.execute("DELETE FROM files WHERE target = ?", (target,))
+            self._conn.executemany(
+                "INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((target, name, *entry) for name, entry in manifest.items()),
+            )
+
+    def get_packages(self, target: str) -> dict[str, str]:
+        return dict(
+            self._conn.execute(
+                "SELECT name, requirement FROM packages WHERE target = ?", (target,)
+            )
+        )
+
+    def put_packages(self, target: str, requirements: dict[str, str]) -> None:
+        with self._conn:
+            self._conn.execute("DELETE FROM packages WHERE target = ?", (target,))
+            self._conn.executemany(
+                "INSERT INTO packages VALUES (?, ?, ?)",
+                ((target, name, line) for name, line in requirements.items()),
+            )
+
+    def get_inputs(self) -> dict[str, list]:
+        return {
+            path: list(entry)
+            for path, *entry in self._conn.execute(
+                "SELECT path, size, mtime_ns, sha256 FROM inputs"
+            )
+        }
+
+    def put_inputs(self, hashes: dict[str, list]) -> None:
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO inputs VALUES (?, ?, ?, ?)",
+                ((path, *entry) for path, entry in hashes.items()),
+            )
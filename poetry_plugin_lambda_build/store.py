@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+from tempfile import mkdtemp
+
+from packaging.utils import canonicalize_name
+
+from poetry_plugin_lambda_build.dists import (
+    distribution_files,
+    iter_distributions,
+    remove_empty_dirs,
+)
+from poetry_plugin_lambda_build.fs import remove_unused_entries
+
+
+class DistributionStore:
+    """
+    Store of installed distributions shared between projects.
+
+    Every entry holds the files of one distribution as installed into a site
+    directory. Entries are keyed by the requirement line, pinning the name,
+    version and hashes, and by the environment the distribution was installed
+    for. Layers are assembled by linking entries, the modification time of an
+    entry records its last use.
+    """
+
+    def __init__(self, root: str, environment: str) -> None:
+        self._root = root
+        self._environment = environment
+
+    def key(self, requirement: str) -> str:
+        return hashlib.sha256(
+            f"{self._environment}\0{requirement}".encode()
+        ).hexdigest()
+
+    def path(self, requirement: str) -> str:
+        key = self.key(requirement)
+        return os.path.join(self._root, key[:2], key)
+
+    def get(self, requirement: str) -> str | None:
+        path = self.path(requirement)
+        if not os.path.isdir(path):
+            return None
+        os.utime(path)
+        return path
+
+    def put(self, requirement: str, site_dir: str, name: str) -> str | None:
+        """
+        Moves files of the distribution installed into site_dir to the store.
+        Returns None when the distribution was not found.
+        """
+        name = canonicalize_name(name)
+        files = []
+        for dist_name, _, dist_info in iter_distributions(site_dir):
+            if dist_name == name:
+                files = distribution_files(site_dir, dist_info)
+                break
+        if not files:
+            return None
+
+        path = self.path(requirement)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_dir = mkdtemp(dir=os.path.dirname(path), prefix=".tmp-")
+        for file in files:
+            dst = os.path.join(tmp_dir, os.path.relpath(file, site_dir))
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.move(file, dst)
+        remove_empty_dirs(site_dir, {os.path.dirname(file) for file in files})
+        try:
+            os.rename(tmp_dir, path)
+        except OSError:
+            # entry was stored concurrently
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return path
+
+    def gc(self, max_age: float) -> int:
+        """
+        Removes entries not used for max_age seconds and returns their number.
+        """
+        return remove_unused_entries(self._root, max_age)
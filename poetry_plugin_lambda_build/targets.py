@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from packaging.tags import Tag, compatible_tags, cpython_tags
+from packaging.utils import InvalidWheelFilename, parse_wheel_filename
+
+# Lambda runtime -> (python version, highest glibc minor version of the runtime OS)
+LAMBDA_RUNTIMES = {
+    "python3.9": ((3, 9), 26),
+    "python3.10": ((3, 10), 26),
+    "python3.11": ((3, 11), 26),
+    "python3.12": ((3, 12), 34),
+    "python3.13": ((3, 13), 34),
+    "python3.14": ((3, 14), 34),
+}
+
+LAMBDA_ARCHITECTURES = {
+    "x86_64": "x86_64",
+    "arm64": "aarch64",
+}
+
+LEGACY_MANYLINUX = {
+    "x86_64": ["manylinux2014", "manylinux2010", "manylinux1"],
+    "aarch64": ["manylinux2014"],
+}
+
+
+def get_target_python_version(runtime: str) -> tuple[int, int]:
+    return LAMBDA_RUNTIMES[runtime][0]
+
+
+def get_target_platforms(runtime: str, architecture: str) -> list[str]:
+    """
+    Returns the platform tags of wheels that can be loaded by the given
+    Lambda runtime, the most specific first.
+    """
+    _, glibc_minor = LAMBDA_RUNTIMES[runtime]
+    arch = LAMBDA_ARCHITECTURES[architecture]
+    platforms = [
+        f"manylinux_2_{minor}_{arch}" for minor in range(glibc_minor, 16, -1)
+    ]
+    platforms += [f"{legacy}_{arch}" for legacy in LEGACY_MANYLINUX[arch]]
+    return platforms
+
+
+def get_target_install_args(
+    installer: str, runtime: str, architecture: str, local_wheels: bool = False
+) -> list[str]:
+    """
+    Returns the installer arguments that select binary distributions for the
+    given Lambda runtime and architecture instead of the host platform.
+    With local_wheels, the plain linux platform tag of wheels built in
+    the container without repairing is accepted as well.
+    """
+    major, minor = get_target_python_version(runtime)
+    python_version = f"{major}.{minor}"
+    if installer == "uv":
+        _, glibc_minor = LAMBDA_RUNTIMES[runtime]
+        arch = LAMBDA_ARCHITECTURES[architecture]
+        return [
+            "--python-platform",
+            f"{arch}-manylinux_2_{glibc_minor}",
+            "--python-version",
+            python_version,
+            "--only-binary",
+            ":all:",
+        ]
+
+    platforms = get_target_platforms(runtime, architecture)
+    if local_wheels:
+        platforms.append(f"linux_{LAMBDA_ARCHITECTURES[architecture]}")
+    args = []
+    for platform in platforms:
+        args += ["--platform", platform]
+    return args + [
+        "--python-version",
+        python_version,
+        "--implementation",
+        "cp",
+        "--only-binary=:all:",
+    ]
+
+
+def get_target_tags(runtime: str, architecture: str) -> set[Tag]:
+    python_version = get_target_python_version(runtime)
+    platforms = get_target_platforms(runtime, architecture)
+    interpreter = "cp{}{}".format(*python_version)
+    return set(cpython_tags(python_version, platforms=platforms)) | set(
+        compatible_tags(python_version, interpreter=interpreter, platforms=platforms)
+    )
+
+
+def has_compatible_wheel(files: list[dict], tags: set[Tag]) -> bool:
+    """
+    Checks if any of the locked files of a package is a wheel installable
+    for the given tags.
+    """
+    for f in files:
+        try:
+            _, _, _, wheel_tags = parse_wheel_filename(f["file"])
+        except InvalidWheelFilename:
+            continue
+        if not wheel_tags.isdisjoint(tags):
+            return True
+    return False
@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import ast
+import configparser
+import os
+from fnmatch import fnmatch
+
+from poetry_plugin_lambda_build.dists import DIST_INFO_SUFFIX, remove_empty_dirs
+
+TREE_SHAKE_REPORT_SUFFIX = ".tree-shake.json"
+SOURCE_SUFFIX = ".py"
+NATIVE_SUFFIX = ".so"
+# calls importing modules by names computed at runtime
+IMPORT_CALLS = {"import_module", "__import__"}
+# calls discovering or loading modules without naming them
+DISCOVERY_CALLS = {
+    "iter_modules",
+    "walk_packages",
+    "extend_path",
+    "declare_namespace",
+    "entry_points",
+    "iter_entry_points",
+    "load_entry_point",
+    "spec_from_file_location",
+    "exec_module",
+    "load_module",
+}
+SCRIPT_GROUPS = {"console_scripts", "gui_scripts"}
+# escapes which may import a module of any package by its name
+DYNAMIC_IMPORT_ESCAPE = "dynamic import"
+PARSE_ERROR_ESCAPE = "cannot be parsed"
+
+
+def get_module_name(path: str) -> str | None:
+    """
+    Returns the name of the module of a path relative to the search root,
+    or None when the path cannot be imported.
+    """
+    parts = path.replace(os.sep, "/").split("/")
+    filename = parts.pop()
+    if filename.endswith(SOURCE_SUFFIX):
+        name = filename[: -len(SOURCE_SUFFIX)]
+    elif filename.endswith(NATIVE_SUFFIX):
+        # extension modules are named like _speedups.cpython-312-x86_64-linux-gnu.so
+        name = filename.split(".", 1)[0]
+    else:
+        return None
+    if name != "__init__":
+        parts.append(name)
+    if not parts or not all(part.isidentifier() for part in parts):
+        return None
+    return ".".join(parts)
+
+
+def index_modules(roots: list[str]) -> dict[str, str]:
+    """
+    Maps names of modules found in the search roots to their files, the
+    first root providing a module wins as on sys.path.
+    """
+    modules = {}
+    for root in roots:
+        for base_path, dirs, files in os.walk(root):
+            dirs[:] = [d for d in dirs if d.isidentifier()]
+            for file in files:
+                path = os.path.join(base_path, file)
+                name = get_module_name(os.path.relpath(path, root))
+                if name is not None:
+                    modules.setdefault(name, path)
+    return modules
+
+
+def resolve_relative(
+    module: str | None, level: int, name: str, is_package: bool
+) -> str:
+    if not level:
+        return module or ""
+    parts = name.split(".")
+    base = parts if is_package else parts[:-1]
+    base = base[: len(base) - level + 1]
+    return ".".join(base + ([module] if module else []))
+
+
+def _call_name(node: ast.Call) -> str | None:
+    if isinstance(node.func, ast.Name):
+        return node.func.id
+    if isinstance(node.func, ast.Attribute):
+        return node.func.attr
+    return None
+
+
+def parse_imports(path: str, name: str) -> tuple[set[str], list[str]]:
+    """
+    Returns names imported by the module and descriptions of imports which
+    cannot be resolved statically.
+    """
+    is_package = os.path.basename(path) == "__init__.py"
+    try:
+        with open(path, "rb") as f:
+            tree = ast.parse(f.read(), path)
+    except (SyntaxError, ValueError) as e:
+        return set(), [f"{PARSE_ERROR_ESCAPE}: {e}"]
+
+    imports, escapes = set(), []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = resolve_relative(node.module, node.level, name, is_package)
+            imports.add(base)
+            for alias in node.names:
+                imports.add(f"{base}.{alias.name}")
+        elif isinstance(node, ast.Call):
+            call = _call_name(node)
+            if call in IMPORT_CALLS:
+                arg = node.args[0] if node.args else None
+                if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+                    imported = arg.value
+                    if imported.startswith("."):
+                        level = len(imported) - len(imported.lstrip("."))
+                        imported = resolve_relative(
+                            imported.lstrip(".") or None, level, name, is_package
+                        )
+                    imports.add(imported)
+                else:
+                    escapes.append(f"{DYNAMIC_IMPORT_ESCAPE} at line {node.lineno}")
+            elif call in DISCOVERY_CALLS:
+                escapes.append(f"{call} at line {node.lineno}")
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name == "__getattr__":
+            escapes.append(f"module __getattr__ at line {node.lineno}")
+    return imports, escapes
+
+
+def read_entry_points(roots: list[str]) -> list[str]:
+    """
+    Returns modules of entry points of installed distributions, which may be
+    loaded by name through importlib.metadata. Scripts are not included.
+    """
+    modules = []
+    for root in roots:
+        if not os.path.isdir(root):
+            continue
+        for entry in os.listdir(root):
+            path = os.path.join(root, entry, "entry_points.txt")
+            if not entry.endswith(DIST_INFO_SUFFIX) or not os.path.isfile(path):
+                continue
+            parser = configparser.ConfigParser(delimiters=("=",), interpolation=None)
+            parser.optionxform = str
+            try:
+                parser.read(path)
+            except configparser.Error:
+                continue
+            for group in parser.sections():
+                if group not in SCRIPT_GROUPS:
+                    for value in parser[group].values():
+                        modules.append(value.split(":", 1)[0].strip())
+    return modules
+
+
+def _parents(name: str) -> list[str]:
+    parts = name.split(".")
+    return [".".join(parts[:i]) for i in range(1, len(parts))]
+
+
+def find_reachable(
+    modules: dict[str, str], roots: list[str], keep: list[str]
+) -> tuple[dict[str, str], dict[str, list[str]]]:
+    """
+    Walks the import graph from the root modules and modules matching keep
+    patterns. A dynamic import or a native extension makes all modules of
+    its top-level package reachable. Returns reachable modules with the
+    reason they were reached, and escapes per module.
+    """
+    reached, escapes = {}, {}
+    queue = [(root, "root") for root in roots]
+    queue += [(name, "keep") for name in modules if any(fnmatch(name, k) for k in keep)]
+    while queue:
+        name, reason = queue.pop()
+        if name not in modules or name in reached:
+            continue
+        reached[name] = reason
+        queue += [(parent, f"parent of {name}") for parent in _parents(name)]
+        path = modules[name]
+        if path.endswith(SOURCE_SUFFIX):
+            imports, module_escapes = parse_imports(path, name)
+        else:
+            imports, module_escapes = set(), ["native extension"]
+        for imported in imports:
+            if imported.endswith(".*"):
+                # star imports may load any submodule listed in __all__
+                base = imported[:-2]
+                queue += [
+                    (other, f"imported by {name}")
+                    for other in modules
+                    if other.rpartition(".")[0] == base
+                ]
+                continue
+            queue += [(parent, f"imported by {name}") for parent in _parents(imported)]
+            queue.append((imported, f"imported by {name}"))
+        if module_escapes:
+            escapes[name] = module_escapes
+            package = name.split(".", 1)[0]
+            queue += [
+                (other, f"escape in {name}")
+                for other in modules
+                if other == package or other.startswith(package + ".")
+            ]
+    return reached, escapes
+
+
+def find_unresolved(escapes: dict[str, list[str]]) -> list[str]:
+    """
+    Returns modules with escapes which may import modules of any package,
+    so no other module is provably unreachable.
+    """
+    return sorted(
+        name
+        for name, module_escapes in escapes.items()
+        if any(
+            escape.startswith((DYNAMIC_IMPORT_ESCAPE, PARSE_ERROR_ESCAPE))
+            for escape in module_escapes
+        )
+    )
+
+
+def shake_tree(
+    roots: list[str],
+    dir: str,
+    entry_points: list[str],
+    keep: list[str],
+    force: bool = False,
+) -> dict:
+    """
+    Removes source modules of dir not reachable from the entry points in
+    the import graph of the search roots, which include dir. Data files,
+    native extensions and distribution metadata are kept. When reachable
+    modules import modules by names computed at runtime, unreachable
+    modules are only reported unless force is set. Returns the
+    reachability report.
+    """
+    modules = index_modules(roots)
+    entry_points = list(entry_points) + read_entry_points(roots)
+    reached, escapes = find_reachable(modules, entry_points, keep)
+    unresolved = find_unresolved(escapes)
+    dir = os.path.abspath(dir)
+    unreachable, removed, removed_bytes, dirs = {}, {}, 0, set()
+    for name, path in sorted(modules.items()):
+        path = os.path.abspath(path)
+        if (
+            name in reached
+            or not path.endswith(SOURCE_SUFFIX)
+            or not path.startswith(dir + os.sep)
+        ):
+            continue
+        unreachable[name] = os.path.relpath(path, dir)
+        if unresolved and not force:
+            continue
+        cache_dir = os.path.join(os.path.dirname(path), "__pycache__")
+        stem = os.path.basename(path)[: -len(SOURCE_SUFFIX)] + "."
+        files = [path]
+        if os.path.isdir(cache_dir):
+            files += [
+                os.path.join(cache_dir, f)
+                for f in os.listdir(cache_dir)
+                if f.startswith(stem) and f.endswith(".pyc")
+            ]
+        for file in files:
+            removed_bytes += os.path.getsize(file)
+            os.remove(file)
+            dirs.add(os.path.dirname(file))
+        removed[name] = unreachable[name]
+    remove_empty_dirs(dir, dirs)
+    return {
+        "entry_points": entry_points,
+        "keep": keep,
+        "reachable": dict(sorted(reached.items())),
+        "escapes": dict(sorted(escapes.items())),
+        "unresolved": unresolved,
+        "unreachable": unreachable,
+        "removed": removed,
+        "removed_bytes": removed_bytes,
+    }
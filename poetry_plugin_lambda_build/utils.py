@@ -1,15 +1,10 @@
 from __future__ import annotations
 
-import hashlib
 import os
 import subprocess
 import sys
 from contextlib import contextmanager
-from fnmatch import fnmatch
-from functools import reduce
 from logging import Logger
-from operator import or_
-from pathlib import Path
 from typing import Generator
 
 
@@ -121,21 +116,3 @@ def format_cmd(cmd: list[str], **kwargs) -> list[str]:
         )
         .split(split_marker)
     )
-
-
-def compute_checksum(path: str | Path, exclude: None | list[str | Path] = None) -> str:
-    m = hashlib.md5()
-
-    if exclude is None:
-        exclude = []
-    if os.path.isdir(path):
-        for root, _, files in os.walk(path):
-            for file_read in files:
-                full_path = os.path.join(root, file_read)
-                if not reduce(
-                    or_, [fnmatch(full_path, pattern) for pattern in exclude], False
-                ):
-                    m.update(str(os.stat(full_path)).encode())
-    else:
-        m.update(str(os.stat(path)).encode())
-    return m.hexdigest()
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+from tempfile import mkdtemp
+
+from packaging.utils import canonicalize_name, parse_wheel_filename
+from packaging.version import Version
+
+
+def get_sdist_hash(files: list[dict]) -> str | None:
+    for f in files:
+        if not f["file"].endswith(".whl"):
+            return f["hash"]
+    return None
+
+
+def find_wheels(dir: str, name: str, version: str) -> list[str]:
+    wheels = []
+    for filename in os.listdir(dir):
+        if not filename.endswith(".whl"):
+            continue
+        wheel_name, wheel_version, _, _ = parse_wheel_filename(filename)
+        if wheel_name == canonicalize_name(name) and wheel_version == Version(version):
+            wheels.append(os.path.join(dir, filename))
+    return wheels
+
+
+class WheelCache:
+    """
+    Local cache of wheels built from source distributions.
+
+    Entries are keyed by the sdist hash from the lock file, the digest of
+    the image the wheels were built in and the pre-install script, so a
+    change of any of them results in a rebuild.
+    """
+
+    def __init__(
+        self, root: str, image_digest: str, pre_install_script: list[str] | None
+    ) -> None:
+        self._root = root
+        m = hashlib.sha256()
+        m.update(image_digest.encode())
+        for arg in pre_install_script or []:
+            m.update(b"\0" + arg.encode())
+        self._salt = m.hexdigest()
+
+    def key(self, sdist_hash: str) -> str:
+        return hashlib.sha256(f"{self._salt}:{sdist_hash}".encode()).hexdigest()
+
+    def path(self, sdist_hash: str) -> str:
+        key = self.key(sdist_hash)
+        return os.path.join(self._root, key[:2], key)
+
+    def get(self, sdist_hash: str) -> str | None:
+        path = self.path(sdist_hash)
+        if os.path.isdir(path) and os.listdir(path):
+            return path
+        return None
+
+    def put(self, sdist_hash: str, wheels: list[str]) -> str:
+        path = self.path(sdist_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_dir = mkdtemp(dir=os.path.dirname(path), prefix=".tmp-")
+        for wheel in wheels:
+            shutil.copy2(wheel, tmp_dir)
+        try:
+            os.rename(tmp_dir, path)
+        except OSError:
+            # entry was stored concurrently
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return path
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import NamedTemporaryFile
+from typing import TYPE_CHECKING
+
+from packaging.utils import InvalidWheelFilename, parse_wheel_filename
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from packaging.tags import Tag
+    from poetry.core.packages.package import Package
+    from poetry.repositories import Repository, RepositoryPool
+    from poetry.utils.authenticator import Authenticator
+
+INDEX_SOURCE_TYPES = (None, "legacy")
+CHUNK_SIZE = 1024 * 64
+
+
+class WheelhouseError(Exception):
+    pass
+
+
+def select_files(files: list[dict], tags: set[Tag]) -> list[dict]:
+    """
+    Returns the locked files installable with the given tags, falling back
+    to the source distributions when no wheel is compatible.
+    """
+    wheels, sdists = [], []
+    for f in files:
+        try:
+            _, _, _, wheel_tags = parse_wheel_filename(f["file"])
+        except InvalidWheelFilename:
+            sdists.append(f)
+            continue
+        if not wheel_tags.isdisjoint(tags):
+            wheels.append(f)
+    return wheels or sdists
+
+
+def _split_hash(value: str) -> tuple[str, str]:
+    if ":" in value:
+        algorithm, digest = value.split(":", 1)
+        return algorithm, digest
+    return "sha256", value
+
+
+def file_hash(path: str, algorithm: str = "sha256") -> str:
+    m = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            m.update(chunk)
+    return m.hexdigest()
+
+
+class Wheelhouse:
+    """
+    Local directory of locked artifacts used as --find-links source.
+
+    Every file is validated against the hash from the lock file. Verified
+    hashes are remembered together with the size and mtime of the file, so
+    unchanged files are not read again on the next build.
+    """
+
+    INDEX_FILE = ".index.json"
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        try:
+            with open(os.path.join(path, self.INDEX_FILE)) as f:
+                self._index = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self._index = {}
+
+    def is_valid(self, file: dict) -> bool:
+        path = os.path.join(self.path, file["file"])
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False
+        entry = [stat.st_size, stat.st_mtime_ns, file["hash"]]
+        if self._index.get(file["file"]) == entry:
+            return True
+        algorithm, digest = _split_hash(file["hash"])
+        if file_hash(path, algorithm) != digest:
+            return False
+        self._index[file["file"]] = entry
+        return True
+
+    def add(self, file: dict, chunks: Iterable[bytes]) -> None:
+        algorithm, digest = _split_hash(file["hash"])
+        m = hashlib.new(algorithm)
+        with NamedTemporaryFile(dir=self.path, prefix=".tmp-", delete=False) as f:
+            try:
+                for chunk in chunks:
+                    m.update(chunk)
+                    f.write(chunk)
+            except BaseException:
+                os.remove(f.name)
+                raise
+        if m.hexdigest() != digest:
+            os.remove(f.name)
+            raise WheelhouseError(f"Hash mismatch for downloaded file {file['file']}")
+        path = os.path.join(self.path, file["file"])
+        os.replace(f.name, path)
+        stat = os.stat(path)
+        self._index[file["file"]] = [stat.st_size, stat.st_mtime_ns, file["hash"]]
+
+    def save(self) -> None:
+        with open(os.path.join(self.path, self.INDEX_FILE), "w") as f:
+            json.dump(self._index, f)
+
+
+def _get_repository(pool: RepositoryPool, package: Package) -> Repository:
+    if package.source_type:
+        return pool.repository(package.source_reference)
+    elif not pool.has_repository("pypi"):
+        return pool.repositories[0]
+    return pool.repository("pypi")
+
+
+def fill_wheelhouse(
+    wheelhouse: Wheelhouse,
+    packages: list[Package],
+    tags: set[Tag],
+    pool: RepositoryPool,
+    authenticator: Authenticator,
+    max_workers: int | None = None,
+) -> tuple[int, int]:
+    """
+    Downloads locked files missing from the wheelhouse or not matching
+    their lock hashes. Returns numbers of fetched and reused files.
+    """
+    todo = []
+    reused = 0
+    for package in packages:
+        if package.source_type not in INDEX_SOURCE_TYPES:
+            continue
+        files = [f for f in select_files(package.files, tags) if "hash" in f]
+        missing = [f for f in files if not wheelhouse.is_valid(f)]
+        reused += len(files) - len(missing)
+        if missing:
+            todo.append((package, missing))
+
+    def fetch(package: Package, files: list[dict]) -> int:
+        links = {
+            link.filename: link.url_without_fragment
+            for link in _get_repository(pool, package).find_links_for_package(
+                package
+            )
+        }
+        for f in files:
+            if f["file"] not in links:
+                raise WheelhouseError(
+                    f"{f['file']} of {package.pretty_name} was not found in"
+                    " the package source"
+                )
+            response = authenticator.get(links[f["file"]], stream=True)
+            with response:
+                wheelhouse.add(f, response.iter_content(CHUNK_SIZE))
+        return len(files)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(fetch, *args) for args in todo]
+            fetched = sum(future.result() for future in futures)
+    finally:
+        wheelhouse.save()
+    return fetched, reused
@@ -1,10 +1,55 @@
 from __future__ import annotations
 
+import base64
+import bz2
+import hashlib
+import io
 import os
+import shutil
+import struct
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from fnmatch import fnmatch
-from functools import reduce
+from functools import partial, reduce
 from operator import or_
-from zipfile import ZIP_BZIP2, ZIP_DEFLATED, ZIP_LZMA, ZIP_STORED, ZipFile
+from tempfile import NamedTemporaryFile
+from zipfile import (
+    ZIP64_LIMIT,
+    ZIP_BZIP2,
+    ZIP_DEFLATED,
+    ZIP_LZMA,
+    ZIP_STORED,
+    BadZipFile,
+    LZMACompressor,
+    ZipFile,
+    ZipInfo,
+)
+
+CHUNK_SIZE = 1024 * 8
+# general purpose flag bit 1, set for LZMA data with an end-of-stream marker
+LZMA_EOS_FLAG = 0x02
+# local file header, lengths of the file name and extra field are the last
+# two fields
+FILE_HEADER_SIZE = 30
+FILE_HEADER_LENGTHS = struct.Struct("<2H")
+AUTO = "auto"
+CODE_SHA256_SUFFIX = ".code-sha256"
+# 1980-01-01, the earliest timestamp of zip entries
+ZIP_EPOCH = 315532800
+# already compressed formats, deflating them only costs time
+STORED_SUFFIXES = (
+    ".whl", ".zip", ".jar", ".egg", ".gz", ".tgz", ".bz2", ".xz", ".lzma",
+    ".zst", ".7z", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".woff",
+    ".woff2", ".mp3", ".mp4",
+)
+# text formats deflating well
+DEFLATED_SUFFIXES = (
+    ".py", ".pyi", ".json", ".txt", ".md", ".rst", ".html", ".css", ".js",
+    ".csv", ".xml", ".yaml", ".yml", ".toml", ".cfg", ".ini", ".typed",
+    ".pth",
+)
 
 compression = {
     "ZIP_STORED": ZIP_STORED,
@@ -14,20 +59,490 @@ compression = {
 }
 
 
-def create_zip_package(dir, output, exclude=None, **kwargs):
-    if "compression" in kwargs:
-        kwargs["compression"] = compression[kwargs["compression"]]
+def iter_files(dir, exclude):
+    for base_path, _, files in os.walk(dir):
+        for file in files:
+            file_path = os.path.join(base_path, file)
+
+            if not reduce(
+                or_, [fnmatch(file_path, pattern) for pattern in exclude], False
+            ):
+                yield file_path, file_path.replace(dir, "")
+
+
+def file_digests(path):
+    """
+    Returns the CRC, size and SHA-256 of the file read in a single pass.
+    """
+    crc, size, m = 0, 0, hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE * 128), b""):
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            m.update(chunk)
+    return crc, size, m.hexdigest()
+
+
+def get_source_date_time():
+    """
+    Returns the timestamp of reproducible entries, SOURCE_DATE_EPOCH if set
+    or the earliest date supported by the zip format.
+    """
+    epoch = int(os.environ.get("SOURCE_DATE_EPOCH", ZIP_EPOCH))
+    return time.gmtime(max(epoch, ZIP_EPOCH))[:6]
+
+
+def get_zinfo(zip_file, file_path, arcname, date_time=None):
+    """
+    Returns the entry metadata ZipFile.write would write for the file. With
+    date_time the timestamp, permissions and creator system are normalized.
+    """
+    zinfo = ZipInfo.from_file(file_path, arcname)
+    if date_time is not None:
+        zinfo.date_time = date_time
+        zinfo.create_system = 3
+        executable = (zinfo.external_attr >> 16) & 0o111
+        zinfo.external_attr = (0o100755 if executable else 0o100644) << 16
+    zinfo.compress_type = zip_file.compression
+    zinfo._compresslevel = zip_file.compresslevel
+    zinfo.flag_bits = 0x00
+    if zinfo.compress_type == ZIP_LZMA:
+        # compressed data includes an end-of-stream marker
+        zinfo.flag_bits |= LZMA_EOS_FLAG
+    return zinfo
+
+
+def read_raw(zip_file, zinfo):
+    """
+    Yields compressed data of the entry without decompressing it.
+    """
+    fp = zip_file.fp
+    fp.seek(zinfo.header_offset)
+    header = fp.read(FILE_HEADER_SIZE)
+    filename_length, extra_length = FILE_HEADER_LENGTHS.unpack(
+        header[-FILE_HEADER_LENGTHS.size :]
+    )
+    fp.seek(filename_length + extra_length, os.SEEK_CUR)
+    remaining = zinfo.compress_size
+    while remaining:
+        chunk = fp.read(min(CHUNK_SIZE, remaining))
+        if not chunk:
+            raise EOFError(f"Truncated entry {zinfo.filename}")
+        remaining -= len(chunk)
+        yield chunk
+
+
+def kernel_copy(in_fd, out_fd, count):
+    if hasattr(os, "copy_file_range"):
+        try:
+            return os.copy_file_range(in_fd, out_fd, count)
+        except OSError:
+            # not supported by the kernel or between the file systems
+            pass
+    return os.sendfile(out_fd, in_fd, None, count)
+
+
+def copy_file_data(fp, path, size):
+    """
+    Appends size bytes of the file to fp. The data is moved by the kernel
+    with copy_file_range or sendfile when possible, otherwise it is copied
+    through Python buffers.
+    """
+    fp.flush()
+    start = fp.tell()
+    copied = 0
+    with open(path, "rb") as src:
+        try:
+            while copied < size:
+                n = kernel_copy(src.fileno(), fp.fileno(), size - copied)
+                if not n:
+                    break
+                copied += n
+        except (OSError, AttributeError, io.UnsupportedOperation):
+            pass
+        # file offsets were moved past the buffered objects
+        fp.seek(start + copied)
+        src.seek(copied)
+        while copied < size:
+            chunk = src.read(min(CHUNK_SIZE, size - copied))
+            if not chunk:
+                break
+            fp.write(chunk)
+            copied += len(chunk)
+    if copied != size:
+        raise OSError(f"{path} changed while it was written to the archive")
+
+
+def write_raw(zip_file, zinfo, chunks):
+    """
+    Appends an entry with already compressed data, given as chunks or the
+    path of a stored file. CRC, file_size and compress_size of zinfo have
+    to be set, the local header is written the same way as by ZipFile.write.
+    """
+    zip64 = zinfo.file_size * 1.05 > ZIP64_LIMIT
+    zip_file.fp.seek(zip_file.start_dir)
+    zinfo.header_offset = zip_file.fp.tell()
+    zip_file._writecheck(zinfo)
+    zip_file._didModify = True
+    zip_file.fp.write(zinfo.FileHeader(zip64))
+    if isinstance(chunks, str):
+        copy_file_data(zip_file.fp, chunks, zinfo.compress_size)
+    else:
+        for chunk in chunks:
+            zip_file.fp.write(chunk)
+    zip_file.start_dir = zip_file.fp.tell()
+    zip_file.filelist.append(zinfo)
+    zip_file.NameToInfo[zinfo.filename] = zinfo
+
+
+def get_comment(compression, compresslevel, *args):
+    comment = f"compression={compression};compresslevel={compresslevel}"
+    for arg in args:
+        comment += f";{arg}"
+    return comment.encode()
+
+
+def open_previous(output, comment):
+    """
+    Opens the previous artifact if its entries were compressed with the
+    same settings and can be reused.
+    """
+    try:
+        previous = ZipFile(output, "r")
+    except (FileNotFoundError, BadZipFile):
+        return None
+    if previous.comment != comment:
+        previous.close()
+        return None
+    return previous
+
+
+def get_compressor(compress_type, compresslevel=None):
+    """
+    Returns the compressor ZipFile.write uses for the compression method.
+    """
+    if compress_type == ZIP_DEFLATED:
+        if compresslevel is None:
+            compresslevel = zlib.Z_DEFAULT_COMPRESSION
+        return zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+    if compress_type == ZIP_BZIP2:
+        return bz2.BZ2Compressor(9 if compresslevel is None else compresslevel)
+    if compress_type == ZIP_LZMA:
+        return LZMACompressor()
+    return None
+
+
+def compress_file(path, compress_type, compresslevel):
+    """
+    Compresses the file the same way as ZipFile.write and returns its CRC,
+    size, compressed data, the time it took and SHA-256 of the file.
+    """
+    start = time.perf_counter()
+    compressor = get_compressor(compress_type, compresslevel)
+    crc, size, chunks, m = 0, 0, [], hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            m.update(chunk)
+            chunks.append(compressor.compress(chunk) if compressor else chunk)
+    if compressor:
+        chunks.append(compressor.flush())
+    return crc, size, chunks, time.perf_counter() - start, m.hexdigest()
+
+
+def stored_file(path):
+    """
+    Returns the CRC, size and SHA-256 of the file stored without
+    compression, its data is copied later by write_raw.
+    """
+    crc, size, sha256 = file_digests(path)
+    return crc, size, path, 0.0, sha256
+
+
+def choose_compression(path, ratio, sample_size):
+    """
+    Picks ZIP_DEFLATED for files of text types and ZIP_STORED for already
+    compressed ones. Other files are deflated if a fast compression of
+    their first sample_size bytes shrinks them at least to the given ratio.
+    """
+    name = path.lower()
+    if name.endswith(STORED_SUFFIXES):
+        return ZIP_STORED
+    if name.endswith(DEFLATED_SUFFIXES):
+        return ZIP_DEFLATED
+    with open(path, "rb") as f:
+        sample = f.read(sample_size)
+    if sample and len(zlib.compress(sample, 1)) <= ratio * len(sample):
+        return ZIP_DEFLATED
+    return ZIP_STORED
+
+
+def new_stats():
+    return {
+        compress_type: {"files": 0, "size": 0, "compress_size": 0, "time": 0.0}
+        for compress_type in (ZIP_STORED, ZIP_DEFLATED, ZIP_BZIP2, ZIP_LZMA)
+    }
+
+
+def get_code_sha256(path):
+    """
+    Returns the base64 encoded SHA-256 of the archive, as CodeSha256 of
+    Lambda functions and layers.
+    """
+    m = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE * 128), b""):
+            m.update(chunk)
+    return base64.b64encode(m.digest()).decode()
+
+
+def get_tree_digest(manifest):
+    """
+    Returns SHA-256 of the archived tree computed from the manifest: entry
+    names, permissions and content digests.
+    """
+    m = hashlib.sha256()
+    for name in sorted(manifest):
+        m.update(f"{name}\0{manifest[name][4]:o}\0{manifest[name][3]}\n".encode())
+    return m.hexdigest()
+
+
+def format_stats(stats):
+    """
+    Summarizes the auto compression policy: bytes saved by deflating and
+    the compression time saved by storing, estimated from the throughput
+    of the deflated entries.
+    """
+    stored, deflated = stats[ZIP_STORED], stats[ZIP_DEFLATED]
+    saved_bytes = deflated["size"] - deflated["compress_size"]
+    throughput = deflated["size"] / deflated["time"] if deflated["time"] else 0
+    saved_time = stored["size"] / throughput if throughput else 0
+    return (
+        f"deflated {deflated['files']} files saving {saved_bytes} bytes, "
+        f"stored {stored['files']} files ({stored['size']} bytes) saving "
+        f"~{saved_time:.2f}s of compression"
+    )
+
+
+def write_zip(
+    output,
+    files,
+    comment,
+    previous=None,
+    workers=None,
+    policy=None,
+    date_time=None,
+    manifest=None,
+    **kwargs,
+):
+    """
+    Writes the archive to the path or file object and returns statistics
+    per compression method and the manifest of entries: size, mtime, CRC,
+    SHA-256 and mode of their files.
+
+    Compressed files are read once, digests are computed in the pass
+    compressing them. Stored files are read for their digests first, as the
+    CRC precedes the data, and their data is copied afterwards, by the
+    kernel when possible. Their size and mtime are checked after the copy
+    to detect files changed in between. Entries of files with the size and mtime recorded in the
+    previous manifest are copied from the previous archive without reading
+    the files. Other files of the same size are compared with the previous
+    archive by CRC and with the manifest by SHA-256, so reinstalled files
+    with new mtimes are not compressed again.
+
+    With date_time, entries are normalized by get_zinfo, so the archive is
+    reproducible.
+    """
+    previous_entries = {} if previous is None else previous.NameToInfo
+    parallel = workers is not None and workers > 1
+    # number of entries processed ahead of the writer
+    window = 2 * (workers or os.cpu_count() or 1)
+    pending = deque()
+    stats = new_stats()
+    new_manifest = {}
+
+    with ZipFile(output, "w", **kwargs) as zip_file, ThreadPoolExecutor(
+        max_workers=workers
+    ) as executor:
+        zip_file.comment = comment
+
+        def write_pending(limit):
+            while len(pending) > limit:
+                zinfo, mtime_ns, result = pending.popleft()
+                if isinstance(result, Future):
+                    result = result.result()
+                zinfo.CRC, zinfo.file_size, data, elapsed, sha256 = result
+                if isinstance(data, str):
+                    zinfo.compress_size = zinfo.file_size
+                elif isinstance(data, list):
+                    zinfo.compress_size = sum(len(chunk) for chunk in data)
+                # otherwise data of a reused entry with compress_size set
+                write_raw(zip_file, zinfo, data)
+                if isinstance(data, str) and os.stat(data).st_mtime_ns != mtime_ns:
+                    raise OSError(
+                        f"{data} changed while it was written to the archive"
+                    )
+                new_manifest[zinfo.filename] = [
+                    zinfo.file_size,
+                    mtime_ns,
+                    zinfo.CRC,
+                    sha256,
+                    zinfo.external_attr >> 16,
+                ]
+                entry = stats[zinfo.compress_type]
+                entry["files"] += 1
+                entry["size"] += zinfo.file_size
+                entry["compress_size"] += zinfo.compress_size
+                entry["time"] += elapsed
+
+        for file_path, arcname in files:
+            zinfo = get_zinfo(zip_file, file_path, arcname, date_time)
+            mtime_ns = os.stat(file_path).st_mtime_ns
+            prev = previous_entries.get(zinfo.filename)
+            recorded = (manifest or {}).get(zinfo.filename)
+            result = None
+            if (
+                prev is not None
+                and recorded is not None
+                and recorded[:3] == [zinfo.file_size, mtime_ns, prev.CRC]
+            ):
+                # auto policy settings are part of the archive comment, so the
+                # previous decision is still valid
+                zinfo.compress_type = prev.compress_type
+                result = (prev.CRC, prev.file_size, None, 0.0, recorded[3])
+            else:
+                if policy is not None:
+                    zinfo.compress_type = policy(file_path)
+                if (
+                    prev is not None
+                    and prev.file_size == zinfo.file_size
+                    and prev.compress_type == zinfo.compress_type
+                ):
+                    crc, size, sha256 = file_digests(file_path)
+                    if crc == prev.CRC and (recorded is None or recorded[3] == sha256):
+                        result = (crc, size, None, 0.0, sha256)
+            if result is not None:
+                zinfo.compress_size = prev.compress_size
+                result = result[:2] + (read_raw(previous, prev),) + result[3:]
+            elif zinfo.compress_type == ZIP_STORED:
+                result = executor.submit(stored_file, file_path)
+            else:
+                args = (file_path, zinfo.compress_type, zinfo._compresslevel)
+                if parallel:
+                    result = executor.submit(compress_file, *args)
+                else:
+                    result = compress_file(*args)
+            pending.append((zinfo, mtime_ns, result))
+            write_pending(window)
+        write_pending(0)
+    return stats, new_manifest
+
+
+def create_zip_package(
+    dir,
+    output,
+    exclude=None,
+    incremental=False,
+    workers=None,
+    auto_ratio=0.9,
+    auto_sample_size=64 * 1024,
+    reproducible=False,
+    manifest=None,
+    **kwargs,
+):
+    """
+    Creates the zip archive and returns statistics per compression method,
+    the manifest of its entries and the digest of the archived tree. The
+    manifest of the previous build lets unchanged files be skipped without
+    reading them when the previous archive is reused.
+
+    Reproducible archives have sorted entries with normalized metadata and
+    are accompanied by the output.code-sha256 file holding the base64
+    encoded SHA-256 of the archive, the CodeSha256 reported by Lambda.
+    """
+    policy = None
+    if kwargs.get("compression") == AUTO:
+        # text files are deflated at zip-compresslevel, the rest is decided per file
+        kwargs["compression"] = ZIP_DEFLATED
+        policy = partial(
+            choose_compression, ratio=auto_ratio, sample_size=auto_sample_size
+        )
+        comment = get_comment(
+            AUTO, kwargs.get("compresslevel"), auto_ratio, auto_sample_size
+        )
+    else:
+        if "compression" in kwargs:
+            kwargs["compression"] = compression[kwargs["compression"]]
+        comment = get_comment(
+            kwargs.get("compression", ZIP_STORED), kwargs.get("compresslevel")
+        )
 
     if exclude is None:
         exclude = ["*.pyc", "*__pycache__/*"]
 
-    with ZipFile(output, "w", **kwargs) as zip_file:
-        for i in os.walk(dir):
-            base_path, _, files = i
-            for file in files:
-                file_path = os.path.join(base_path, file)
+    files = iter_files(dir, exclude)
+    date_time = None
+    if reproducible:
+        files = sorted(files, key=lambda file: file[1])
+        date_time = get_source_date_time()
+    write = partial(
+        write_zip,
+        files=files,
+        comment=comment,
+        workers=workers,
+        policy=policy,
+        date_time=date_time,
+        manifest=manifest,
+        **kwargs,
+    )
 
-                if not reduce(
-                    or_, [fnmatch(file_path, pattern) for pattern in exclude], False
-                ):
-                    zip_file.write(file_path, arcname=file_path.replace(dir, ""))
+    def write_output(path, previous=None):
+        result = {}
+        result["methods"], result["manifest"] = write(path, previous=previous)
+        if reproducible:
+            # hashed in a separate pass, so stored entries are still copied
+            # by the kernel into the archive file
+            result["code_sha256"] = get_code_sha256(path)
+            with open(output + CODE_SHA256_SUFFIX, "w") as f:
+                f.write(result["code_sha256"])
+        result["digest"] = get_tree_digest(result["manifest"])
+        return result
+
+    previous = open_previous(output, comment) if incremental else None
+    if previous is None:
+        # the output may be linked to the artifact cache, it is replaced
+        # instead of being truncated
+        if os.path.lexists(output):
+            os.remove(output)
+        return write_output(output)
+
+    # unchanged entries are copied from the previous artifact, so the new one
+    # is written next to it and replaces it when complete
+    with previous:
+        with NamedTemporaryFile(
+            dir=os.path.dirname(output) or None, prefix=".tmp-", delete=False
+        ) as tmp:
+            pass
+        try:
+            result = write_output(tmp.name, previous)
+        except BaseException:
+            os.remove(tmp.name)
+            raise
+    shutil.copymode(output, tmp.name)
+    os.replace(tmp.name, output)
+    return result
+
+
+def extract_zip(path, dir):
+    """
+    Extracts the archive keeping file modes and modification times.
+    """
+    with ZipFile(path, "r") as zip_file:
+        for info in zip_file.infolist():
+            extracted = zip_file.extract(info, dir)
+            mode = info.external_attr >> 16
+            if mode and not info.is_dir():
+                os.chmod(extracted, mode & 0o7777)
+            mtime = time.mktime(info.date_time + (0, 0, -1))
+            os.utime(extracted, (mtime, mtime))
@@ -65,6 +65,36 @@ ZIP_BUILDS_PARAMS = {
             ),
         ],
     ),
+    "layer function separated on local with uv": (
+        {
+            "installer": "uv",
+            "layer-install-dir": "python",
+            "layer-artifact-path": "layer.zip",
+            "function-artifact-path": "function.zip",
+        },
+        {},
+        [
+            lambda: assert_file_exists_in_zip("layer.zip", "python"),
+            lambda: assert_file_exists_in_zip(
+                "function.zip", files=["test_project/handler.py"]
+            ),
+        ],
+    ),
+    "layer function separated on local for lambda runtime": (
+        {
+            "lambda-runtime": f"python{PYTHON_VER}",
+            "layer-install-dir": "python",
+            "layer-artifact-path": "layer.zip",
+            "function-artifact-path": "function.zip",
+        },
+        {},
+        [
+            lambda: assert_file_exists_in_zip("layer.zip", "python"),
+            lambda: assert_file_exists_in_zip(
+                "function.zip", files=["test_project/handler.py"]
+            ),
+        ],
+    ),
     "all in one on local": (
         {"package-artifact-path": "function.zip", "package-install-dir": "python"},
         {},
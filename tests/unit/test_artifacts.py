@@ -0,0 +1,40 @@
+import os
+
+from poetry_plugin_lambda_build.artifacts import ArtifactCache
+
+
+def test_artifact_cache_file(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"))
+    target = str(tmp_path / "layer.zip")
+    with open(target, "wb") as f:
+        f.write(b"zip")
+
+    assert cache.restore("ab" * 32, target) is None
+    cache.put("ab" * 32, target, {"packages": {"attrs": "attrs==23.1.0"}})
+    os.remove(target)
+
+    meta = cache.restore("ab" * 32, target)
+    assert meta == {"packages": {"attrs": "attrs==23.1.0"}}
+    with open(target, "rb") as f:
+        assert f.read() == b"zip"
+
+    # files left at the root by interrupted downloads are not prefixes
+    with open(os.path.join(cache.root, ".tmp-abc"), "wb") as f:
+        f.write(b"zip")
+    assert cache.gc(60) == 0
+    os.utime(cache.path("ab" * 32), (0, 0))
+    assert cache.gc(60) == 1
+    assert cache.get("ab" * 32) is None
+
+
+def test_artifact_cache_dir(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"))
+    target = tmp_path / "function"
+    (target / "pkg").mkdir(parents=True)
+    (target / "pkg" / "handler.py").write_text("handler")
+    cache.put("cd" * 32, str(target), {})
+
+    (target / "stale.py").write_text("stale")
+    assert cache.restore("cd" * 32, str(target)) == {}
+    assert sorted(os.listdir(target)) == ["pkg"]
+    assert (target / "pkg" / "handler.py").read_text() == "handler"
@@ -0,0 +1,88 @@
+import os
+import sys
+from zipfile import ZipFile
+
+from poetry_plugin_lambda_build.benchmark import (LAMBDA_OPT_DIR,
+                                                  LAMBDA_TASK_DIR,
+                                                  compare_reports,
+                                                  find_latest_report,
+                                                  get_benchmark_artifacts,
+                                                  load_report, measure_import,
+                                                  prepare_layout, save_report,
+                                                  summarize)
+from poetry_plugin_lambda_build.parameters import ParametersContainer
+
+
+def test_get_benchmark_artifacts():
+    parameters = ParametersContainer()
+    assert get_benchmark_artifacts(parameters, "/project") == {
+        LAMBDA_TASK_DIR: "/project/package.zip"
+    }
+    parameters.put("package-install-dir", "python")
+    assert get_benchmark_artifacts(parameters, "/project") == {
+        LAMBDA_OPT_DIR: "/project/package.zip"
+    }
+    parameters.put("function-artifact-path", "function.zip")
+    parameters.put("layer-artifact-path", "layer")
+    assert get_benchmark_artifacts(parameters, "/project") == {
+        LAMBDA_TASK_DIR: "/project/function.zip",
+        LAMBDA_OPT_DIR: "/project/layer",
+    }
+
+
+def test_measure_import(tmp_path):
+    function = tmp_path / "function.zip"
+    with ZipFile(function, "w") as zip_file:
+        zip_file.writestr("app/__init__.py", "")
+        zip_file.writestr("app/handler.py", "import lib\n")
+    layer = tmp_path / "layer" / "python" / "lib"
+    layer.mkdir(parents=True)
+    (layer / "__init__.py").write_text("import lib.core\n")
+    (layer / "core.py").write_text("")
+
+    root = str(tmp_path / "root")
+    prepare_layout(
+        root,
+        {LAMBDA_TASK_DIR: str(function), LAMBDA_OPT_DIR: str(tmp_path / "layer")},
+    )
+    assert os.path.isfile(os.path.join(root, "var", "task", "app", "handler.py"))
+
+    init_time, modules = measure_import(None, sys.executable, root, "app.handler")
+    assert init_time > 0
+    assert {"app", "app.handler", "lib", "lib.core"} <= set(modules)
+    self_us, cumulative_us = modules["lib"]
+    assert cumulative_us >= self_us
+
+
+def test_compare_reports(tmp_path):
+    baseline = {
+        "created": "2024-01-01T00:00:00+00:00",
+        **summarize(
+            [
+                (0.010, {"a": [5000, 8000], "b": [3000, 3000]}),
+                (0.012, {"a": [6000, 9000], "b": [3000, 3000]}),
+            ],
+            1,
+        ),
+    }
+    assert baseline["init_ms"]["median"] == 11.0
+    assert baseline["modules"]["a"] == {"self_us": 5500, "cumulative_us": 8500}
+    assert baseline["slowest"] == ["a"]
+    report = {
+        "created": "2024-01-02T00:00:00+00:00",
+        **summarize([(0.0055, {"a": [2750, 2750], "c": [4000, 4000]})], 1),
+    }
+    assert compare_reports(baseline, report) == [
+        "Compared with the report of 2024-01-01T00:00:00+00:00: median init time"
+        " -5.5 (-50%) ms",
+        "  c: new, 4.0 ms",
+        "  a: -2.8 (-50%) ms",
+        "Modules imported: 1 new, 1 no longer imported",
+    ]
+
+    dir = str(tmp_path / "benchmarks")
+    assert find_latest_report(dir) is None
+    save_report(dir, baseline)
+    path = save_report(dir, report)
+    assert find_latest_report(dir) == path
+    assert load_report(path) == report
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+from poetry_plugin_lambda_build.bytecode import (COMPILE_BYTECODE_CMD_TMPL,
+                                                 find_module,
+                                                 get_optimize_args,
+                                                 merge_bytecode)
+from poetry_plugin_lambda_build.utils import format_cmd
+
+
+def test_compile_bytecode(tmp_path):
+    compiled = tmp_path / "compiled"
+    (compiled / "app").mkdir(parents=True)
+    (compiled / "app" / "__init__.py").write_text("")
+    (compiled / "app" / "handler.py").write_text("def handler(event, context): pass\n")
+    assert find_module(str(compiled), "app.handler") is not None
+    assert find_module(str(compiled), "app") is not None
+    assert find_module(str(compiled), "missing") is None
+
+    cmd = format_cmd(
+        COMPILE_BYTECODE_CMD_TMPL,
+        optimize=get_optimize_args([0, 1]),
+        output_dir=str(compiled),
+    )
+    subprocess.run([sys.executable, *cmd[1:]], check=True)
+    pycs = sorted(os.listdir(compiled / "app" / "__pycache__"))
+    assert len(pycs) == 4
+    with open(compiled / "app" / "__pycache__" / pycs[0], "rb") as f:
+        # flags of unchecked hash-based pycs
+        assert int.from_bytes(f.read(8)[4:], "little") == 0b01
+
+    dir = tmp_path / "artifact"
+    (dir / "app").mkdir(parents=True)
+    (dir / "app" / "handler.py").write_text("def handler(event, context): pass\n")
+    assert merge_bytecode(str(compiled), str(dir)) == 1
+    assert sorted(os.listdir(dir / "app" / "__pycache__")) == pycs
@@ -0,0 +1,64 @@
+import os
+from zipfile import ZipFile
+
+from poetry_plugin_lambda_build.dedup import (DEDUP_IDENTICAL, DEDUP_LAYER,
+                                              find_duplicates,
+                                              get_manifest_digests,
+                                              get_tree_digests, get_zip_digests,
+                                              remove_entries, strip_install_dir)
+from poetry_plugin_lambda_build.zip import create_zip_package
+from tests.utils import write
+
+
+def test_find_duplicates(tmp_path):
+    function_dir = str(tmp_path / "function")
+    layer_dir = str(tmp_path / "layer")
+    write(
+        function_dir,
+        {
+            "app/handler.py": "import shared, other",
+            "shared/__init__.py": "",
+            "shared/__pycache__/__init__.cpython-312.pyc": "pyc",
+            "shared-1.0.dist-info/RECORD": "shared/__init__.py,,",
+            "other/__init__.py": "VERSION = 2",
+            "single.py": "",
+        },
+    )
+    write(
+        layer_dir,
+        {
+            "python/shared/__init__.py": "",
+            "python/shared/extra.py": "",
+            "python/shared-1.0.dist-info/RECORD": "shared/__init__.py,,",
+            "python/other/__init__.py": "VERSION = 1",
+            "python/single.py": "",
+        },
+    )
+    layer = strip_install_dir(get_tree_digests(layer_dir), "python")
+    function = get_tree_digests(function_dir)
+    assert "shared/__pycache__/__init__.cpython-312.pyc" not in function
+
+    drop, conflicts = find_duplicates(function, layer, DEDUP_IDENTICAL)
+    assert drop == ["shared", "shared-1.0.dist-info", "single.py"]
+    assert conflicts == {"other": ["other/__init__.py"]}
+    drop, _ = find_duplicates(function, layer, DEDUP_LAYER)
+    assert drop == ["other", "shared", "shared-1.0.dist-info", "single.py"]
+
+    assert remove_entries(function_dir, ["shared", "single.py"]) == 3
+    assert sorted(os.listdir(function_dir)) == ["app", "other", "shared-1.0.dist-info"]
+
+
+def test_layer_digests(tmp_path):
+    layer_dir = str(tmp_path / "layer")
+    write(layer_dir, {"python/lib/__init__.py": "x = 1", "python/lib/data.txt": "y"})
+    output = str(tmp_path / "layer.zip")
+    result = create_zip_package(dir=layer_dir, output=output)
+    expected = get_tree_digests(layer_dir)
+    assert get_manifest_digests(result["manifest"]) == expected
+    assert get_zip_digests(output) == expected
+    with ZipFile(output) as zip_file:
+        assert sorted(zip_file.namelist()) == sorted(expected)
+    assert strip_install_dir(expected, "python") == {
+        "lib/__init__.py": expected["python/lib/__init__.py"],
+        "lib/data.txt": expected["python/lib/data.txt"],
+    }
@@ -0,0 +1,28 @@
+import os
+
+from poetry_plugin_lambda_build.dists import (
+    diff_requirements,
+    iter_distributions,
+    uninstall_distribution,
+)
+from tests.utils import install
+
+
+def test_uninstall_distribution(tmp_path):
+    site_dir = str(tmp_path)
+    install(site_dir, "my_pkg", "1.0", ["my_pkg/__init__.py", "my_pkg/sub/mod.py"])
+    install(site_dir, "other", "2.0", ["other.py", "../../../bin/other"])
+
+    assert uninstall_distribution(site_dir, "My-Pkg") == 3
+    assert not os.path.exists(tmp_path / "my_pkg")
+    assert [name for name, _, _ in iter_distributions(site_dir)] == ["other"]
+
+    assert uninstall_distribution(site_dir, "other") == 3
+    assert not os.path.exists(tmp_path / "bin" / "other")
+    assert os.listdir(site_dir) == []
+
+
+def test_diff_requirements():
+    previous = {"a": "a==1.0", "b": "b==1.0", "c": "c==1.0"}
+    current = {"a": "a==1.0", "b": "b==2.0", "d": "d==1.0"}
+    assert diff_requirements(previous, current) == (["b", "c"], ["b", "d"])
@@ -0,0 +1,105 @@
+import os
+
+from poetry_plugin_lambda_build.fingerprint import (get_fingerprint,
+                                                    get_fingerprint_parameters,
+                                                    get_inputs_stamp,
+                                                    get_targets_stamp,
+                                                    hash_tree)
+from poetry_plugin_lambda_build.parameters import ParametersContainer
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def test_hash_tree(tmp_path):
+    root = str(tmp_path)
+    write(os.path.join(root, "src", "handler.py"), "handler")
+    write(os.path.join(root, "layer.zip"), "artifact")
+    write(os.path.join(root, ".git", "HEAD"), "ref")
+    write(os.path.join(root, "src", "__pycache__", "handler.pyc"), "bytecode")
+    exclude = [os.path.join(root, "layer.zip")]
+
+    digest, hashes = hash_tree(root, exclude, {})
+    assert sorted(hashes) == [os.path.join("src", "handler.py")]
+
+    # known hashes are trusted while the size and mtime do not change
+    stale = {name: [*entry[:2], "stale"] for name, entry in hashes.items()}
+    assert hash_tree(root, exclude, stale)[0] != digest
+    assert hash_tree(root, exclude, hashes)[0] == digest
+
+    write(os.path.join(root, "layer.zip"), "other artifact")
+    assert hash_tree(root, exclude, {})[0] == digest
+    write(os.path.join(root, "src", "handler.py"), "changed")
+    assert hash_tree(root, exclude, {})[0] != digest
+
+
+def test_fingerprint_parameters():
+    parameters = ParametersContainer()
+    parameters["layer-artifact-path"] = "layer.zip"
+    parameters["function-artifact-path"] = "function.zip"
+    fingerprint = get_fingerprint("layer", parameters, {"poetry.lock": "abc"})
+
+    parameters["function-install-dir"] = "python"
+    parameters["zip-workers"] = 4
+    parameters["no-checksum"] = True
+    assert get_fingerprint("layer", parameters, {"poetry.lock": "abc"}) == fingerprint
+    assert "function-install-dir" not in get_fingerprint_parameters("layer", parameters)
+
+    parameters["zip-compression"] = "ZIP_DEFLATED"
+    assert get_fingerprint("layer", parameters, {"poetry.lock": "abc"}) != fingerprint
+    assert get_fingerprint("layer", parameters, {"poetry.lock": "def"}) != fingerprint
+
+
+def test_fingerprint_handler():
+    parameters = ParametersContainer()
+    parameters["size-report"] = True
+    parameters["benchmark-runs"] = 20
+    assert get_fingerprint_parameters("package", parameters) == (
+        get_fingerprint_parameters("package", ParametersContainer())
+    )
+
+    # the handler is read only by tree shaking and bytecode compilation
+    parameters["handler"] = "app.handler"
+    assert "handler" not in get_fingerprint_parameters("package", parameters)
+    parameters["compile-bytecode"] = True
+    assert "handler" in get_fingerprint_parameters("package", parameters)
+    parameters["compile-bytecode"] = False
+    parameters["tree-shake"] = True
+    assert "handler" in get_fingerprint_parameters("package", parameters)
+
+
+def test_stamps(tmp_path):
+    root = str(tmp_path)
+    parameters = ParametersContainer()
+    parameters["layer-artifact-path"] = "layer.zip"
+    write(os.path.join(root, "src", "handler.py"), "handler")
+    inputs, targets = get_inputs_stamp(root, parameters), get_targets_stamp(root, parameters)
+
+    write(os.path.join(root, "layer.zip"), "artifact")
+    assert get_inputs_stamp(root, parameters) == inputs
+    assert get_targets_stamp(root, parameters) != targets
+
+    os.utime(os.path.join(root, "src", "handler.py"), ns=(0, 0))
+    assert get_inputs_stamp(root, parameters) != inputs
+    inputs = get_inputs_stamp(root, parameters)
+    parameters["zip-compression"] = "ZIP_DEFLATED"
+    assert get_inputs_stamp(root, parameters) != inputs
+
+
+def test_inputs_stamp_python(tmp_path):
+    root = str(tmp_path / "project")
+    parameters = ParametersContainer()
+    write(os.path.join(root, "src", "handler.py"), "handler")
+    write(str(tmp_path / "python3.11"), "python3.11")
+    write(str(tmp_path / "python3.12"), "python3.12")
+    python = str(tmp_path / "python")
+    os.symlink(str(tmp_path / "python3.11"), python)
+    inputs = get_inputs_stamp(root, parameters, python)
+    assert get_inputs_stamp(root, parameters) != inputs
+
+    os.remove(python)
+    os.symlink(str(tmp_path / "python3.12"), python)
+    assert get_inputs_stamp(root, parameters, python) != inputs
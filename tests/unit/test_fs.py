@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from poetry_plugin_lambda_build.fs import (SYNC_HASH, SYNC_MTIME, move_tree,
+                                            remove_ignored, sync_tree)
+
+
+def test_move_tree(tmp_path):
+    src = tmp_path / "staging"
+    (src / "pkg" / "__pycache__").mkdir(parents=True)
+    (src / "pkg" / "handler.py").write_text("handler")
+    (src / "pkg" / "__pycache__" / "handler.pyc").write_text("bytecode")
+    inode = os.stat(src / "pkg" / "handler.py").st_ino
+
+    remove_ignored(str(src), ["__pycache__"])
+    dst = tmp_path / "target"
+    move_tree(str(src), str(dst))
+    assert os.listdir(src) == []
+    assert os.listdir(dst / "pkg") == ["handler.py"]
+    assert os.stat(dst / "pkg" / "handler.py").st_ino == inode
+
+    # existing targets are updated by replacing files, not writing to them
+    (src / "pkg").mkdir()
+    (src / "pkg" / "handler.py").write_text("changed")
+    os.link(dst / "pkg" / "handler.py", tmp_path / "linked.py")
+    move_tree(str(src), str(dst))
+    assert (dst / "pkg" / "handler.py").read_text() == "changed"
+    assert (tmp_path / "linked.py").read_text() == "handler"
+
+
+@pytest.mark.parametrize("mode", [SYNC_HASH, SYNC_MTIME])
+def test_sync_tree(tmp_path, mode):
+    dst = tmp_path / "target"
+    for name, content in [("pkg/a.py", "a"), ("pkg/b.py", "b"), ("old/c.py", "c")]:
+        (dst / name).parent.mkdir(parents=True, exist_ok=True)
+        (dst / name).write_text(content)
+    src = tmp_path / "staging"
+    (src / "pkg").mkdir(parents=True)
+    (src / "pkg" / "a.py").write_text("a")
+    (src / "pkg" / "b.py").write_text("changed")
+    (src / "new.py").write_text("new")
+    stat = os.stat(dst / "pkg" / "a.py")
+    os.utime(src / "pkg" / "a.py", ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    inode = stat.st_ino
+
+    counts = sync_tree(str(src), str(dst), mode)
+    assert counts == {"added": 1, "updated": 1, "removed": 1, "unchanged": 1}
+    assert sorted(os.listdir(dst)) == ["new.py", "pkg"]
+    assert (dst / "pkg" / "b.py").read_text() == "changed"
+    assert os.stat(dst / "pkg" / "a.py").st_ino == inode
@@ -0,0 +1,25 @@
+import pytest
+from poetry.console.exceptions import PoetryConsoleError
+
+from poetry_plugin_lambda_build.commands import get_installer_cmds
+from poetry_plugin_lambda_build.parameters import ParametersContainer
+
+
+def test_installer_default():
+    assert ParametersContainer()["installer"] == "pip"
+
+
+def test_installer_put():
+    container = ParametersContainer()
+    container.parse_tokens(["installer=uv"])
+    assert container["installer"] == "uv"
+    assert get_installer_cmds(container["installer"])["deps"][:3] == [
+        "uv",
+        "pip",
+        "install",
+    ]
+
+
+def test_installer_bad_value():
+    with pytest.raises(PoetryConsoleError):
+        ParametersContainer().put("installer", "conda")
@@ -0,0 +1,259 @@
+import os
+from types import SimpleNamespace
+from zipfile import ZipFile
+
+import pytest
+
+from poetry_plugin_lambda_build import recipes
+from poetry_plugin_lambda_build.parameters import ParametersContainer
+from poetry_plugin_lambda_build.recipes import Builder, BuildType
+from tests.utils import install
+
+# installers compile modules, so distributions come with bytecode
+FILES = ["{}/__init__.py", "{}/__pycache__/__init__.cpython-312.pyc"]
+
+
+class FakeCommand:
+    def __init__(self):
+        self.poetry = SimpleNamespace(package=SimpleNamespace(name="app"))
+        self.env = SimpleNamespace(supported_tags=["cp312-cp312-linux_x86_64"])
+        self.lines = []
+
+    def info(self, line: str):
+        self.lines.append(line)
+
+    warning = debug = error = info
+
+
+@pytest.fixture
+def make_builder(tmp_path, monkeypatch):
+    """
+    Returns a factory of builders of a separate layer locking the given
+    requirements and installing fake distributions instead of running
+    installers.
+    """
+    monkeypatch.setattr(recipes, "CURRENT_WORK_DIR", str(tmp_path))
+    monkeypatch.setattr(recipes, "STATE_DIR", str(tmp_path / ".state"))
+
+    def make(requirements: dict[str, str], **kwargs) -> Builder:
+        with open(tmp_path / "poetry.lock", "w") as f:
+            f.write("\n".join(requirements.values()))
+        parameters = ParametersContainer()
+        parameters.update(
+            {
+                "layer-artifact-path": "layer.zip",
+                "function-artifact-path": "function.zip",
+                "cache-dir": str(tmp_path / "cache"),
+                **kwargs,
+            }
+        )
+        monkeypatch.setattr(
+            recipes, "get_requirement_lines", lambda cmd, parameters: requirements
+        )
+        builder = Builder(FakeCommand(), parameters)
+        builder.installed = []
+
+        def install_requirements(
+            requirements_dir, layer_output_dir, package_filter=None
+        ):
+            for name, line in requirements.items():
+                if package_filter is None or package_filter(SimpleNamespace(name=name)):
+                    files = [f.format(name) for f in FILES]
+                    install(layer_output_dir, name, line.split("==")[1], files)
+                    builder.installed.append(name)
+
+        monkeypatch.setattr(
+            builder, "_install_layer_requirements", install_requirements
+        )
+        return builder
+
+    return make
+
+
+@pytest.mark.parametrize(
+    "parameters,expected",
+    [
+        ({}, BuildType.MERGED),
+        (
+            {"layer-artifact-path": "layer.zip", "function-artifact-path": "f.zip"},
+            BuildType.SEPARATED,
+        ),
+        ({"docker-image": "img"}, BuildType.IN_CONTAINER_MERGED),
+        ({"docker-image": "img", "hybrid": True}, BuildType.HYBRID_MERGED),
+        (
+            {
+                "docker-image": "img",
+                "hybrid": True,
+                "layer-artifact-path": "layer.zip",
+                "function-artifact-path": "f.zip",
+            },
+            BuildType.HYBRID_SEPARATED,
+        ),
+        ({"hybrid": True}, BuildType.MERGED),
+    ],
+)
+def test_build_type(parameters: dict, expected: BuildType):
+    assert BuildType.get_type(parameters) == expected
+
+
+def test_update_separate_layer(tmp_path, make_builder):
+    layer = str(tmp_path / "layer.zip")
+    make_builder({"a": "a==1.0", "b": "b==1.0"}).build_separate_layer_package()
+
+    requirements = {"a": "a==1.0", "b": "b==2.0", "c": "c==1.0"}
+    builder = make_builder(requirements, incremental=True)
+    builder.build_separate_layer_package()
+    assert builder.installed == ["b", "c"]
+    with ZipFile(layer) as zip_file:
+        updated = sorted(zip_file.namelist())
+
+    builder = make_builder(requirements, **{"no-checksum": True})
+    builder.build_separate_layer_package()
+    assert builder.installed == ["a", "b", "c"]
+    with ZipFile(layer) as zip_file:
+        assert sorted(zip_file.namelist()) == updated
+    assert "b/__pycache__/__init__.cpython-312.pyc" in updated
+    assert "b-1.0.dist-info/RECORD" not in updated
+
+
+def test_build_separate_layer_hybrid(tmp_path, monkeypatch, make_builder):
+    packages = [
+        SimpleNamespace(
+            name="numpy",
+            files=[
+                {"file": "numpy-2.0-cp312-cp312-manylinux_2_17_x86_64.whl"},
+                {"file": "numpy-2.0.tar.gz"},
+            ],
+        ),
+        SimpleNamespace(name="six", files=[{"file": "six-1.0-py2.py3-none-any.whl"}]),
+        SimpleNamespace(name="legacy", files=[{"file": "legacy-1.0.tar.gz"}]),
+        SimpleNamespace(
+            name="windows", files=[{"file": "windows-1.0-cp312-cp312-win32.whl"}]
+        ),
+    ]
+    for package in packages:
+        package.pretty_name = package.name
+
+    def get_requirements(cmd, parameters, package_filter=None, with_hashes=True):
+        return "".join(
+            f"{p.name}==1.0\n"
+            for p in packages
+            if package_filter is None or package_filter(p)
+        )
+
+    monkeypatch.setattr(recipes, "get_requirements", get_requirements)
+    builder = make_builder(
+        {}, **{"docker-image": "img", "hybrid": True, "lambda-runtime": "python3.12"}
+    )
+    calls = []
+
+    def build(where):
+        def run(requirements_path, layer_output_dir, **kwargs):
+            with open(requirements_path) as f:
+                calls.append((where, f.read(), kwargs))
+
+        return run
+
+    monkeypatch.setattr(builder, "_build_separate_layer_on_local", build("host"))
+    monkeypatch.setattr(
+        builder, "_build_separate_layer_in_container", build("container")
+    )
+
+    builder._build_separate_layer_hybrid(str(tmp_path), str(tmp_path / "layer"))
+    assert calls == [
+        ("host", "numpy==1.0\nsix==1.0\n", {"no_deps": True}),
+        (
+            "container",
+            "legacy==1.0\nwindows==1.0\n",
+            {"cmd_name": "deps_in_container_no_deps"},
+        ),
+    ]
+
+    calls.clear()
+    builder._build_separate_layer_hybrid(
+        str(tmp_path), str(tmp_path / "layer"), lambda p: p.name == "six"
+    )
+    assert calls == [("host", "six==1.0\n", {"no_deps": True})]
+
+
+def test_install_layer_from_store(tmp_path, make_builder):
+    layer = tmp_path / "layer"
+    parameters = {"layer-artifact-path": "layer", "store": True}
+    builder = make_builder({"a": "a==1.0", "b": "b==1.0"}, **parameters)
+    builder.build_separate_layer_package()
+    assert builder.installed == ["a", "b"]
+
+    builder = make_builder({"a": "a==1.0", "c": "c==1.0"}, **parameters)
+    builder.build_separate_layer_package()
+    assert builder.installed == ["c"]
+    assert sorted(os.listdir(layer)) == ["a", "a-1.0.dist-info", "c", "c-1.0.dist-info"]
+    assert (layer / "a" / "__init__.py").read_text() == "a/__init__.py"
+    store = builder._distribution_store()
+    assert store.get("b==1.0") is not None
+    # distributions are linked from the store into the layer
+    stored = os.path.join(store.get("c==1.0"), "c", "__init__.py")
+    assert os.path.samefile(layer / "c" / "__init__.py", stored)
+
+
+def test_verify_checksum_artifact_cache(tmp_path, make_builder):
+    layer = str(tmp_path / "layer.zip")
+    parameters = {"artifact-cache": True}
+    first = {"a": "a==1.0"}
+    make_builder(first, **parameters).build_separate_layer_package()
+    with ZipFile(layer) as zip_file:
+        entries = sorted(zip_file.namelist())
+
+    builder = make_builder(first, **parameters)
+    builder.build_separate_layer_package()
+    assert builder.installed == []
+    assert "No changes detected in target: layer.zip" in builder.cmd.lines
+
+    make_builder({"b": "b==1.0"}, **parameters).build_separate_layer_package()
+    builder = make_builder(first, **parameters)
+    builder.build_separate_layer_package()
+    assert builder.installed == []
+    assert "Restored target from artifact cache: layer.zip" in builder.cmd.lines
+    with ZipFile(layer) as zip_file:
+        assert sorted(zip_file.namelist()) == entries
+    assert builder.state.get_packages("layer.zip") == first
+
+
+def test_tree_shake_install_dir(tmp_path, make_builder):
+    builder = make_builder(
+        {},
+        **{
+            "layer-artifact-path": None,
+            "function-artifact-path": None,
+            "package-artifact-path": "package.zip",
+            "package-install-dir": "python",
+            "handler": "app.handler",
+        },
+    )
+    site_dir = tmp_path / "package" / "python"
+    site_dir.mkdir(parents=True)
+    (site_dir / "app.py").write_text("import helper\n")
+    (site_dir / "helper.py").write_text("")
+    (site_dir / "unused.py").write_text("")
+    builder._tree_shake(str(tmp_path / "package"), str(tmp_path / "package.zip"))
+    assert sorted(os.listdir(site_dir)) == ["app.py", "helper.py"]
+
+
+def test_tree_shake_layer_function_install_dir(tmp_path, make_builder):
+    builder = make_builder(
+        {},
+        **{
+            "layer-artifact-path": "layer",
+            "layer-install-dir": "python",
+            "function-artifact-path": "function",
+            "function-install-dir": "src",
+            "handler": "app.handler",
+        },
+    )
+    (tmp_path / "function" / "src").mkdir(parents=True)
+    (tmp_path / "function" / "src" / "app.py").write_text("import lib\n")
+    site_dir = tmp_path / "staging" / "python"
+    site_dir.mkdir(parents=True)
+    (site_dir / "lib.py").write_text("")
+    (site_dir / "unused.py").write_text("")
+    builder._tree_shake(str(tmp_path / "staging"), str(tmp_path / "layer"))
+    assert sorted(os.listdir(site_dir)) == ["lib.py"]
@@ -0,0 +1,72 @@
+import os
+import threading
+
+import pytest
+
+from poetry_plugin_lambda_build.artifacts import ArtifactCache
+from poetry_plugin_lambda_build.cache_server import create_server
+from poetry_plugin_lambda_build.remote import (CAS, FileSystemBackend,
+                                               HttpBackend, RemoteCache,
+                                               RemoteCacheError)
+
+FINGERPRINT = "ab" * 32
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = create_server("127.0.0.1", 0, str(tmp_path / "server"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", str(tmp_path / "server")
+    server.shutdown()
+    server.server_close()
+
+
+def put_artifact(tmp_path, cache):
+    target = str(tmp_path / "layer.zip")
+    with open(target, "wb") as f:
+        f.write(b"zip" * 1000)
+    cache.put(FINGERPRINT, target, {"packages": {"attrs": "attrs==23.1.0"}})
+
+
+@pytest.mark.parametrize("backend", ["http", "filesystem"])
+def test_remote_cache(tmp_path, server, backend):
+    url, root = server
+    if backend == "http":
+        remote = RemoteCache(HttpBackend(url))
+    else:
+        remote = RemoteCache(FileSystemBackend(root))
+    runner = ArtifactCache(str(tmp_path / "runner"))
+    put_artifact(tmp_path, runner)
+
+    other = ArtifactCache(str(tmp_path / "other"))
+    assert not remote.fetch(FINGERPRINT, other)
+    assert remote.upload(FINGERPRINT, runner)
+    assert remote.fetch(FINGERPRINT, other)
+
+    target = str(tmp_path / "restored.zip")
+    assert other.restore(FINGERPRINT, target) == {
+        "packages": {"attrs": "attrs==23.1.0"}
+    }
+    with open(target, "rb") as f:
+        assert f.read() == b"zip" * 1000
+
+
+def test_remote_cache_integrity(tmp_path, server):
+    url, root = server
+    backend = HttpBackend(url)
+    runner = ArtifactCache(str(tmp_path / "runner"))
+    put_artifact(tmp_path, runner)
+    RemoteCache(backend).upload(FINGERPRINT, runner)
+
+    # the server rejects blobs not matching their address
+    with pytest.raises(RemoteCacheError):
+        backend.put(f"{CAS}/{'cd' * 32}", b"zip")
+
+    (blob,) = os.listdir(os.path.join(root, CAS))
+    with open(os.path.join(root, CAS, blob), "wb") as f:
+        f.write(b"tampered")
+    other = ArtifactCache(str(tmp_path / "other"))
+    with pytest.raises(RemoteCacheError):
+        RemoteCache(backend).fetch(FINGERPRINT, other)
+    assert other.get(FINGERPRINT) is None
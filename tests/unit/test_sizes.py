@@ -0,0 +1,85 @@
+import json
+import time
+from zipfile import ZIP_DEFLATED, ZipFile
+
+from poetry_plugin_lambda_build.sizes import (analyze_artifact, format_bytes,
+                                              format_size_report,
+                                              write_size_report)
+from poetry_plugin_lambda_build.slim import OTHER
+
+
+def write_layer(zip_file, files=100):
+    record = [f"lib/mod_{i}.py,sha256=x,{i}" for i in range(files)]
+    record += ["../../bin/lib-cli,,", "lib-1.0.dist-info/RECORD,,"]
+    for i in range(files):
+        zip_file.writestr(f"python/lib/mod_{i}.py", "x" * i)
+    zip_file.writestr("python/bin/lib-cli", "#!python\n")
+    zip_file.writestr("python/lib-1.0.dist-info/METADATA", "Name: lib\n")
+    zip_file.writestr("python/lib-1.0.dist-info/RECORD", "\n".join(record))
+    zip_file.writestr("python/loose.py", "y" * 1000)
+
+
+def test_analyze_zip(tmp_path):
+    path = str(tmp_path / "layer.zip")
+    with ZipFile(path, "w", ZIP_DEFLATED) as zip_file:
+        write_layer(zip_file, files=10)
+
+    report = analyze_artifact(path, "python", top=2)
+    assert report["files"] == 14
+    assert list(report["distributions"]) == [OTHER, "lib"]
+    assert report["distributions"][OTHER]["files"] == 1
+    assert report["distributions"]["lib"]["files"] == 13
+    assert report["distributions"]["lib"]["compressed_size"] > 0
+    assert list(report["top_level"]) == [
+        "loose.py",
+        "lib-1.0.dist-info",
+        "lib",
+        "bin",
+    ]
+    assert report["top_level"]["lib"]["size"] == sum(range(10))
+    assert [entry["path"] for entry in report["largest"]] == [
+        "python/loose.py",
+        "python/lib-1.0.dist-info/RECORD",
+    ]
+    assert report["largest"][1]["distribution"] == "lib"
+
+
+def test_analyze_tree(tmp_path):
+    path = tmp_path / "layer.zip"
+    with ZipFile(path, "w") as zip_file:
+        write_layer(zip_file, files=3)
+    with ZipFile(path) as zip_file:
+        zip_file.extractall(tmp_path / "layer")
+
+    report = write_size_report(str(tmp_path / "layer"), "python")
+    assert report["compressed_size"] is None
+    assert report["distributions"]["lib"]["files"] == 6
+    zip_report = analyze_artifact(str(path), "python")
+    assert report["size"] == zip_report["size"]
+    assert report["distributions"]["lib"]["size"] == (
+        zip_report["distributions"]["lib"]["size"]
+    )
+    with open(str(tmp_path / "layer") + ".size-report.json") as f:
+        assert json.load(f) == report
+    assert format_size_report(report)[0] == (
+        f"layer: 7 files, {format_bytes(report['size'])} unzipped, - compressed"
+    )
+
+
+def test_analyze_large_zip(tmp_path):
+    path = str(tmp_path / "layer.zip")
+    with ZipFile(path, "w") as zip_file:
+        write_layer(zip_file, files=10000)
+
+    start = time.perf_counter()
+    report = analyze_artifact(path, "python")
+    assert time.perf_counter() - start < 1
+    assert report["distributions"]["lib"]["files"] == 10003
+
+
+def test_format_bytes():
+    assert format_bytes(None) == "-"
+    assert format_bytes(512) == "512 B"
+    assert format_bytes(1536) == "1.5 KiB"
+    assert format_bytes(250 * 1024 * 1024) == "250.0 MiB"
+    assert format_bytes(3 * 1024**3) == "3.0 GiB"
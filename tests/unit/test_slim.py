@@ -0,0 +1,72 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from poetry_plugin_lambda_build.dists import get_file_owners
+from poetry_plugin_lambda_build.slim import (SLIM_RULES, get_package_savings,
+                                             get_pruned_files,
+                                             iter_native_libraries, prune_tree,
+                                             strip_tree)
+from tests.utils import install
+
+
+def test_prune_tree(tmp_path):
+    root = str(tmp_path)
+    site_dir = os.path.join(root, "python")
+    install(
+        site_dir,
+        "my_pkg",
+        "1.0",
+        ["my_pkg/__init__.py", "my_pkg/__init__.pyi", "my_pkg/tests/test_a.py"],
+        metadata=["METADATA", "WHEEL"],
+    )
+    install(
+        site_dir,
+        "other",
+        "1.0",
+        ["other/__init__.py", "other/docs/index.md"],
+        metadata=["METADATA", "WHEEL"],
+    )
+    owners = get_file_owners(root)
+
+    pruned = get_pruned_files(root, SLIM_RULES, ["*/other/docs"])
+    assert sorted(pruned) == [
+        "python/my_pkg-1.0.dist-info/WHEEL",
+        "python/my_pkg/__init__.pyi",
+        "python/my_pkg/tests/test_a.py",
+        "python/other-1.0.dist-info/WHEEL",
+    ]
+    savings = get_package_savings(owners, prune_tree(root, pruned))
+    assert savings == {"my-pkg": 5 + 19 + 22, "other": 5}
+    assert sorted(os.listdir(os.path.join(site_dir, "my_pkg"))) == ["__init__.py"]
+    assert sorted(os.listdir(os.path.join(site_dir, "my_pkg-1.0.dist-info"))) == [
+        "METADATA",
+        "RECORD",
+    ]
+
+
+@pytest.mark.skipif(
+    shutil.which("cc") is None or shutil.which("strip") is None,
+    reason="requires a C compiler and strip",
+)
+def test_strip_tree(tmp_path):
+    source = tmp_path / "lib.c"
+    source.write_text("int answer(void) { return 42; }\n")
+    library = tmp_path / "lib" / "_native.cpython-312-x86_64-linux-gnu.so"
+    library.parent.mkdir()
+    subprocess.run(
+        ["cc", "-g", "-shared", "-fPIC", "-o", str(library), str(source)], check=True
+    )
+    os.link(library, tmp_path / "store.so")
+    size = os.path.getsize(library)
+
+    libraries = list(iter_native_libraries(str(tmp_path / "lib"), []))
+    assert libraries == [library.name]
+    assert list(iter_native_libraries(str(tmp_path / "lib"), ["*.so"])) == []
+    saved = strip_tree(str(tmp_path / "lib"), libraries)
+    assert saved[str(library)] > 0
+    assert os.path.getsize(library) == size - saved[str(library)]
+    # the linked copy is not modified
+    assert os.path.getsize(tmp_path / "store.so") == size
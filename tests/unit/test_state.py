@@ -0,0 +1,22 @@
+from poetry_plugin_lambda_build.state import BuildState
+
+
+def test_build_state(tmp_path):
+    state = BuildState(str(tmp_path / ".lambda-build" / "state.sqlite"))
+    assert state.get_target("layer.zip") is None
+
+    state.put_target("layer.zip", checksum="abc", parameters={"installer": "pip"})
+    state.put_target("layer.zip", digest="def")
+    target = state.get_target("layer.zip")
+    assert target["checksum"] == "abc"
+    assert target["parameters"] == {"installer": "pip"}
+    assert target["digest"] == "def"
+
+    state.put_files("layer.zip", {"a.py": [1, 2, 3, "sha", 0o644]})
+    state.put_files("layer.zip", {"b.py": [4, 5, 6, "sha", 0o755]})
+    assert state.get_files("layer.zip") == {"b.py": [4, 5, 6, "sha", 0o755]}
+
+    state.put_packages("layer.zip", {"requests": "requests==2.32.3"})
+    assert state.get_packages("layer.zip") == {"requests": "requests==2.32.3"}
+    assert state.get_packages("function.zip") == {}
+    state.close()
@@ -0,0 +1,30 @@
+import os
+
+from poetry_plugin_lambda_build.fs import link_tree
+from poetry_plugin_lambda_build.store import DistributionStore
+from tests.utils import install
+
+
+def test_distribution_store(tmp_path):
+    site_dir = str(tmp_path / "site")
+    install(site_dir, "my_pkg", "1.0", ["my_pkg/__init__.py"])
+    install(site_dir, "other", "1.0", ["other.py"])
+    store = DistributionStore(str(tmp_path / "store"), "env")
+
+    assert store.get("my-pkg==1.0") is None
+    path = store.put("my-pkg==1.0", site_dir, "my-pkg")
+    assert store.get("my-pkg==1.0") == path
+    assert store.put("missing==1.0", site_dir, "missing") is None
+    assert DistributionStore(str(tmp_path / "store"), "other-env").get("my-pkg==1.0") is None
+    assert sorted(os.listdir(site_dir)) == ["other-1.0.dist-info", "other.py"]
+
+    layer_dir = str(tmp_path / "layer")
+    link_tree(path, layer_dir)
+    assert sorted(os.listdir(layer_dir)) == ["my_pkg", "my_pkg-1.0.dist-info"]
+    with open(os.path.join(layer_dir, "my_pkg", "__init__.py")) as f:
+        assert f.read() == "my_pkg/__init__.py"
+
+    assert store.gc(60) == 0
+    os.utime(path, (0, 0))
+    assert store.gc(60) == 1
+    assert store.get("my-pkg==1.0") is None
@@ -0,0 +1,66 @@
+from poetry_plugin_lambda_build.targets import (
+    get_target_install_args,
+    get_target_platforms,
+    get_target_tags,
+    has_compatible_wheel,
+)
+
+
+def test_get_target_platforms_x86_64():
+    platforms = get_target_platforms("python3.12", "x86_64")
+    assert platforms[0] == "manylinux_2_34_x86_64"
+    assert "manylinux_2_17_x86_64" in platforms
+    assert "manylinux_2_16_x86_64" not in platforms
+    assert "manylinux1_x86_64" in platforms
+
+
+def test_get_target_platforms_arm64():
+    platforms = get_target_platforms("python3.11", "arm64")
+    assert platforms[0] == "manylinux_2_26_aarch64"
+    assert platforms[-1] == "manylinux2014_aarch64"
+
+
+def test_get_target_install_args_pip():
+    args = get_target_install_args("pip", "python3.12", "arm64")
+    assert args[:2] == ["--platform", "manylinux_2_34_aarch64"]
+    assert args[-5:] == [
+        "--python-version",
+        "3.12",
+        "--implementation",
+        "cp",
+        "--only-binary=:all:",
+    ]
+
+
+def test_get_target_install_args_uv():
+    assert get_target_install_args("uv", "python3.9", "x86_64") == [
+        "--python-platform",
+        "x86_64-manylinux_2_26",
+        "--python-version",
+        "3.9",
+        "--only-binary",
+        ":all:",
+    ]
+
+
+def test_has_compatible_wheel():
+    tags = get_target_tags("python3.12", "x86_64")
+    assert has_compatible_wheel(
+        [
+            {"file": "six-1.16.0.tar.gz"},
+            {"file": "six-1.16.0-py2.py3-none-any.whl"},
+        ],
+        tags,
+    )
+    assert has_compatible_wheel(
+        [{"file": "lib-1.0-cp312-cp312-manylinux_2_17_x86_64.manylinux2014_x86_64.whl"}],
+        tags,
+    )
+    assert not has_compatible_wheel(
+        [
+            {"file": "lib-1.0.tar.gz"},
+            {"file": "lib-1.0-cp312-cp312-manylinux_2_17_aarch64.whl"},
+            {"file": "lib-1.0-cp311-cp311-manylinux_2_17_x86_64.whl"},
+        ],
+        tags,
+    )
@@ -0,0 +1,152 @@
+import os
+
+from poetry_plugin_lambda_build.treeshake import (find_reachable,
+                                                  get_module_name,
+                                                  index_modules, parse_imports,
+                                                  shake_tree)
+from tests.utils import write
+
+
+def test_get_module_name():
+    assert get_module_name("pkg/__init__.py") == "pkg"
+    assert get_module_name("pkg/sub/mod.py") == "pkg.sub.mod"
+    assert get_module_name("pkg/_ext.cpython-312-x86_64-linux-gnu.so") == "pkg._ext"
+    assert get_module_name("pkg/data.json") is None
+    assert get_module_name("pkg-1.0.dist-info/top.py") is None
+
+
+def test_parse_imports(tmp_path):
+    write(
+        str(tmp_path),
+        {
+            "pkg/sub/__init__.py": (
+                "import os.path\n"
+                "from . import a\n"
+                "from ..b import c\n"
+                "import importlib\n"
+                "importlib.import_module('.d', __name__)\n"
+                "importlib.import_module(name)\n"
+            )
+        },
+    )
+    imports, escapes = parse_imports(
+        os.path.join(str(tmp_path), "pkg/sub/__init__.py"), "pkg.sub"
+    )
+    assert imports == {
+        "os.path",
+        "pkg.sub",
+        "pkg.sub.a",
+        "pkg.b",
+        "pkg.b.c",
+        "importlib",
+        "pkg.sub.d",
+    }
+    assert escapes == ["dynamic import at line 6"]
+
+
+def test_find_reachable(tmp_path):
+    root = str(tmp_path)
+    write(
+        root,
+        {
+            "handler.py": "import lib.used\nimport plugins\n",
+            "lib/__init__.py": "",
+            "lib/used.py": "from .helpers import *\n",
+            "lib/helpers/__init__.py": "",
+            "lib/helpers/a.py": "",
+            "lib/unused.py": "",
+            "plugins/__init__.py": "import pkgutil\npkgutil.iter_modules(__path__)\n",
+            "plugins/extra.py": "",
+            "other/__init__.py": "",
+        },
+    )
+    reached, escapes = find_reachable(index_modules([root]), ["handler"], ["oth*"])
+    assert sorted(reached) == [
+        "handler",
+        "lib",
+        "lib.helpers",
+        "lib.helpers.a",
+        "lib.used",
+        "other",
+        "plugins",
+        "plugins.extra",
+    ]
+    assert reached["other"] == "keep"
+    assert escapes == {"plugins": ["iter_modules at line 2"]}
+
+
+def test_shake_tree(tmp_path):
+    function_dir = os.path.join(str(tmp_path), "function")
+    layer_dir = os.path.join(str(tmp_path), "layer", "python")
+    write(function_dir, {"handler.py": "import lib\n"})
+    write(
+        layer_dir,
+        {
+            "lib/__init__.py": "from lib import _speedups, used\n",
+            "lib/used.py": "",
+            "lib/unused.py": "",
+            "lib/__pycache__/unused.cpython-312.pyc": "",
+            "lib/data.json": "{}",
+            "lib/_speedups.cpython-312-x86_64-linux-gnu.so": "",
+            "plugin/__init__.py": "",
+            "plugin/impl.py": "",
+            "plugin-1.0.dist-info/entry_points.txt": (
+                "[lib.plugins]\nx = plugin.impl:X\n"
+            ),
+            "unused/__init__.py": "",
+        },
+    )
+    report = shake_tree([function_dir, layer_dir], layer_dir, ["handler"], [])
+    assert report["entry_points"] == ["handler", "plugin.impl"]
+    assert report["removed"] == {"unused": "unused/__init__.py"}
+    assert report["escapes"] == {"lib._speedups": ["native extension"]}
+    assert not os.path.exists(os.path.join(layer_dir, "unused"))
+    assert os.path.exists(os.path.join(layer_dir, "lib", "unused.py"))
+    assert os.path.exists(os.path.join(function_dir, "handler.py"))
+
+
+def test_shake_tree_removes_bytecode(tmp_path):
+    root = str(tmp_path)
+    write(
+        root,
+        {
+            "handler.py": "",
+            "lib/__init__.py": "",
+            "lib/unused.py": "x = 1\n",
+            "lib/__pycache__/unused.cpython-312.pyc": "pyc",
+            "lib/data.json": "{}",
+        },
+    )
+    report = shake_tree([root], root, ["handler"], [])
+    assert report["removed"] == {
+        "lib": "lib/__init__.py",
+        "lib.unused": "lib/unused.py",
+    }
+    assert report["removed_bytes"] == 9
+    assert sorted(os.listdir(os.path.join(root, "lib"))) == ["data.json"]
+
+
+def test_shake_tree_unresolved_import(tmp_path):
+    root = str(tmp_path)
+    write(
+        root,
+        {
+            "handler.py": "import importlib, os\n"
+            "importlib.import_module(os.environ['SETTINGS'])\n",
+            "settings/__init__.py": "",
+            "settings/prod.py": "",
+        },
+    )
+    report = shake_tree([root], root, ["handler"], [])
+    assert report["unresolved"] == ["handler"]
+    assert report["unreachable"] == {
+        "settings": "settings/__init__.py",
+        "settings.prod": "settings/prod.py",
+    }
+    assert report["removed"] == {}
+    assert os.path.exists(os.path.join(root, "settings", "prod.py"))
+
+    report = shake_tree([root], root, ["handler"], ["settings.prod"], force=True)
+    assert report["removed"] == {}
+    report = shake_tree([root], root, ["handler"], [], force=True)
+    assert sorted(report["removed"]) == ["settings", "settings.prod"]
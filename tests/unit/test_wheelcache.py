@@ -0,0 +1,44 @@
+import os
+
+from poetry_plugin_lambda_build.wheelcache import (
+    WheelCache,
+    find_wheels,
+    get_sdist_hash,
+)
+
+
+def test_get_sdist_hash():
+    files = [
+        {"file": "pkg-1.0-py3-none-any.whl", "hash": "sha256:wheel"},
+        {"file": "pkg-1.0.tar.gz", "hash": "sha256:sdist"},
+    ]
+    assert get_sdist_hash(files) == "sha256:sdist"
+    assert get_sdist_hash(files[:1]) is None
+
+
+def test_find_wheels(tmp_path):
+    for name in [
+        "my_pkg-1.0-cp312-cp312-linux_x86_64.whl",
+        "other-1.0-cp312-cp312-linux_x86_64.whl",
+        "my_pkg-1.1-cp312-cp312-linux_x86_64.whl",
+    ]:
+        (tmp_path / name).touch()
+    assert find_wheels(str(tmp_path), "My-Pkg", "1.0") == [
+        str(tmp_path / "my_pkg-1.0-cp312-cp312-linux_x86_64.whl")
+    ]
+
+
+def test_wheel_cache(tmp_path):
+    wheel = tmp_path / "pkg-1.0-cp312-cp312-linux_x86_64.whl"
+    wheel.write_bytes(b"wheel")
+    cache = WheelCache(str(tmp_path / "cache"), "sha256:image", ["echo", "hi"])
+
+    assert cache.get("sha256:sdist") is None
+    path = cache.put("sha256:sdist", [str(wheel)])
+    assert cache.get("sha256:sdist") == path
+    assert os.listdir(path) == [wheel.name]
+
+    other_image = WheelCache(str(tmp_path / "cache"), "sha256:other", ["echo", "hi"])
+    other_script = WheelCache(str(tmp_path / "cache"), "sha256:image", None)
+    assert other_image.get("sha256:sdist") is None
+    assert other_script.get("sha256:sdist") is None
@@ -0,0 +1,116 @@
+import hashlib
+import os
+
+import pytest
+
+from poetry_plugin_lambda_build.targets import get_target_tags
+from poetry_plugin_lambda_build.wheelhouse import (
+    Wheelhouse,
+    WheelhouseError,
+    fill_wheelhouse,
+    select_files,
+)
+
+TAGS = get_target_tags("python3.12", "x86_64")
+
+
+def _file(name: str, content: bytes) -> dict:
+    return {"file": name, "hash": f"sha256:{hashlib.sha256(content).hexdigest()}"}
+
+
+def test_select_files_prefers_compatible_wheels():
+    files = [
+        _file("pkg-1.0.tar.gz", b""),
+        _file("pkg-1.0-cp312-cp312-manylinux_2_17_x86_64.whl", b""),
+        _file("pkg-1.0-cp312-cp312-win_amd64.whl", b""),
+    ]
+    assert select_files(files, TAGS) == [files[1]]
+    assert select_files([files[0], files[2]], TAGS) == [files[0]]
+
+
+def test_wheelhouse_validates_hashes(tmp_path):
+    wheelhouse = Wheelhouse(str(tmp_path))
+    f = _file("pkg-1.0-py3-none-any.whl", b"content")
+
+    assert not wheelhouse.is_valid(f)
+    wheelhouse.add(f, [b"con", b"tent"])
+    assert wheelhouse.is_valid(f)
+
+    (tmp_path / f["file"]).write_bytes(b"stale")
+    assert not wheelhouse.is_valid(f)
+
+    with pytest.raises(WheelhouseError):
+        wheelhouse.add(f, [b"other"])
+    assert sorted(os.listdir(tmp_path)) == [f["file"]]
+
+
+class FakeLink:
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.url_without_fragment = f"https://index/{filename}"
+
+
+class FakeRepository:
+    def find_links_for_package(self, package):
+        return [FakeLink(f["file"]) for f in package.files]
+
+
+class FakePool:
+    repositories = [FakeRepository()]
+
+    def has_repository(self, name):
+        return False
+
+
+class FakeResponse:
+    def __init__(self, content: bytes):
+        self.content = content
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def iter_content(self, chunk_size):
+        yield self.content
+
+
+class FakeAuthenticator:
+    def __init__(self, contents: dict):
+        self.contents = contents
+        self.requested = []
+
+    def get(self, url, stream=False):
+        self.requested.append(url)
+        return FakeResponse(self.contents[url.rsplit("/", 1)[-1]])
+
+
+class FakePackage:
+    source_type = None
+    pretty_name = "pkg"
+
+    def __init__(self, files):
+        self.files = files
+
+
+def test_fill_wheelhouse_is_incremental(tmp_path):
+    contents = {
+        "a-1.0-py3-none-any.whl": b"a",
+        "b-1.0-cp312-cp312-manylinux_2_17_x86_64.whl": b"b",
+    }
+    packages = [FakePackage([_file(name, data)]) for name, data in contents.items()]
+    authenticator = FakeAuthenticator(contents)
+
+    assert fill_wheelhouse(
+        Wheelhouse(str(tmp_path)), packages, TAGS, FakePool(), authenticator
+    ) == (2, 0)
+    assert fill_wheelhouse(
+        Wheelhouse(str(tmp_path)), packages, TAGS, FakePool(), authenticator
+    ) == (0, 2)
+
+    os.remove(tmp_path / "a-1.0-py3-none-any.whl")
+    assert fill_wheelhouse(
+        Wheelhouse(str(tmp_path)), packages, TAGS, FakePool(), authenticator
+    ) == (1, 1)
+    assert len(authenticator.requested) == 3
@@ -0,0 +1,239 @@
+import base64
+import hashlib
+import os
+import shutil
+from zipfile import ZIP_BZIP2, ZIP_DEFLATED, ZIP_LZMA, ZIP_STORED, ZipFile
+
+import pytest
+
+from poetry_plugin_lambda_build import zip as zip_module
+from poetry_plugin_lambda_build.zip import (compress_file, create_zip_package,
+                                            format_stats, read_raw)
+
+
+@pytest.fixture
+def package_dir(tmp_path):
+    dir = tmp_path / "package"
+    (dir / "pkg").mkdir(parents=True)
+    for i in range(5):
+        (dir / "pkg" / f"mod{i}.py").write_text(f"value = {i}\n" * 100)
+    return dir
+
+
+def spy(monkeypatch, name):
+    paths = []
+    fun = getattr(zip_module, name)
+
+    def wrapper(path, *args):
+        paths.append(path)
+        return fun(path, *args)
+
+    monkeypatch.setattr(zip_module, name, wrapper)
+    return paths
+
+
+def test_create_zip_package_incremental(tmp_path, package_dir, monkeypatch):
+    output = str(tmp_path / "package.zip")
+    kwargs = dict(compression="ZIP_DEFLATED", compresslevel=9, incremental=True)
+    create_zip_package(str(package_dir), output, **kwargs)
+    (package_dir / "pkg" / "mod0.py").write_text("changed\n")
+    (package_dir / "pkg" / "mod1.py").unlink()
+    (package_dir / "pkg" / "new.py").write_text("new\n")
+
+    compressed = spy(monkeypatch, "compress_file")
+    create_zip_package(str(package_dir), output, **kwargs)
+    monkeypatch.undo()
+    assert sorted(compressed) == [
+        str(package_dir / "pkg" / "mod0.py"),
+        str(package_dir / "pkg" / "new.py"),
+    ]
+
+    reference = str(tmp_path / "reference.zip")
+    create_zip_package(str(package_dir), reference, **dict(kwargs, incremental=False))
+    with open(output, "rb") as f, open(reference, "rb") as g:
+        assert f.read() == g.read()
+    with ZipFile(output) as zip_file:
+        assert zip_file.testzip() is None
+    assert not [f for f in os.listdir(tmp_path) if f.startswith(".tmp-")]
+
+
+def test_create_zip_package_manifest(tmp_path, package_dir, monkeypatch):
+    output = str(tmp_path / "package.zip")
+    kwargs = dict(compression="ZIP_DEFLATED", incremental=True)
+    result = create_zip_package(str(package_dir), output, **kwargs)
+    content = (package_dir / "pkg" / "mod2.py").read_bytes()
+    assert result["manifest"]["pkg/mod2.py"][3] == hashlib.sha256(content).hexdigest()
+    (package_dir / "pkg" / "mod0.py").write_text("changed\n")
+
+    compressed = spy(monkeypatch, "compress_file")
+    digested = spy(monkeypatch, "file_digests")
+    updated = create_zip_package(
+        str(package_dir), output, manifest=result["manifest"], **kwargs
+    )
+    assert compressed == [str(package_dir / "pkg" / "mod0.py")]
+    assert digested == []
+    assert updated["manifest"]["pkg/mod2.py"] == result["manifest"]["pkg/mod2.py"]
+    assert updated["digest"] != result["digest"]
+
+
+def test_create_zip_package_manifest_reinstalled(tmp_path, package_dir, monkeypatch):
+    output = str(tmp_path / "package.zip")
+    kwargs = dict(compression="ZIP_DEFLATED", incremental=True)
+    result = create_zip_package(str(package_dir), output, **kwargs)
+    # staging trees are installed again on every build, so all files get
+    # new mtimes
+    contents = {
+        path.name: path.read_bytes() for path in (package_dir / "pkg").iterdir()
+    }
+    shutil.rmtree(package_dir)
+    (package_dir / "pkg").mkdir(parents=True)
+    for name, content in contents.items():
+        (package_dir / "pkg" / name).write_bytes(content)
+    (package_dir / "pkg" / "mod0.py").write_bytes(b"changed\n")
+    (package_dir / "pkg" / "mod1.py").write_bytes(contents["mod1.py"][::-1])
+
+    compressed = spy(monkeypatch, "compress_file")
+    copied = []
+    read_raw = zip_module.read_raw
+    monkeypatch.setattr(
+        zip_module,
+        "read_raw",
+        lambda zip_file, zinfo: copied.append(zinfo.filename)
+        or read_raw(zip_file, zinfo),
+    )
+    updated = create_zip_package(
+        str(package_dir), output, manifest=result["manifest"], **kwargs
+    )
+    monkeypatch.undo()
+    assert sorted(compressed) == [
+        str(package_dir / "pkg" / "mod0.py"),
+        str(package_dir / "pkg" / "mod1.py"),
+    ]
+    assert sorted(copied) == ["pkg/mod2.py", "pkg/mod3.py", "pkg/mod4.py"]
+    assert updated["manifest"]["pkg/mod2.py"][3] == result["manifest"]["pkg/mod2.py"][3]
+    with ZipFile(output) as zip_file:
+        assert zip_file.testzip() is None
+        assert zip_file.read("pkg/mod3.py") == contents["mod3.py"]
+
+
+@pytest.mark.parametrize(
+    "compression", ["ZIP_STORED", "ZIP_DEFLATED", "ZIP_BZIP2", "ZIP_LZMA"]
+)
+def test_create_zip_package_workers(tmp_path, package_dir, compression):
+    (package_dir / "empty.txt").touch()
+    (package_dir / "data.bin").write_bytes(os.urandom(100_000))
+    serial = str(tmp_path / "serial.zip")
+    parallel = str(tmp_path / "parallel.zip")
+    create_zip_package(str(package_dir), serial, compression=compression)
+    create_zip_package(
+        str(package_dir), parallel, compression=compression, workers=4
+    )
+    with open(serial, "rb") as f, open(parallel, "rb") as g:
+        assert f.read() == g.read()
+
+
+@pytest.mark.parametrize(
+    "compress_type,compresslevel",
+    [
+        (ZIP_STORED, None),
+        (ZIP_DEFLATED, None),
+        (ZIP_DEFLATED, 1),
+        (ZIP_BZIP2, 5),
+        (ZIP_LZMA, None),
+    ],
+)
+def test_compress_file(tmp_path, compress_type, compresslevel):
+    path = tmp_path / "data.txt"
+    path.write_bytes(b"value = 1\n" * 1000 + os.urandom(1000))
+    output = str(tmp_path / "data.zip")
+    with ZipFile(output, "w", compress_type, compresslevel=compresslevel) as f:
+        f.write(path, "data.txt")
+
+    crc, size, chunks, _, _ = compress_file(str(path), compress_type, compresslevel)
+    with ZipFile(output) as zip_file:
+        zinfo = zip_file.getinfo("data.txt")
+        assert (crc, size) == (zinfo.CRC, zinfo.file_size)
+        assert b"".join(chunks) == b"".join(read_raw(zip_file, zinfo))
+
+
+def test_create_zip_package_auto(tmp_path, package_dir):
+    (package_dir / "random.so").write_bytes(os.urandom(10_000))
+    (package_dir / "zeros.so").write_bytes(bytes(10_000))
+    (package_dir / "payload.whl").write_bytes(bytes(10_000))
+    output = str(tmp_path / "package.zip")
+    stats = create_zip_package(str(package_dir), output, compression="auto")["methods"]
+    with ZipFile(output) as zip_file:
+        types = {i.filename: i.compress_type for i in zip_file.infolist()}
+    assert types["random.so"] == ZIP_STORED
+    assert types["zeros.so"] == ZIP_DEFLATED
+    assert types["payload.whl"] == ZIP_STORED
+    assert types["pkg/mod0.py"] == ZIP_DEFLATED
+    assert stats[ZIP_STORED]["files"] == 2
+    assert stats[ZIP_DEFLATED]["files"] == 6
+    assert "deflated 6 files" in format_stats(stats)
+
+
+@pytest.mark.parametrize("kernel_copy", [True, False])
+def test_create_zip_package_stored(tmp_path, package_dir, monkeypatch, kernel_copy):
+    (package_dir / "empty.txt").touch()
+    (package_dir / "data.bin").write_bytes(os.urandom(1_000_000))
+    if not kernel_copy:
+
+        def unsupported(*args):
+            raise OSError("not supported")
+
+        monkeypatch.setattr(zip_module, "kernel_copy", unsupported)
+    output = str(tmp_path / "package.zip")
+    reference = str(tmp_path / "reference.zip")
+    create_zip_package(str(package_dir), output)
+    with ZipFile(reference, "w") as zip_file:
+        zip_file.comment = zip_module.get_comment(ZIP_STORED, None)
+        for file_path, arcname in zip_module.iter_files(str(package_dir), []):
+            zip_file.write(file_path, arcname=arcname)
+    with open(output, "rb") as f, open(reference, "rb") as g:
+        assert f.read() == g.read()
+
+
+def test_create_zip_package_reproducible(tmp_path, package_dir, monkeypatch):
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1700000000")
+    output = str(tmp_path / "package.zip")
+    kwargs = dict(compression="ZIP_DEFLATED", reproducible=True)
+    create_zip_package(str(package_dir), output, **kwargs)
+    with open(output, "rb") as f:
+        first = f.read()
+    with open(output + ".code-sha256") as f:
+        assert f.read() == base64.b64encode(hashlib.sha256(first).digest()).decode()
+
+    for path in (package_dir / "pkg").iterdir():
+        os.utime(path, (0, 1_000_000_000))
+        path.chmod(0o600)
+    create_zip_package(str(package_dir), output, **kwargs)
+    with open(output, "rb") as f:
+        assert f.read() == first
+    with ZipFile(output) as zip_file:
+        assert zip_file.testzip() is None
+        assert zip_file.namelist() == sorted(zip_file.namelist())
+        assert {i.date_time for i in zip_file.infolist()} == {(2023, 11, 14, 22, 13, 20)}
+        assert {i.external_attr >> 16 for i in zip_file.infolist()} == {0o100644}
+
+
+def test_create_zip_package_reproducible_stored(tmp_path, package_dir, monkeypatch):
+    copies = spy(monkeypatch, "kernel_copy")
+    output = str(tmp_path / "package.zip")
+    create_zip_package(str(package_dir), output, reproducible=True)
+    assert copies
+    with open(output, "rb") as f, open(output + ".code-sha256") as g:
+        assert g.read() == base64.b64encode(hashlib.sha256(f.read()).digest()).decode()
+
+
+def test_create_zip_package_stored_file_changed(tmp_path, package_dir, monkeypatch):
+    stored_file = zip_module.stored_file
+
+    def modify(path):
+        result = stored_file(path)
+        os.utime(path, ns=(0, 0))
+        return result
+
+    monkeypatch.setattr(zip_module, "stored_file", modify)
+    with pytest.raises(OSError, match="changed while it was written"):
+        create_zip_package(str(package_dir), str(tmp_path / "package.zip"))
@@ -8,6 +8,42 @@ import sys
 from poetry_plugin_lambda_build.utils import run_cmd, remove_prefix
 
 
+def write(root: str, files: dict[str, str]):
+    for path, content in files.items():
+        full_path = os.path.join(root, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w") as f:
+            f.write(content)
+
+
+def install(
+    site_dir: str,
+    name: str,
+    version: str,
+    files: list[str],
+    metadata: list[str] | None = None,
+):
+    # scripts are recorded relative to the site directory as ../../../bin
+    # by pip install --target, they are written to its bin directory
+    dist_info = os.path.join(site_dir, f"{name}-{version}.dist-info")
+    os.makedirs(dist_info)
+    records = []
+    for path in files:
+        rel_path = os.path.normpath(path).replace("../../../", "")
+        full_path = os.path.join(site_dir, rel_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w") as f:
+            f.write(path)
+        records.append(f"{path},,")
+    for path in metadata or []:
+        with open(os.path.join(dist_info, path), "w") as f:
+            f.write(path)
+        records.append(f"{name}-{version}.dist-info/{path},,")
+    records.append(f"{name}-{version}.dist-info/RECORD,,")
+    with open(os.path.join(dist_info, "RECORD"), "w") as f:
+        f.write("\n".join(records))
+
+
 def run_python_cmd(
     *cmd: list[str],
     logger: Logger | None = None,